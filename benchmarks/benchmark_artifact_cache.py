@@ -0,0 +1,79 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: apply 10 WebDownloadFile manifests that download the same 64 MiB artifact (served by a local HTTP 
+    server) to different target files, without and with the artifact cache.
+
+    Run with:
+
+        python benchmarks/benchmark_artifact_cache.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.helpers.artifact_cache import artifact_cache
+from py_animus.extensions.web_download_file_v1 import WebDownloadFile
+from py_animus.models import actions
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        return
+
+
+def _apply_all(url: str, target_dir: str, manifest_count: int):
+    for i in range(manifest_count):
+        manifest = WebDownloadFile()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'WebDownloadFile',
+                'version': 'v1',
+                'metadata': {'name': 'download-{}'.format(i)},
+                'spec': {'sourceUrl': url, 'targetOutputFile': '{}{}target-{}.bin'.format(target_dir, os.sep, i)},
+            }
+        )
+        manifest.determine_actions()
+        manifest.apply_manifest()
+
+
+def run_benchmark(manifest_count: int=10, artifact_size: int=64*1024*1024):
+    logger.setLevel(logging.WARNING)
+    actions.set_command(command='apply')
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        www_dir = '{}{}www'.format(tmp_dir, os.sep)
+        os.mkdir(www_dir)
+        with open('{}{}artifact.bin'.format(www_dir, os.sep), 'wb') as f:
+            f.write(os.urandom(artifact_size))
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=www_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}/artifact.bin'.format(server.server_address[1])
+        for label, cache_dir in (('no cache', None), ('artifact cache', '{}{}cache'.format(tmp_dir, os.sep))):
+            target_dir = '{}{}{}'.format(tmp_dir, os.sep, label.replace(' ', '-'))
+            os.mkdir(target_dir)
+            artifact_cache.configure(cache_dir=cache_dir)
+            start = time.perf_counter()
+            _apply_all(url=url, target_dir=target_dir, manifest_count=manifest_count)
+            results[label] = time.perf_counter() - start
+            print('{:<15} {} downloads of {} MiB in {:.2f} seconds'.format(label, manifest_count, artifact_size // 1024 // 1024, results[label]))
+        artifact_cache.configure(cache_dir=None)
+        server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
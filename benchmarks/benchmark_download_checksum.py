@@ -0,0 +1,95 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: apply a WebDownloadFile manifest for a 256 MiB file served by a local HTTP server over one connection:
+
+    * without a checksum, followed by calculating the sha256 checksum of the written file
+    * with a sha256 checksum in the spec, calculated while the file is written
+    * again with the checksum in the spec, when the target file is already correct
+
+    Run with:
+
+        python benchmarks/benchmark_download_checksum.py
+"""
+
+import sys
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.extensions.web_download_file_v1 import WebDownloadFile
+from py_animus.helpers.file_io import calculate_file_digest
+from py_animus.models import actions
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+
+    content = b''
+
+    def _send_headers(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(_QuietHandler.content)))
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        self._send_headers()
+        self.wfile.write(_QuietHandler.content)
+
+    def log_message(self, format, *args):
+        return
+
+
+def _apply(url: str, target_file: str, checksum: dict=None):
+    spec = {'sourceUrl': url, 'targetOutputFile': target_file, 'downloadConnections': 1}
+    if checksum is not None:
+        spec['checksum'] = checksum
+    manifest = WebDownloadFile()
+    manifest.parse_manifest(manifest_data={'kind': 'WebDownloadFile', 'version': 'v1', 'metadata': {'name': 'checksum'}, 'spec': spec})
+    manifest.determine_actions()
+    manifest.apply_manifest()
+
+
+def run_benchmark(file_size: int=256*1024*1024):
+    logger.setLevel(logging.WARNING)
+    actions.set_command(command='apply')
+    _QuietHandler.content = os.urandom(file_size)
+    checksum = {'algorithm': 'sha256', 'value': hashlib.sha256(_QuietHandler.content).hexdigest()}
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}/file.bin'.format(server.server_address[1])
+
+        start = time.perf_counter()
+        _apply(url=url, target_file='{}{}a.bin'.format(tmp_dir, os.sep))
+        calculate_file_digest(file_path='{}{}a.bin'.format(tmp_dir, os.sep), algorithm='sha256')
+        results['download, then checksum'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _apply(url=url, target_file='{}{}b.bin'.format(tmp_dir, os.sep), checksum=checksum)
+        results['streaming checksum'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _apply(url=url, target_file='{}{}b.bin'.format(tmp_dir, os.sep), checksum=checksum)
+        results['target already correct'] = time.perf_counter() - start
+        server.shutdown()
+    for label, duration in results.items():
+        print('{:<25} {:.2f} seconds'.format(label, duration))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,87 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: download 40 files of 256 KiB from a local HTTP server with an added delay of 20ms per request. Compares 
+    one requests.get() per URL (the previous implementation) with download_files(), first with an empty target 
+    directory and then again when all files are unchanged (304 responses).
+
+    Run with:
+
+        python benchmarks/benchmark_download_files.py
+"""
+
+import sys
+import os
+import time
+import logging
+import hashlib
+import tempfile
+import threading
+import functools
+import requests
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.utils.http_requests_io import download_files
+
+
+class _SlowQuietHandler(SimpleHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(0.02)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+def _download_files_one_request_per_url(urls: list, target_dir: str)->list:
+    files = list()
+    for url in urls:
+        outfile = '{}{}{}'.format(target_dir, os.sep, hashlib.sha256(url.encode('utf-8')).hexdigest())
+        if os.path.exists(outfile):
+            os.unlink(outfile)
+        r = requests.get(url)
+        with open(outfile, 'w') as f:
+            f.write(r.text)
+            files.append(outfile)
+    return files
+
+
+def run_benchmark(file_count: int=40, file_size: int=256*1024):
+    logger.setLevel(logging.INFO)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        www_dir = '{}{}www'.format(tmp_dir, os.sep)
+        os.mkdir(www_dir)
+        for i in range(file_count):
+            with open('{}{}file-{}.yaml'.format(www_dir, os.sep, i), 'w') as f:
+                f.write('x' * file_size)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_SlowQuietHandler, directory=www_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = ['http://127.0.0.1:{}/file-{}.yaml'.format(server.server_address[1], i) for i in range(file_count)]
+
+        for label, target_dir_name, download_function in (
+            ('one request per URL', 'old', lambda urls, target_dir: _download_files_one_request_per_url(urls=urls, target_dir=target_dir)),
+            ('download_files()', 'new', lambda urls, target_dir: download_files(urls=urls, target_dir=target_dir)),
+            ('download_files() unchanged', 'new', lambda urls, target_dir: download_files(urls=urls, target_dir=target_dir)),
+        ):
+            target_dir = '{}{}{}'.format(tmp_dir, os.sep, target_dir_name)
+            os.makedirs(target_dir, exist_ok=True)
+            start = time.perf_counter()
+            files = download_function(urls, target_dir)
+            results[label] = time.perf_counter() - start
+            print('{:<28} {} files in {:.3f} seconds'.format(label, len(files), results[label]))
+        server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,70 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: clone a generated repository with a long history (through the file:// transport, so that Git packs and
+    transfers objects as it would from a remote) with a full clone, a shallow single branch clone, a partial clone and
+    a full clone that borrows from a warm mirror.
+
+    Run with:
+
+        python benchmarks/benchmark_git_clone.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from git import Repo, Actor
+from py_animus.animus_logging import logger
+from py_animus.helpers.git_mirror_cache import git_mirror_cache
+from py_animus.utils.git_integration import git_clone
+
+
+def _create_source_repository(repo_dir: str, commit_count: int, file_count: int, file_size: int):
+    repo = Repo.init(repo_dir, initial_branch='main')
+    repo.git.config('uploadpack.allowFilter', 'true')
+    actor = Actor('Benchmark', 'benchmark@example.com')
+    for commit_number in range(commit_count):
+        file_names = list()
+        for file_number in range(file_count):
+            file_name = '{}{}file-{}.bin'.format(repo_dir, os.sep, file_number)
+            with open(file_name, 'wb') as f:
+                f.write(os.urandom(file_size))
+            file_names.append(file_name)
+        repo.index.add(file_names)
+        repo.index.commit('Commit {}'.format(commit_number), author=actor, committer=actor)
+
+
+def run_benchmark(commit_count: int=100, file_count: int=20, file_size: int=32*1024):
+    logger.setLevel(logging.WARNING)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_dir = '{}{}source'.format(tmp_dir, os.sep)
+        _create_source_repository(repo_dir=source_dir, commit_count=commit_count, file_count=file_count, file_size=file_size)
+        url = 'file://{}'.format(source_dir)
+        git_mirror_cache.configure(cache_dir='{}{}mirrors'.format(tmp_dir, os.sep))
+        git_mirror_cache.get_mirror(url=url)
+        scenarios = (
+            ('full clone', dict(use_mirror_cache=False)),
+            ('depth 1', dict(depth=1, single_branch=True, use_mirror_cache=False)),
+            ('blob:none', dict(clone_filter='blob:none', use_mirror_cache=False)),
+            ('warm mirror', dict()),
+        )
+        for label, clone_options in scenarios:
+            start = time.perf_counter()
+            git_clone(url=url, target_dir='{}{}{}'.format(tmp_dir, os.sep, label.replace(' ', '-').replace(':', '-')), branch='main', **clone_options)
+            results[label] = time.perf_counter() - start
+            print('{:<12} {:.2f} seconds'.format(label, results[label]))
+        git_mirror_cache.configure(cache_dir=None)
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
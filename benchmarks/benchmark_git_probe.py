@@ -0,0 +1,61 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: check 50 times whether the same URL (a generated repository with 500 branches and 500 tags, through the
+    file:// transport) is a Git repository, with a full `git ls-remote` per check and with `is_url_a_git_repo()`.
+
+    Run with:
+
+        python benchmarks/benchmark_git_probe.py
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from git import Repo, Actor
+from git import cmd as git_cmd
+from py_animus.helpers import is_url_a_git_repo, git_remote_probe
+
+
+def _full_ls_remote_probe(url: str)->bool:
+    remote_refs = {}
+    for ref in git_cmd.Git().ls_remote(url).split('\n'):
+        hash_ref_list = ref.split('\t')
+        remote_refs[hash_ref_list[1]] = hash_ref_list[0]
+    return len(remote_refs) > 0
+
+
+def run_benchmark(probe_count: int=50, ref_count: int=500):
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repo_dir = '{}{}source'.format(tmp_dir, os.sep)
+        repo = Repo.init(repo_dir, initial_branch='main')
+        with open('{}{}README.md'.format(repo_dir, os.sep), 'w') as f:
+            f.write('benchmark')
+        repo.index.add(['{}{}README.md'.format(repo_dir, os.sep)])
+        actor = Actor('Benchmark', 'benchmark@example.com')
+        commit = repo.index.commit('Initial commit', author=actor, committer=actor)
+        with open('{}{}.git{}packed-refs'.format(repo_dir, os.sep, os.sep), 'w') as f:
+            for i in range(ref_count):
+                f.write('{} refs/heads/branch-{}\n'.format(commit.hexsha, i))
+                f.write('{} refs/tags/tag-{}\n'.format(commit.hexsha, i))
+        url = 'file://{}'.format(repo_dir)
+        git_remote_probe.reset()
+        for label, function in (('full ls-remote', _full_ls_remote_probe), ('cached probe', is_url_a_git_repo)):
+            start = time.perf_counter()
+            for i in range(probe_count):
+                function(url)
+            results[label] = time.perf_counter() - start
+            print('{:<15} {} probes in {:.3f} seconds'.format(label, probe_count, results[label]))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
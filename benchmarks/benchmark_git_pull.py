@@ -0,0 +1,87 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: re-apply a GitRepo manifest 20 times for a work directory that is already up to date, with a pull and
+    checkout every time (the previous behaviour) and with the ls-remote fast path.
+
+    Run with:
+
+        python benchmarks/benchmark_git_pull.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from git import Repo, Actor
+from py_animus.animus_logging import logger
+from py_animus.extensions.git_repo_v1 import GitRepo
+from py_animus.models import actions
+from py_animus.utils.git_integration import git_clone
+
+
+def _create_source_repository(repo_dir: str, commit_count: int, file_count: int):
+    repo = Repo.init(repo_dir, initial_branch='main')
+    actor = Actor('Benchmark', 'benchmark@example.com')
+    for commit_number in range(commit_count):
+        file_names = list()
+        for file_number in range(file_count):
+            file_name = '{}{}file-{}.txt'.format(repo_dir, os.sep, file_number)
+            with open(file_name, 'w') as f:
+                f.write('{} {}'.format(commit_number, file_number) * 100)
+            file_names.append(file_name)
+        repo.index.add(file_names)
+        repo.index.commit('Commit {}'.format(commit_number), author=actor, committer=actor)
+
+
+def _pull_and_checkout(work_dir: str):
+    repo = Repo(work_dir)
+    repo.remotes.origin.pull()
+    repo.git.checkout('main')
+
+
+def _apply(url: str, work_dir: str):
+    manifest = GitRepo()
+    manifest.parse_manifest(
+        manifest_data={
+            'kind': 'GitRepo',
+            'version': 'v1',
+            'metadata': {'name': 'benchmark'},
+            'spec': {'cloneUrl': url, 'workDir': work_dir, 'checkoutBranch': 'main'},
+        }
+    )
+    manifest.determine_actions()
+    manifest.apply_manifest()
+
+
+def run_benchmark(apply_count: int=20, commit_count: int=50, file_count: int=200):
+    logger.setLevel(logging.WARNING)
+    actions.set_command(command='apply')
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_dir = '{}{}source'.format(tmp_dir, os.sep)
+        _create_source_repository(repo_dir=source_dir, commit_count=commit_count, file_count=file_count)
+        url = 'file://{}'.format(source_dir)
+        work_dir = '{}{}work'.format(tmp_dir, os.sep)
+        git_clone(url=url, target_dir=work_dir, branch='main')
+        for label, function in (('pull', _pull_and_checkout), ('fast path', None)):
+            start = time.perf_counter()
+            for i in range(apply_count):
+                if function is None:
+                    _apply(url=url, work_dir=work_dir)
+                else:
+                    function(work_dir=work_dir)
+            results[label] = time.perf_counter() - start
+            print('{:<10} {} re-applies in {:.2f} seconds'.format(label, apply_count, results[label]))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,53 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Micro-benchmark: cost per VariableCache.get_value() call with the logger resolved once, compared to the previous
+    behavior where every log call reloaded the py_animus.animus_logging module.
+
+    Run with:
+
+        python benchmarks/benchmark_logger_helper.py
+"""
+
+import sys
+import os
+import importlib
+import timeit
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+import py_animus.animus_logging as animus_logger
+from py_animus.models import LoggerHelper, VariableCache, Variable
+
+
+class ReloadingLoggerHelper(LoggerHelper):
+    """The behavior before the logger was cached: every call reloads the logging module"""
+
+    def initialize(self):
+        importlib.reload(animus_logger)
+        self.logger = animus_logger.logger
+
+
+def _build_cache(log_helper: LoggerHelper)->VariableCache:
+    cache = VariableCache()
+    cache.log_helper = log_helper
+    cache.store_variable(variable=Variable(name='benchmark-variable', initial_value='some value'))
+    return cache
+
+
+def run_benchmark(iterations: int=2000):
+    results = dict()
+    for label, log_helper in (('reload on every call', ReloadingLoggerHelper()), ('resolved once', LoggerHelper()),):
+        cache = _build_cache(log_helper=log_helper)
+        duration = timeit.timeit(lambda: cache.get_value(variable_name='benchmark-variable'), number=iterations)
+        results[label] = duration / iterations * 1000000.0
+        print('{:<24}: {:>10.2f} microseconds per get_value() call'.format(label, results[label]))
+    print('Speedup                 : {:>10.1f}x'.format(results['reload on every call'] / results['resolved once']))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
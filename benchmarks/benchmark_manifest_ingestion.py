@@ -0,0 +1,75 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: load the manifest files of a project spread across 200 files with load_manifest_files(), with one 
+    worker and with 8 workers. Local files are loaded in a process pool and files served by a local HTTP server (with 
+    an added delay of 20ms per request) are downloaded in a thread pool. The parse cache is reset before every run.
+
+    Run with:
+
+        python benchmarks/benchmark_manifest_ingestion.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.helpers.manifest_processing import load_manifest_files
+from py_animus.helpers.yaml_helper import yaml_parse_cache
+
+
+def _write_manifest_files(tmp_dir: str, file_count: int, sections_per_file: int)->list:
+    manifest_files = list()
+    for file_number in range(file_count):
+        manifest_file = '{}{}manifest-{}.yaml'.format(tmp_dir, os.sep, file_number)
+        with open(manifest_file, 'w') as f:
+            for i in range(sections_per_file):
+                f.write('---\nkind: WriteFile\nversion: v1\nmetadata:\n  name: file-{}-{}\nspec:\n  targetFile: !Value target-{}\n  data: |\n'.format(file_number, i, i))
+                for j in range(20):
+                    f.write('    line {} of the generated file content\n'.format(j))
+        manifest_files.append(manifest_file)
+    return manifest_files
+
+
+class _SlowQuietHandler(SimpleHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(0.02)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+def run_benchmark(file_count: int=200, sections_per_file: int=50):
+    logger.setLevel(logging.INFO)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest_files = _write_manifest_files(tmp_dir=tmp_dir, file_count=file_count, sections_per_file=sections_per_file)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_SlowQuietHandler, directory=tmp_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        manifest_urls = ['http://127.0.0.1:{}/{}'.format(server.server_address[1], os.path.basename(manifest_file)) for manifest_file in manifest_files]
+        for label, manifest_uris in (('local', manifest_files), ('http', manifest_urls)):
+            for max_workers in (1, 8):
+                yaml_parse_cache.reset()
+                start = time.perf_counter()
+                yaml_sections = load_manifest_files(manifest_uris=manifest_uris, max_workers=max_workers)
+                results[(label, max_workers)] = time.perf_counter() - start
+                print('{:<5} {} worker(s): {} sections from {} files in {:.3f} seconds'.format(label, max_workers, len(yaml_sections['WriteFile']), file_count, results[(label, max_workers)]))
+        server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,72 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: split and load every section of a generated manifest bundle without a cache, with a warm memory cache 
+    and with the on disk cache of a previous run.
+
+    Run with:
+
+        python benchmarks/benchmark_parse_cache.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.helpers.yaml_helper import YamlParseCache
+
+
+def _write_bundle(file_path: str, section_count: int, lines_per_section: int):
+    with open(file_path, 'w') as f:
+        for i in range(section_count):
+            f.write('---\nkind: WriteFile\nversion: v1\nmetadata:\n  name: file-{}\nspec:\n  targetFile: !Value target-{}\n  data: |\n'.format(i, i))
+            for j in range(lines_per_section):
+                f.write('    line {} of the generated file content for manifest number {}\n'.format(j, i))
+
+
+def _load_all(parse_cache: YamlParseCache, file_path: str):
+    yaml_sections = parse_cache.get_yaml_sections_from_file(file_path=file_path)
+    for section_texts in yaml_sections.values():
+        for section_text in section_texts:
+            parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=section_text)
+
+
+def run_benchmark(section_count: int=2000, lines_per_section: int=20):
+    logger.setLevel(logging.INFO)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = '{}{}bundle.yaml'.format(tmp_dir, os.sep)
+        cache_dir = '{}{}cache'.format(tmp_dir, os.sep)
+        _write_bundle(file_path=file_path, section_count=section_count, lines_per_section=lines_per_section)
+
+        parse_cache = YamlParseCache()
+        parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        start = time.perf_counter()
+        _load_all(parse_cache=parse_cache, file_path=file_path)
+        results['cold'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _load_all(parse_cache=parse_cache, file_path=file_path)
+        results['memory'] = time.perf_counter() - start
+
+        next_run_parse_cache = YamlParseCache()
+        next_run_parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        start = time.perf_counter()
+        _load_all(parse_cache=next_run_parse_cache, file_path=file_path)
+        results['disk'] = time.perf_counter() - start
+
+    for label, duration in results.items():
+        print('{:<8} {:.3f} seconds for {} sections'.format(label, duration, section_count))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
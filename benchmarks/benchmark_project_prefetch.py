@@ -0,0 +1,93 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: download all files of a remote project tree (5 levels of parent projects, each with 4 valuesConfig and 
+    4 manifestFiles URLs and a loggingConfig URL) served by a local HTTP server with an added delay of 50ms per 
+    request. Compares downloading every URL one at a time with prefetch_project_manifest_files().
+
+    Run with:
+
+        python benchmarks/benchmark_project_prefetch.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.utils.http_requests_io import download_files
+from py_animus.helpers.manifest_processing import manifest_file_prefetcher, prefetch_project_manifest_files
+from py_animus.helpers.yaml_helper import yaml_parse_cache
+
+
+class _SlowQuietHandler(SimpleHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(0.05)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+def _write_project_tree(tmp_dir: str, base_url: str, levels: int, files_per_list: int)->list:
+    urls = list()
+    for level in range(levels):
+        urls.append('{}/project-{}.yaml'.format(base_url, level))
+        lines = ['---', 'kind: Project', 'version: v1', 'metadata:', '  name: project-{}'.format(level), 'spec:']
+        if level + 1 < levels:
+            lines += ['  parentProjects:', '  - name: project-{}'.format(level + 1), '    path: {}/project-{}.yaml'.format(base_url, level + 1)]
+        lines.append('  loggingConfig: {}/logging-{}.yaml'.format(base_url, level))
+        referenced_files = ['logging-{}.yaml'.format(level)]
+        for spec_field, prefix in (('valuesConfig', 'values'), ('manifestFiles', 'manifests')):
+            lines.append('  {}:'.format(spec_field))
+            for i in range(files_per_list):
+                file_name = '{}-{}-{}.yaml'.format(prefix, level, i)
+                lines.append('  - {}/{}'.format(base_url, file_name))
+                referenced_files.append(file_name)
+        with open('{}{}project-{}.yaml'.format(tmp_dir, os.sep, level), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        for file_name in referenced_files:
+            with open('{}{}{}'.format(tmp_dir, os.sep, file_name), 'w') as f:
+                f.write('---\nkind: WriteFile\nversion: v1\nmetadata:\n  name: {}\n'.format(file_name))
+            urls.append('{}/{}'.format(base_url, file_name))
+    return urls
+
+
+def run_benchmark(levels: int=5, files_per_list: int=4):
+    logger.setLevel(logging.INFO)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_SlowQuietHandler, directory=tmp_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+        urls = _write_project_tree(tmp_dir=tmp_dir, base_url=base_url, levels=levels, files_per_list=files_per_list)
+
+        start = time.perf_counter()
+        for url in urls:
+            download_files(urls=[url,])
+        results['serial'] = time.perf_counter() - start
+
+        manifest_file_prefetcher.reset()
+        yaml_parse_cache.reset()
+        start = time.perf_counter()
+        download_count = prefetch_project_manifest_files(project_manifest_uri=urls[0], project_name='project-0')
+        results['prefetch'] = time.perf_counter() - start
+        server.shutdown()
+    print('serial   {} URLs in {:.3f} seconds'.format(len(urls), results['serial']))
+    print('prefetch {} URLs in {:.3f} seconds'.format(download_count, results['prefetch']))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
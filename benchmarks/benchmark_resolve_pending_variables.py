@@ -0,0 +1,78 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: resolve a spec with 10,000 keys through ManifestBase.resolve_all_pending_variables() (a full walk of a
+    deep copy, as done before templates were compiled at parse time) and through 
+    ManifestBase.resolve_manifest_variables() (only the compiled template paths), with the logger at INFO level (the 
+    default when the DEBUG environment variable is not set).
+
+    Run with:
+
+        python benchmarks/benchmark_resolve_pending_variables.py
+"""
+
+import sys
+import os
+import time
+import copy
+import logging
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.models import variable_cache, Variable
+from py_animus.models.extensions import ManifestBase
+
+
+class BenchmarkManifest(ManifestBase):
+
+    def implemented_manifest_differ_from_this_manifest(self)->bool:
+        return True
+
+
+def _build_spec(key_count: int, variable_every: int)->dict:
+    spec = dict()
+    for i in range(key_count):
+        if i % variable_every == 0:
+            spec['key-{}'.format(i)] = 'prefix !Variable benchmark-variable-{} suffix'.format(i % 100)
+        else:
+            spec['key-{}'.format(i)] = 'plain value {}'.format(i)
+    return spec
+
+
+def run_benchmark(key_count: int=10000, variable_every: int=10, rounds: int=3):
+    logger.setLevel(logging.INFO)
+    for i in range(100):
+        variable_cache.store_variable(variable=Variable(name='benchmark-variable-{}'.format(i), initial_value='resolved-{}'.format(i)), overwrite_existing=True)
+    manifest = BenchmarkManifest()
+    manifest.parse_manifest(
+        manifest_data={
+            'kind': 'BenchmarkManifest',
+            'version': 'v1',
+            'metadata': {'name': 'benchmark'},
+            'spec': _build_spec(key_count=key_count, variable_every=variable_every),
+        }
+    )
+    durations = list()
+    compiled_durations = list()
+    original_spec = manifest.spec
+    for i in range(rounds):
+        start = time.perf_counter()
+        manifest.resolve_all_pending_variables(iterable=copy.deepcopy(original_spec))
+        durations.append(time.perf_counter() - start)
+        manifest.spec = original_spec
+        start = time.perf_counter()
+        manifest.resolve_manifest_variables()
+        compiled_durations.append(time.perf_counter() - start)
+        manifest.spec = original_spec
+    best = min(durations) * 1000.0
+    compiled_best = min(compiled_durations) * 1000.0
+    print('Resolved {} keys ({} with variable references) in {:.1f} ms with a full walk (best of {})'.format(key_count, key_count // variable_every, best, rounds))
+    print('Resolved {} keys ({} with variable references) in {:.1f} ms with compiled templates (best of {})'.format(key_count, key_count // variable_every, compiled_best, rounds))
+    return best, compiled_best
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,92 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: apply a WebDownloadFile manifest for a 200 MiB file served by a local HTTP server that supports range 
+    requests and limits every connection to about 25 MiB/s (256 KiB writes with a 10ms pause), with one connection 
+    and with 4 connections.
+
+    Run with:
+
+        python benchmarks/benchmark_segmented_download.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.extensions.web_download_file_v1 import WebDownloadFile
+from py_animus.models import actions, variable_cache
+
+
+class _ThrottledRangeHandler(BaseHTTPRequestHandler):
+
+    content = b''
+
+    def _send_headers(self, status: int, length: int):
+        self.send_response(status)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"benchmark"')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(status=200, length=len(_ThrottledRangeHandler.content))
+
+    def do_GET(self):
+        data = _ThrottledRangeHandler.content
+        status = 200
+        if self.headers.get('Range') is not None:
+            start, end = [int(value) for value in self.headers.get('Range').split('=')[1].split('-')]
+            data = data[start:end+1]
+            status = 206
+        self._send_headers(status=status, length=len(data))
+        view = memoryview(data)
+        for offset in range(0, len(data), 262144):
+            self.wfile.write(view[offset:offset+262144])
+            time.sleep(0.01)
+
+    def log_message(self, format, *args):
+        return
+
+
+def run_benchmark(file_size: int=200*1024*1024):
+    logger.setLevel(logging.WARNING)
+    actions.set_command(command='apply')
+    _ThrottledRangeHandler.content = os.urandom(file_size)
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _ThrottledRangeHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}/file.bin'.format(server.server_address[1])
+        for connections in (1, 4):
+            target_file = '{}{}target-{}.bin'.format(tmp_dir, os.sep, connections)
+            manifest = WebDownloadFile()
+            manifest.parse_manifest(
+                manifest_data={
+                    'kind': 'WebDownloadFile',
+                    'version': 'v1',
+                    'metadata': {'name': 'download-{}'.format(connections)},
+                    'spec': {'sourceUrl': url, 'targetOutputFile': target_file, 'downloadConnections': connections},
+                }
+            )
+            start = time.perf_counter()
+            manifest.determine_actions()
+            manifest.apply_manifest()
+            results[connections] = time.perf_counter() - start
+            print('{} connection(s): {} MiB in {:.2f} seconds'.format(connections, os.path.getsize(target_file) // 1024 // 1024, results[connections]))
+        server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,56 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: run a script that prints 200 MiB to STDOUT and measure the time and the peak Python memory allocated
+    with `subprocess.run(..., capture_output=True)` and with `run_with_output_capture()` (1 MiB head and tail).
+
+    Run with:
+
+        python benchmarks/benchmark_shell_script_output.py
+"""
+
+import sys
+import os
+import time
+import tempfile
+import subprocess
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.extensions.shell_script_v1 import OutputCapture, run_with_output_capture
+
+
+def _capture_output(script_file: str):
+    return subprocess.run(script_file, check=True, capture_output=True)
+
+
+def _stream_output(script_file: str):
+    return run_with_output_capture(command=script_file, stdout_capture=OutputCapture(), stderr_capture=OutputCapture())
+
+
+def run_benchmark(output_mib: int=200):
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        script_file = '{}{}script.sh'.format(tmp_dir, os.sep)
+        with open(script_file, 'w') as f:
+            f.write('#!/bin/sh\n\nhead -c {} /dev/zero | tr "\\0" "x"\n'.format(output_mib * 1024 * 1024))
+        os.chmod(script_file, 0o700)
+        for label, function in (('capture_output', _capture_output), ('streaming', _stream_output)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = function(script_file=script_file)
+            duration = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del result
+            results[label] = (duration, peak)
+            print('{:<15} {:.2f} seconds, peak {:.1f} MiB'.format(label, duration, peak / 1024 / 1024))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
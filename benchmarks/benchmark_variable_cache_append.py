@@ -0,0 +1,48 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: append items one at a time to a list Variable with 
+    VariableCache.add_list_item_to_existing_variable(), for a regular and for a frozen Variable.
+
+    Run with:
+
+        python benchmarks/benchmark_variable_cache_append.py
+"""
+
+import sys
+import os
+import time
+import logging
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.models import VariableCache, Variable
+
+
+def _append_items(item_count: int, frozen: bool)->float:
+    vc = VariableCache()
+    if frozen is True:
+        vc.store_variable(variable=Variable(name='inventory', initial_value=list(), frozen=True))
+    else:
+        vc.store_variable(variable=Variable(name='inventory', initial_value=list()))
+    start = time.perf_counter()
+    for i in range(item_count):
+        vc.add_list_item_to_existing_variable(variable_name='inventory', value={'path': '/tmp/file-{}'.format(i), 'size': i})
+    return time.perf_counter() - start
+
+
+def run_benchmark(item_count: int=2000):
+    logger.setLevel(logging.INFO)
+    results = dict()
+    for label, frozen in (('regular', False), ('frozen', True)):
+        results[label] = _append_items(item_count=item_count, frozen=frozen) * 1000.0
+        print('Appended {} items to a {} list Variable in {:.1f} ms'.format(item_count, label, results[label]))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
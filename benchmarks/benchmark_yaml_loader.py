@@ -0,0 +1,67 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: load generated manifests with the pure Python SafeLoader (tags registered per call) and with 
+    AnimusSafeLoader (libyaml based when available, tags registered once).
+
+    Run with:
+
+        python benchmarks/benchmark_yaml_loader.py
+"""
+
+import sys
+import os
+import time
+import logging
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+import yaml
+from py_animus.animus_logging import logger
+from py_animus.models import all_scoped_values, scope, ScopedValues, Value
+from py_animus.helpers.yaml_helper import AnimusSafeLoader, ValueTag, VariableTag, SubTag
+
+
+def _generate_manifest(number: int, lines: int)->str:
+    manifest = 'kind: WriteFile\nversion: v1\nmetadata:\n  name: file-{}\n  environments:\n  - default\nspec:\n  targetFile: !Value target-{}\n  actionOnAnchor: !Variable ShellScript:v1:script-{}:STDOUT\n  data: |\n'.format(number, number, number)
+    for i in range(lines):
+        manifest = '{}    line {} of the generated file content\n'.format(manifest, i)
+    return manifest
+
+
+def _load_with_safe_loader(raw_yaml_str: str):
+    yaml.SafeLoader.add_constructor(        '!Value',       ValueTag.from_yaml      )
+    yaml.SafeLoader.add_constructor(        '!Variable',    VariableTag.from_yaml   )
+    yaml.SafeLoader.add_constructor(        '!Sub',         SubTag.from_yaml        )
+    return yaml.safe_load(raw_yaml_str)
+
+
+def _load_with_animus_loader(raw_yaml_str: str):
+    return yaml.load(raw_yaml_str, Loader=AnimusSafeLoader)
+
+
+def run_benchmark(manifest_count: int=2000, lines_per_manifest: int=20):
+    logger.setLevel(logging.INFO)
+    scope.set_scope(new_value='default')
+    scoped_values = ScopedValues(scope='default')
+    for i in range(manifest_count):
+        scoped_values.add_value(value=Value(name='target-{}'.format(i), initial_value='/tmp/file-{}'.format(i)))
+    all_scoped_values.add_scoped_values(scoped_values=scoped_values, replace=True)
+    manifests = [_generate_manifest(number=i, lines=lines_per_manifest) for i in range(manifest_count)]
+    results = dict()
+    for label, loader_function in (('SafeLoader', _load_with_safe_loader), ('AnimusSafeLoader', _load_with_animus_loader)):
+        start = time.perf_counter()
+        for manifest in manifests:
+            loader_function(manifest)
+        duration = time.perf_counter() - start
+        results[label] = duration
+        print('{:<18} {:>8.0f} manifests/second ({:.2f} seconds for {} manifests)'.format(label, manifest_count / duration, duration, manifest_count))
+    print('AnimusSafeLoader base class: {}'.format(AnimusSafeLoader.__bases__[0].__name__))
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,49 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+
+    Benchmark: split a generated multi-document manifest bundle with 
+    spit_yaml_text_from_file_with_multiple_yaml_sections().
+
+    Run with:
+
+        python benchmarks/benchmark_yaml_splitter.py
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+
+from py_animus.animus_logging import logger
+from py_animus.helpers.yaml_helper import spit_yaml_text_from_file_with_multiple_yaml_sections
+
+
+def _write_bundle(file_path: str, section_count: int, lines_per_section: int):
+    with open(file_path, 'w') as f:
+        for i in range(section_count):
+            f.write('---\nkind: WriteFile\nversion: v1\nmetadata:\n  name: file-{}\nspec:\n  targetFile: /tmp/file-{}\n  data: |\n'.format(i, i))
+            for j in range(lines_per_section):
+                f.write('    line {} of the generated file content for manifest number {}\n'.format(j, i))
+
+
+def run_benchmark(section_count: int=2000, lines_per_section: int=100):
+    logger.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = '{}{}bundle.yaml'.format(tmp_dir, os.sep)
+        _write_bundle(file_path=file_path, section_count=section_count, lines_per_section=lines_per_section)
+        size_mb = os.path.getsize(file_path) / 1024.0 / 1024.0
+        start = time.perf_counter()
+        yaml_sections = spit_yaml_text_from_file_with_multiple_yaml_sections(yaml_text=file_path)
+        duration = time.perf_counter() - start
+    print('Split {:.1f} MB into {} sections in {:.2f} seconds'.format(size_mb, len(yaml_sections['WriteFile']), duration))
+    return duration
+
+
+if __name__ == '__main__':
+    run_benchmark()
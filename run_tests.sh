@@ -28,9 +28,30 @@ coverage run -a tests/test_http_requests_io.py
 echo ; echo ; echo "########################################################################################################################"
 coverage run -a tests/test_helper_init.py
 
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_manifest_processing.py
+
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_artifact_cache.py
+
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_web_download_file.py
+
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_git_repo.py
+
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_shell_script.py
+
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_write_file.py
+
 echo ; echo ; echo "########################################################################################################################"
 coverage run -a tests/test_models.py
 
+echo ; echo ; echo "########################################################################################################################"
+coverage run -a tests/test_extensions_init.py
+
 echo ; echo ; echo "########################################################################################################################"
 coverage report --omit="tests/test*" -m
 coverage html -d reports --omit="tests/test*","/tmp/test_manifest_classes/*"
@@ -15,6 +15,20 @@ SUPPORTED_COMMANDS = (
     'delete',
 )
 
+SUPPORTED_OPTIONS = (
+    '--parallel-workers',
+    '--state-file',
+    '--force',
+    '--parse-cache-dir',
+    '--artifact-cache-dir',
+    '--artifact-cache-max-size',
+    '--artifact-cache-hardlinks',
+    '--git-mirror-cache-dir',
+    '--git-probe-cache-dir',
+    '--git-probe-cache-ttl',
+    '--variable-eviction-grace-period',
+)
+
 
 def validate_list(input_list: list, min_length: int=0, max_length: int=999, can_be_none: bool=False, error_message: str='List validation failed'):
     if input_list is None:
@@ -50,10 +64,38 @@ def _validate_command_line_arguments(cli_parameters:list):
     validate_word_in_list_of_possible_values(input_string=cli_parameters[1], possible_values=SUPPORTED_COMMANDS, error_message='action parameter must be one of: {}'.format(SUPPORTED_COMMANDS))
 
 
+def _validate_command_line_options(cli_options: list):
+    for option in cli_options:
+        option_name = option.split('=')[0]
+        validate_word_in_list_of_possible_values(input_string=option_name, possible_values=SUPPORTED_OPTIONS, error_message='Unsupported option "{}". Supported options: {}'.format(option_name, SUPPORTED_OPTIONS))
+
+
 def parse_command_line_arguments(overrides: list=list())->tuple:
+    """Parse the command line arguments
+
+    The first five arguments are positional. Any argument starting with `--` is treated as an option (for example
+    `--parallel-workers=4`) and will be returned after the positional arguments, in the order it was supplied.
+
+    Args:
+        overrides: A list of arguments to use instead of `sys.argv` (Optional, default=empty list)
+
+    Returns:
+        A tuple with the positional arguments followed by any options
+
+    Raises:
+        Exception: When the arguments or options fail validation
+    """
     cli_parameters = overrides
     if len(sys.argv) > 1 and len(overrides) == 0:
         cli_parameters = list(sys.argv)
-    _validate_command_line_arguments(cli_parameters=cli_parameters)
-    return tuple(cli_parameters)
+    positional_parameters = list()
+    cli_options = list()
+    for param in cli_parameters:
+        if isinstance(param, str) and param.startswith('--'):
+            cli_options.append(param)
+        else:
+            positional_parameters.append(param)
+    _validate_command_line_arguments(cli_parameters=positional_parameters)
+    _validate_command_line_options(cli_options=cli_options)
+    return tuple(positional_parameters + cli_options)
 
@@ -18,12 +18,21 @@ def run_main(cli_parameter_overrides: list=list()):
     from py_animus.utils import initialize_animus
     start_manifest, project_name = initialize_animus(cli_arguments=cli_arguments)
 
-    from py_animus.helpers.manifest_processing import process_project, tracker
+    from py_animus.helpers.manifest_processing import process_project, tracker, manifest_file_prefetcher, prefetch_project_manifest_files
+    from py_animus.models import variable_cache
     tracker.reset()
-    process_project(
-        project_manifest_uri=start_manifest,
-        project_name=project_name
-    )
+    manifest_file_prefetcher.reset()
+    try:
+        prefetch_project_manifest_files(
+            project_manifest_uri=start_manifest,
+            project_name=project_name
+        )
+        process_project(
+            project_manifest_uri=start_manifest,
+            project_name=project_name
+        )
+    finally:
+        variable_cache.persist()
 
     logger.info('ANIMUS DONE')
 
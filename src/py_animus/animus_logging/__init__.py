@@ -6,6 +6,7 @@
     https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
 """
 import os
+import json
 import logging
 import sys
 
@@ -14,6 +15,7 @@ class LoggingContext:
 
     def __init__(self, custom_logging_set: bool=None):
         self.custom_logging_set = False
+        self.generation = 0
         if custom_logging_set is not None:
             if isinstance(custom_logging_set, bool):
                 self.custom_logging_set = custom_logging_set
@@ -21,6 +23,10 @@ class LoggingContext:
     def enable_custom_logging(self):
         self.custom_logging_set = True
 
+    def invalidate_loggers(self):
+        """Signals to any component holding a reference to the logger that the logging configuration has changed."""
+        self.generation += 1
+
 
 logging_context = LoggingContext(custom_logging_set=False)
 
@@ -47,6 +53,7 @@ def set_global_logging_level():
     else:
         print('STARTUP: Initial global logging level: INFO')
         logger.setLevel(logging.INFO)
+    logging_context.invalidate_loggers()
 
 
 def add_handler(h):
@@ -54,4 +61,25 @@ def add_handler(h):
         logger.handlers.clear()
         logging_context.enable_custom_logging()
     logger.addHandler(h)
+    logging_context.invalidate_loggers()
+
+
+
+def is_debug_enabled()->bool:
+    """Guard for debug logging that is expensive to prepare, for example when data must be serialized first."""
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+class LazyJson:
+    """Defers JSON serialization of some data until a log record is actually formatted.
+
+    Example:
+
+    >>> logger.debug('Final spec: %s', LazyJson(spec))
+    """
+
+    def __init__(self, data: object):
+        self.data = data
 
+    def __str__(self)->str:
+        return json.dumps(self.data, default=str)
@@ -8,6 +8,8 @@
 
 import copy
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from py_animus.extensions.stream_handler_logging_v1 import StreamHandlerLogging as StreamHandlerLoggingV1
 from py_animus.extensions.file_handler_logging_v1 import FileHandlerLogging as FileHandlerLoggingV1
 from py_animus.extensions.rotating_file_handler_logging_v1 import RotatingFileHandlerLogging as RotatingFileHandlerLoggingV1
@@ -19,8 +21,9 @@ from py_animus.extensions.web_download_file_v1 import WebDownloadFile as WebDown
 from py_animus.extensions.write_file_v1 import WriteFile as WriteFileV1
 from py_animus.extensions.git_repo_v1 import GitRepo as GitRepoV1
 from py_animus.extensions.project_v1 import Project as ProjectV1
-from py_animus.animus_logging import logger
+from py_animus.animus_logging import logger, LazyJson
 from py_animus.models.extensions import ManifestBase
+from py_animus.models import Action
 
 
 class AnimusExtensions:
@@ -46,7 +49,7 @@ class AnimusExtensions:
             self.extensions[idx] = extension
         if idx not in self.supported_versions_of_extensions:
             self.supported_versions_of_extensions[idx] = copy.deepcopy(initialized_extension.supported_versions)
-        logger.debug('Extension kind "{}" and version "{}" added to Animus Extensions'.format(initialized_extension_kind, version))
+        logger.debug('Extension kind "%s" and version "%s" added to Animus Extensions', initialized_extension_kind, version)
 
     def find_extension_that_supports_version(self, extension_kind: str, version: str)->ManifestBase:
         idx = '{}:{}'.format(extension_kind, version)
@@ -114,23 +117,21 @@ class UnitOfWork:
         if 'environments' in self.work_instance.metadata:
             self.scopes = copy.deepcopy(work_instance.metadata['environments'])
 
-        logger.debug('UnitOfWork: Manifest named "{}" registered as a UnitOfWork'.format(self.id))
+        logger.debug('UnitOfWork: Manifest named "%s" registered as a UnitOfWork', self.id)
 
     def run(self, action: str, scope: str, rerouted: bool=False):
         if scope in self.scopes:
             logger.debug(
-                'UnitOfWork: "{}:{}" marked for executed for scope named "{}"'.format(
-                    self.work_instance.kind,
-                    self.work_instance.metadata['name'],
-                    scope
-                )
+                'UnitOfWork: "%s:%s" marked for executed for scope named "%s"',
+                self.work_instance.kind,
+                self.work_instance.metadata['name'],
+                scope
             )
             self.work_instance.logger_reset(new_logger=logger)
             if rerouted is False:
-                self.work_instance.metadata = self.work_instance.resolve_all_pending_variables(iterable=copy.deepcopy(self.work_instance.metadata))
-                self.work_instance.spec = self.work_instance.resolve_all_pending_variables(iterable=copy.deepcopy(self.work_instance.spec))
-            logger.debug('Final Resolved Metadata : "{}"'.format(json.dumps(self.work_instance.metadata, default=str)))
-            logger.debug('Final Resolved Spec     : "{}"'.format(json.dumps(self.work_instance.spec, default=str)))
+                self.work_instance.resolve_manifest_variables()
+            logger.debug('Final Resolved Metadata : "%s"', LazyJson(data=self.work_instance.metadata))
+            logger.debug('Final Resolved Spec     : "%s"', LazyJson(data=self.work_instance.spec))
             if action == 'apply':
                 if 'skipApplyAll' in self.work_instance.metadata and rerouted is False:
                     logger.info('rerouted={}'.format(rerouted))
@@ -151,7 +152,14 @@ class UnitOfWork:
                             return
                 logger.info('APPLYING "{}"'.format(self.work_instance.metadata['name']))
                 self.work_instance.determine_actions(action_override='apply', rerouted=rerouted)
-                self.work_instance.apply_manifest()
+                if self.work_instance.run_state_unchanged is True:
+                    return
+                try:
+                    self.work_instance.apply_manifest()
+                except:
+                    self.work_instance.record_run_state(outcome=Action.APPLY_ABORTED_WITH_ERRORS)
+                    raise
+                self.work_instance.record_run_state(outcome=Action.APPLY_DONE)
                 return
             if action == 'delete':
                 self.work_instance.determine_actions()
@@ -175,6 +183,7 @@ class UnitOfWork:
                 logger.info('DELETING "{}"'.format(self.work_instance.metadata['name']))
                 self.work_instance.determine_actions(action_override='delete', rerouted=rerouted)
                 self.work_instance.delete_manifest()
+                self.work_instance.record_run_state(outcome=Action.DELETE_DONE)
                 return
         else:
             logger.warning(
@@ -188,33 +197,49 @@ class UnitOfWork:
 
 
 class AllWork:
+    """A registry of all UnitOfWork instances, indexed by UnitOfWork id
+
+    The registry preserves the order in which units of work were added. Lookups, inserts and removals are O(1).
+
+    Attributes:
+        units_of_work: Dictionary of UnitOfWork instances, indexed by each UnitOfWork id
+    """
 
     def __init__(self):
-        self.all_work_list = list()
+        self.units_of_work = dict()
+
+    @property
+    def all_work_list(self)->list:
+        """A list copy of all units of work, in the order they were added. Prefer iterating over the AllWork instance, which does not copy."""
+        return list(self.units_of_work.values())
+
+    @all_work_list.setter
+    def all_work_list(self, all_work_list: list):
+        self.units_of_work = dict()
+        for uow in all_work_list:
+            self.add_unit_of_work(unit_of_work=uow)
+
+    def __iter__(self):
+        return iter(self.units_of_work.values())
+
+    def __len__(self)->int:
+        return len(self.units_of_work)
 
     def unit_of_work_by_id_exists(self, id: str)->bool:
-        for uow in self.all_work_list:
-            if uow.id == id:
-                return True
-        return False
+        return id in self.units_of_work
 
     def add_unit_of_work(self, unit_of_work: UnitOfWork):
-        if self.unit_of_work_by_id_exists(id=unit_of_work.id) is False:
-            self.all_work_list.append(unit_of_work)
-
+        if unit_of_work.id not in self.units_of_work:
+            self.units_of_work[unit_of_work.id] = unit_of_work
 
     def get_unit_of_work_by_id(self, id: str)->UnitOfWork:
-        for uow in self.all_work_list:
-            if uow.id == id:
-                return uow
+        if id in self.units_of_work:
+            return self.units_of_work[id]
         return None
             
     def remove_unit_of_work(self, id: str):
-        new_all_work_list = list()
-        for uow in self.all_work_list:
-            if uow.id != id:
-                new_all_work_list.append(uow)
-        self.all_work_list = new_all_work_list
+        if id in self.units_of_work:
+            self.units_of_work.pop(id)
 
 
 class ExecutionPlan:
@@ -224,7 +249,8 @@ class ExecutionPlan:
         self.execution_order = dict()
         self.execution_order['apply'] = list()
         self.execution_order['delete'] = list()
-        self.completed_work_ids = list()
+        self.completed_work_ids = set()
+        self.plan_is_stale = False
 
     def _unit_of_work_contains_skip_action_exclusion(self, uow: UnitOfWork, action: str):
         add_for_action = True
@@ -235,51 +261,190 @@ class ExecutionPlan:
         return add_for_action
 
     def add_unit_of_work_to_execution_order(self, uow: UnitOfWork):
-        if uow.dependencies is not None:
-            for a_action, parent_uow_ids in uow.dependencies.items():
-                for parent_uow_id in parent_uow_ids:
-                    if self._unit_of_work_contains_skip_action_exclusion(uow=uow, action=a_action) is True:
-                        if a_action not in self.execution_order:
-                            self.execution_order[a_action] = list()
-                        if parent_uow_id not in self.execution_order[a_action]:
-                            logger.debug('Parent UnitOfWork "{}" not yet marked for execution. Attempting to add...'.format(parent_uow_id))
-                            retrieved_uow = self.all_work.get_unit_of_work_by_id(id=parent_uow_id)
-                            if retrieved_uow is not None:
-                                self.add_unit_of_work_to_execution_order(uow=retrieved_uow)
-                            else:
-                                logger.warning('UnitOfWork with id "{}" not found - skipping'.format(parent_uow_id))
-                        else:
-                            logger.debug('Parent UnitOfWork "{}" already marked for execution.'.format(parent_uow_id))
-        for a_action in ('apply', 'delete'):
-            if self._unit_of_work_contains_skip_action_exclusion(uow=uow, action=a_action) is True:
-                if a_action not in self.execution_order:
-                    self.execution_order[a_action] = list()
-                if uow.id not in self.execution_order[a_action]:
-                    self.execution_order[a_action].append(uow.id)
+        """Adds a UnitOfWork. The execution plan is recalculated once, before the next `do_work()`"""
+        self.all_work.add_unit_of_work(unit_of_work=uow)
+        self.plan_is_stale = True
 
     def remove_unit_of_work(self, unit_of_work_id: str):
         self.all_work.remove_unit_of_work(id=unit_of_work_id)
-
+        self.plan_is_stale = True
+
+    def _find_dependency_cycle(self, blocked_ids: list, parent_ids_per_uow: dict)->list:
+        blocked = set(blocked_ids)
+        path = list()
+        position_in_path = dict()
+        current_id = blocked_ids[0]
+        while current_id not in position_in_path:
+            position_in_path[current_id] = len(path)
+            path.append(current_id)
+            for parent_uow_id in parent_ids_per_uow[current_id]:
+                if parent_uow_id in blocked:
+                    current_id = parent_uow_id
+                    break
+        cycle = path[position_in_path[current_id]:]
+        cycle.reverse()
+        cycle.append(cycle[0])
+        return cycle
+
+    def _calculate_execution_order_for_action(self, action: str)->list:
+        """Calculate the execution order for one action using Kahn's algorithm
+
+        Only the dependencies defined for the given action are considered. Units of work that are excluded from the
+        action with `skipApplyAll` or `skipDeleteAll` are not planned, and dependencies on them are ignored. Among
+        units of work that are ready at the same time, the order in which they were registered is preserved.
+
+        Returns:
+            A list of UnitOfWork id's in the order they must be executed
+
+        Raises:
+            Exception: When a circular dependency is detected. The message contains the manifest names in the cycle.
+        """
+        planned_ids = list()
+        all_ids = set()
+        for uow in self.all_work:
+            all_ids.add(uow.id)
+            if self._unit_of_work_contains_skip_action_exclusion(uow=uow, action=action) is True:
+                planned_ids.append(uow.id)
+        planned = set(planned_ids)
+
+        parent_ids_per_uow = dict()     # Parent id's are dictionary keys: O(1) lookups, in declaration order for stable cycle reports
+        dependants = dict()
+        in_degree = dict()
+        for uow_id in planned_ids:
+            parent_ids_per_uow[uow_id] = dict()
+            dependants[uow_id] = list()
+            in_degree[uow_id] = 0
+        for uow in self.all_work:
+            if uow.id not in planned or uow.dependencies is None or action not in uow.dependencies:
+                continue
+            if uow.dependencies[action] is None:
+                continue
+            for parent_uow_id in uow.dependencies[action]:
+                if parent_uow_id in planned:
+                    if parent_uow_id not in parent_ids_per_uow[uow.id]:
+                        parent_ids_per_uow[uow.id][parent_uow_id] = None
+                        dependants[parent_uow_id].append(uow.id)
+                        in_degree[uow.id] += 1
+                elif parent_uow_id in all_ids:
+                    logger.debug('Parent UnitOfWork "%s" of "%s" is excluded from action "%s" - ignoring dependency', parent_uow_id, uow.id, action)
+                else:
+                    logger.warning('UnitOfWork with id "{}" (dependency of "{}" for action "{}") not found - skipping'.format(parent_uow_id, uow.id, action))
+
+        execution_order = list()
+        ready = deque([uow_id for uow_id in planned_ids if in_degree[uow_id] == 0])
+        while len(ready) > 0:
+            uow_id = ready.popleft()
+            execution_order.append(uow_id)
+            for dependant_uow_id in dependants[uow_id]:
+                in_degree[dependant_uow_id] -= 1
+                if in_degree[dependant_uow_id] == 0:
+                    ready.append(dependant_uow_id)
+
+        if len(execution_order) < len(planned_ids):
+            blocked_ids = [uow_id for uow_id in planned_ids if in_degree[uow_id] > 0]
+            cycle = self._find_dependency_cycle(blocked_ids=blocked_ids, parent_ids_per_uow=parent_ids_per_uow)
+            raise Exception(
+                'Circular dependency detected for action "{}": {}. Manifests that cannot be planned: {}'.format(
+                    action,
+                    ' -> '.join(cycle),
+                    blocked_ids
+                )
+            )
+        return execution_order
 
     def calculate_execution_plan(self):
-        for uow in self.all_work.all_work_list:
-            self.add_unit_of_work_to_execution_order(uow=uow)
+        for a_action in ('apply', 'delete'):
+            self.execution_order[a_action] = self._calculate_execution_order_for_action(action=a_action)
+        self.plan_is_stale = False
 
-    def do_work(self, scope: str, action: str):
-        if len(self.execution_order[action]) == 0:
-            self.calculate_execution_plan()
-            logger.info('ExecutionPlan: {}'.format(json.dumps(self.execution_order[action], default=str)))
-        logger.debug('ExecutionPlan: Starting run for action "{}"'.format(action))
+    def _do_work_serially(self, scope: str, action: str):
         for uof_id in self.execution_order[action]:
             uow = self.all_work.get_unit_of_work_by_id(id=uof_id)
             if scope in uow.scopes:
                 if uow.id not in self.completed_work_ids:
-                    logger.debug('ExecutionPlan: Calling run action for UnitOfWork named "{}"'.format(uow.id))
+                    logger.debug('ExecutionPlan: Calling run action for UnitOfWork named "%s"', uow.id)
                     uow.run(action=action, scope=scope)
                     # self.remove_unit_of_work(unit_of_work_id=uof_id)
-                    self.completed_work_ids.append(uow.id)
+                    self.completed_work_ids.add(uow.id)
+                else:
+                    logger.debug('ExecutionPlan: UnitOfWork "%s" already run. Skipping.', uow.id)
+
+    def _do_work_concurrently(self, scope: str, action: str, max_workers: int):
+        """Run the planned units of work in a thread pool.
+
+        A UnitOfWork is submitted as soon as all of its dependencies for the given action have completed. Dependencies
+        that are not part of this run (not in scope, not planned or already completed) are considered satisfied, which
+        is consistent with the serial execution.
+        """
+        pending_parents = dict()
+        dependants = dict()
+        planned_ids = list()
+        for uof_id in self.execution_order[action]:
+            uow = self.all_work.get_unit_of_work_by_id(id=uof_id)
+            if scope in uow.scopes:
+                if uow.id not in self.completed_work_ids:
+                    planned_ids.append(uow.id)
+                    pending_parents[uow.id] = set()
+                    dependants[uow.id] = list()
                 else:
-                    logger.debug('ExecutionPlan: UnitOfWork "{}" already run. Skipping.'.format(uow.id))
+                    logger.debug('ExecutionPlan: UnitOfWork "%s" already run. Skipping.', uow.id)
+        for uof_id in planned_ids:
+            uow = self.all_work.get_unit_of_work_by_id(id=uof_id)
+            if action in uow.dependencies:
+                for parent_uow_id in uow.dependencies[action]:
+                    if parent_uow_id in pending_parents and parent_uow_id != uof_id:
+                        pending_parents[uof_id].add(parent_uow_id)
+                        dependants[parent_uow_id].append(uof_id)
+
+        ready = deque([uof_id for uof_id in planned_ids if len(pending_parents[uof_id]) == 0])
+        running = dict()
+        failure = None
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='animus-work') as executor:
+            while len(ready) > 0 or len(running) > 0:
+                while len(ready) > 0 and failure is None:
+                    uof_id = ready.popleft()
+                    uow = self.all_work.get_unit_of_work_by_id(id=uof_id)
+                    logger.debug('ExecutionPlan: Submitting run action for UnitOfWork named "%s"', uow.id)
+                    running[executor.submit(uow.run, action=action, scope=scope)] = uof_id
+                if len(running) == 0:
+                    break
+                done, not_done = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    uof_id = running.pop(future)
+                    if future.exception() is not None:
+                        logger.error('ExecutionPlan: UnitOfWork "{}" failed: {}'.format(uof_id, future.exception()))
+                        if failure is None:
+                            failure = future.exception()
+                        continue
+                    self.completed_work_ids.add(uof_id)
+                    for dependant_uow_id in dependants[uof_id]:
+                        pending_parents[dependant_uow_id].discard(uof_id)
+                        if len(pending_parents[dependant_uow_id]) == 0:
+                            ready.append(dependant_uow_id)
+                if failure is not None:
+                    ready.clear()
+        if failure is not None:
+            raise failure
+        not_run_ids = [uof_id for uof_id in planned_ids if uof_id not in self.completed_work_ids]
+        if len(not_run_ids) > 0:
+            raise Exception('ExecutionPlan: Units of work could not be scheduled because their dependencies never completed: {}'.format(not_run_ids))
+
+    def do_work(self, scope: str, action: str, max_workers: int=1):
+        """Run all units of work planned for the given action
+
+        Args:
+          scope: String with the current scope (environment)
+          action: String with the action, either `apply` or `delete`
+          max_workers: Integer with the number of units of work that may run at the same time. A value of 1 (the default) runs everything in the planned serial order.
+        """
+        if self.plan_is_stale is True or len(self.execution_order[action]) == 0:
+            self.calculate_execution_plan()
+            logger.info('ExecutionPlan: {}'.format(json.dumps(self.execution_order[action], default=str)))
+        logger.debug('ExecutionPlan: Starting run for action "%s" with %s worker(s)', action, max_workers)
+        if max_workers > 1:
+            self._do_work_concurrently(scope=scope, action=action, max_workers=max_workers)
+        else:
+            self._do_work_serially(scope=scope, action=action)
         self.execution_order[action] = list()
 
 
@@ -70,7 +70,7 @@ The following variables will be deleted:
             raise_exception_on_not_found=False
         ) is False:
 
-            self.log(message='Not Yet Validated', level='debug')
+            self.log_debug('Not Yet Validated')
 
             if 'promptText' not in self.spec:
                 self.spec['promptText'] = ''
@@ -135,10 +135,10 @@ The following variables will be deleted:
                 if isinstance(self.spec['maskInput'], bool) is False:
                     self.spec['maskInput'] = False
 
-            self.log(message='Spec Validated', level='debug')
+            self.log_debug('Spec Validated')
             variable_cache.store_variable(variable=Variable(name=self._var_name(var_name='VALIDATED'),initial_value=True), overwrite_existing=True)
         else:
-            self.log(message='Already Validated', level='debug')
+            self.log_debug('Already Validated')
 
     def implemented_manifest_differ_from_this_manifest(self)->bool:
         self._validate()
@@ -162,20 +162,20 @@ The following variables will be deleted:
                 return
 
         value = None
-        self.log(message='variable_cache={}'.format(str(variable_cache)), level='debug')
+        self.log_debug('variable_cache=%s', variable_cache)
 
         self.log(message='Getting value from USER', level='info')
-        self.log(message='spec={}'.format(self.spec), level='debug')
+        self.log_debug('spec=%s', self.spec)
         if self.spec['promptText'] is not None:
             print(self.spec['promptText'])
         if self.spec['maskInput'] is True:
             value = getpass(prompt=self.spec['promptCharacter'])
         else:
             value = input(self.spec['promptCharacter'])
-        self.log(message='value={}'.format(value), level='debug')
+        self.log_debug('value=%s', value)
         if value == '' and self.spec['convertEmptyInputToNone'] is True:
             value = None
-        self.log(message='value={}'.format(value), level='debug')
+        self.log_debug('value=%s', value)
 
         ttl = -1
         if self.spec['valueExpires'] is True:
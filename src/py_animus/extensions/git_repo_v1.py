@@ -11,6 +11,8 @@ from py_animus.models.extensions import ManifestBase
 from py_animus.helpers.file_io import *
 # from py_animus.manifest_management import *
 # from py_animus import get_logger, get_utc_timestamp
+from py_animus.utils.git_integration import git_clone, git_clone_host_limit
+from py_animus.helpers import git_remote_probe
 from git import Repo
 
 
@@ -26,6 +28,16 @@ This extension is useful for obtaining additional artifacts stored in a Git repo
 
 Clones (or pulls) from the remote Git repository to the local system
 
+When the `workDir` already contains a clone, the commit of the branch in the remote repository is looked up with
+`git ls-remote` first. Nothing else is done when the local branch is already at that commit. Otherwise the branch
+is fetched (with `options.depth`, if set) and the local branch is reset to it. Local changes are discarded.
+
+Clones run in the thread that processes the manifest, so `GitRepo` manifests only clone at the same time when
+manifests are processed concurrently (see the `--parallel-workers` command line option or the Project
+`parallelWorkers` spec field). With the default of 1 worker, repositories are cloned one after the other. When clones
+do overlap, at most 2 clones from the same host run at a time, while clones from different hosts are not held up.
+Clone progress is logged.
+
 # Delete Action
 
 Deletes the target directory containing the repository on the local system.
@@ -36,6 +48,7 @@ Deletes the target directory containing the repository on the local system.
 
 * `GIT_DIR` - Contains the location or directory of the cloned Git repository
 * `BRANCH` - The checked out branch
+* `COMMIT_SHA` - The commit checked out
 
 ## After Delete Action
 
@@ -43,6 +56,7 @@ The following variables will be deleted:
 
 * `GIT_DIR`
 * `BRANCH`
+* `COMMIT_SHA`
 
 ## Spec fields
 
@@ -56,6 +70,10 @@ The following variables will be deleted:
 | `workDir`                                            | str      | No       |                | If supplied, this directory will be used to clone the Git repository into. If not supplied, a random temporary directory will be created. The final value will be in the `GIT_DIR` variable.                                                                                                                                           |
 | `checkoutBranch`                                     | str      | No       |                | If supplied, this branch will be checked out. Default=main                                                                                                                                                                                                                                                                             |
 | `options.skipSslVerify`                              | bool     | No       | False          | If `authentication.type` is `http` and there is a need to skip SSL verification, set this to `true`. Default=false                                                                                                                                                                                                                     |
+| `options.depth`                                      | int      | No       |                | If supplied, create a shallow clone with the history truncated to this number of commits.                                                                                                                                                                                                                                              |
+| `options.singleBranch`                               | bool     | No       | False          | If `true`, only the history of the checked out branch is cloned.                                                                                                                                                                                                                                                                       |
+| `options.filter`                                     | str      | No       |                | If supplied, create a partial clone with this filter. For example, `blob:none` clones all commits and trees, but downloads file contents only when they are needed.                                                                                                                                                                 |
+| `options.useMirrorCache`                             | bool     | No       | True           | When the `--git-mirror-cache-dir` command line option is set, the clone borrows objects from a local mirror of the repository, which is refreshed with a `git fetch` once per run. Set to `false` to always clone from the remote only.                                                                                              |
         
     """
 
@@ -125,7 +143,8 @@ The following variables will be deleted:
         password: str,
         skip_ssl: bool,
         target_dir: str,
-        branch: str
+        branch: str,
+        clone_options: dict=None
     ):
         env = dict()
         if skip_ssl is True:
@@ -134,21 +153,70 @@ The following variables will be deleted:
             url_parts = url.split('/')
             url_parts[2] = '{}:{}@{}'.format(username,password,url_parts[2])
             url = '{}//{}'.format(url_parts[0], '/'.join(url_parts[2:]))
-        Repo.clone_from(url=url, to_path=target_dir, env=env, branch=branch)
+        if clone_options is None:
+            clone_options = dict()
+        git_clone_host_limit.run(
+            function=git_clone,
+            url=url,
+            target_dir=target_dir,
+            branch=branch,
+            env=env,
+            progress_callback=self._log_clone_progress,
+            **clone_options
+        )
 
     def _git_clone_from_ssh(
         self,
         url: str,
         private_key: str,
         target_dir: str,
-        branch: str
+        branch: str,
+        clone_options: dict=None
     ):
         env=dict(GIT_SSH_COMMAND='ssh -i {}'.format(private_key))
-        self.log(message='_git_clone_from_ssh(): url         = {}'.format( url         ), level='debug')
-        self.log(message='_git_clone_from_ssh(): private_key = {}'.format( private_key ), level='debug')
-        self.log(message='_git_clone_from_ssh(): target_dir  = {}'.format( target_dir  ), level='debug')
-        self.log(message='_git_clone_from_ssh(): branch      = {}'.format( branch      ), level='debug')
-        Repo.clone_from(url=url, to_path=target_dir, env=env, branch=branch)
+        self.log_debug('_git_clone_from_ssh(): url         = %s', url)
+        self.log_debug('_git_clone_from_ssh(): private_key = %s', private_key)
+        self.log_debug('_git_clone_from_ssh(): target_dir  = %s', target_dir)
+        self.log_debug('_git_clone_from_ssh(): branch      = %s', branch)
+        if clone_options is None:
+            clone_options = dict()
+        git_clone_host_limit.run(
+            function=git_clone,
+            url=url,
+            target_dir=target_dir,
+            branch=branch,
+            env=env,
+            progress_callback=self._log_clone_progress,
+            **clone_options
+        )
+
+    def _log_clone_progress(self, stage: str, cur_count: int, max_count: int, message: str):
+        if max_count:
+            self.log(message='Clone of "{}": {} {}% ({}/{})'.format(self.metadata['name'], stage, int(100 * float(cur_count) / float(max_count)), int(cur_count), int(max_count)), level='info')
+        else:
+            self.log(message='Clone of "{}": {} {}'.format(self.metadata['name'], stage, int(cur_count)), level='info')
+
+    def _get_clone_options(self)->dict:
+        clone_options = dict()
+        options = dict()
+        if 'options' in self.spec:
+            if isinstance(self.spec['options'], dict):
+                options = self.spec['options']
+        if options.get('depth') is not None:
+            clone_options['depth'] = int(options['depth'])
+        if 'singleBranch' in options:
+            clone_options['single_branch'] = '{}'.format(options['singleBranch']).lower().startswith('t')
+        if options.get('filter') is not None:
+            clone_options['clone_filter'] = '{}'.format(options['filter'])
+        if 'useMirrorCache' in options:
+            clone_options['use_mirror_cache'] = '{}'.format(options['useMirrorCache']).lower().startswith('t')
+        return clone_options
+
+    def _get_skip_ssl_verify(self)->bool:
+        if 'options' in self.spec:
+            if isinstance(self.spec['options'], dict):
+                return '{}'.format(self.spec['options'].get('skipSslVerify', False)).lower().startswith('t')
+        return False
 
     def _get_branch(self)->str:
         branch = 'main'
@@ -179,13 +247,14 @@ The following variables will be deleted:
             url=self.spec['cloneUrl'].lower(),
             username=username,
             password=password,
-            skip_ssl=False,
+            skip_ssl=self._get_skip_ssl_verify(),
             target_dir=variable_cache.get_value(
                 variable_name=self._var_name(var_name='GIT_DIR'),
                 raise_exception_on_expired=True,
                 raise_exception_on_not_found=True
             ),
-            branch=branch
+            branch=branch,
+            clone_options=self._get_clone_options()
         )
 
     def _process_other_git_repo(self, branch: str):
@@ -206,7 +275,8 @@ The following variables will be deleted:
                                 raise_exception_on_expired=True,
                                 raise_exception_on_not_found=True
                             ),
-                            branch=branch
+                            branch=branch,
+                            clone_options=self._get_clone_options()
                         )
                     else:
                         self.log(message='Failed to clone Git repo - ssh repo without a private key cannot currently be cloned', level='error')
@@ -217,6 +287,45 @@ The following variables will be deleted:
         else:
             self.log(message='Failed to clone Git repo - http not configured and unable to guess protocol and authentication method', level='error')
 
+    def _get_git_env(self)->dict:
+        env = dict()
+        if self.spec['cloneUrl'].lower().startswith('http') is True and self._get_skip_ssl_verify() is True:
+            env['GIT_SSL_NO_VERIFY'] = '1'
+        if 'authentication' in self.spec:
+            if 'type' in self.spec['authentication']:
+                if self.spec['authentication']['type'].lower().startswith('ssh') is True:
+                    try:
+                        env['GIT_SSH_COMMAND'] = 'ssh -i {}'.format(self.spec['authentication']['sshAuthentication']['sshPrivateKeyFile'])
+                    except:
+                        self.log(message='PRIVATE KEY NOT SET - Attempting to reach the repository anyway', level='warning')
+        return env
+
+    def _get_remote_branch_commit_sha(self, repo: Repo, branch: str, env: dict)->str:
+        remote_refs = git_remote_probe.get_remote_refs(url=repo.remotes.origin.url, env=env, allow_disk_cache=False)
+        if remote_refs is None:
+            raise Exception('Unable to list the branches of the remote repository')
+        if 'refs/heads/{}'.format(branch) not in remote_refs:
+            raise Exception('Branch "{}" not found in the remote repository'.format(branch))
+        return remote_refs['refs/heads/{}'.format(branch)]
+
+    def _get_local_branch_commit_sha(self, repo: Repo, branch: str)->str:
+        try:
+            if repo.head.is_detached is True or repo.active_branch.name != branch:
+                return None
+            return repo.head.commit.hexsha
+        except ValueError:
+            # Unborn branch without any commits
+            return None
+
+    def _fetch_and_reset(self, repo: Repo, branch: str, env: dict):
+        remote_ref = 'refs/remotes/origin/{}'.format(branch)
+        fetch_options = dict()
+        clone_options = self._get_clone_options()
+        if 'depth' in clone_options:
+            fetch_options['depth'] = clone_options['depth']
+        repo.git.fetch('origin', '+refs/heads/{}:{}'.format(branch, remote_ref), env=env, **fetch_options)
+        repo.git.checkout('-B', branch, remote_ref, force=True)
+
     def _process_git_pull(self):
         repo = Repo(
             variable_cache.get_value(
@@ -225,9 +334,30 @@ The following variables will be deleted:
                 raise_exception_on_not_found=True
             )
         )
-        o = repo.remotes.origin
-        o.pull()
-        repo.git.checkout(self._get_branch())
+        branch = self._get_branch()
+        env = self._get_git_env()
+        remote_commit_sha = self._get_remote_branch_commit_sha(repo=repo, branch=branch, env=env)
+        if self._get_local_branch_commit_sha(repo=repo, branch=branch) == remote_commit_sha:
+            self.log(message='Branch "{}" is up to date at commit {} - nothing to pull'.format(branch, remote_commit_sha), level='info')
+            return
+        self.log(message='Updating branch "{}" to commit {}'.format(branch, remote_commit_sha), level='info')
+        self._fetch_and_reset(repo=repo, branch=branch, env=env)
+
+    def _store_commit_sha(self):
+        repo = Repo(
+            variable_cache.get_value(
+                variable_name=self._var_name(var_name='GIT_DIR'),
+                raise_exception_on_expired=True,
+                raise_exception_on_not_found=True
+            )
+        )
+        variable_cache.store_variable(
+            variable=Variable(
+                name=self._var_name(var_name='COMMIT_SHA'),
+                initial_value=repo.head.commit.hexsha
+            ),
+            overwrite_existing=True
+        )
 
     def apply_manifest(self):
         self.log(message='APPLY CALLED', level='info')
@@ -287,6 +417,9 @@ The following variables will be deleted:
         elif 'Git Pull' in final_actions:
             self._process_git_pull()
 
+        if os.path.exists('{}{}.git'.format(work_dir, os.sep)) is True:
+            self._store_commit_sha()
+
         return
 
     def delete_manifest(self):
@@ -313,7 +446,6 @@ The following variables will be deleted:
                 
             if work_dir is not None:
                 delete_directory(dir=work_dir)
-                variable_cache.delete_variable(variable_name=self._var_name(var_name='GIT_DIR'))
-                variable_cache.delete_variable(variable_name=self._var_name(var_name='BRANCH'))
+                variable_cache.delete_all_variables_starting_with(start_str=self._var_name_prefix())
 
         return
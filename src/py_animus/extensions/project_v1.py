@@ -7,7 +7,6 @@
 """
 
 import os
-import importlib
 # from py_animus.animus_logging import logger
 from py_animus.models import Action, actions, variable_cache, Variable
 from py_animus.models.extensions import ManifestBase
@@ -29,10 +28,12 @@ class Project(ManifestBase):   # pragma: no cover
         | manifestFiles               | list    | Yes      | Empty list                                  | YAML files/URL's containing manifests to ingest. There must be at least ONE file/URL defined, even if it points to the same file/URL as this project manifest. |
         | extensionPaths              | list    | No       | Empty list                                  | Directories containing third party extensions to ingest                                                                                                        |
         | skipConfirmation            | bool    | No       | False                                       | If `False`, print the execution plan and prompt user to proceed.                                                                                               |
+        | parallelWorkers             | int     | No       | 1                                           | The number of manifests that may be processed at the same time once their dependencies are done. A value of 1 processes manifests in the serial plan order. (2) |
 
         Notes:
 
         1. Required in the list of dict objects when `parentProjects` is not an empty list.
+        2. The command line option `--parallel-workers=N` takes precedence over this value. Avoid values above 1 for projects with `CliInputPrompt` manifests that do not depend on each other, as prompts may then be interleaved.
     """
 
     def __init__(self, post_parsing_method: object=None, version: str='v1', supported_versions: tuple=('v1',)):
@@ -40,8 +41,6 @@ class Project(ManifestBase):   # pragma: no cover
         self.logger = animus_logger.logger
 
     def reset_logger(self):
-        self.logger = None
-        importlib.reload(animus_logger)
         self.logger = animus_logger.logger
         self.logger.debug('Logger reloaded')
 
@@ -11,10 +11,191 @@ from py_animus.models.extensions import ManifestBase
 import traceback
 import subprocess
 import tempfile
+import threading
+import collections
 import chardet
 import os
 
 
+OUTPUT_HEAD_BYTES = 1048576
+OUTPUT_TAIL_BYTES = 1048576
+OUTPUT_READ_CHUNK_BYTES = 65536
+OUTPUT_MAX_LINE_BYTES = 65536
+
+
+class OutputCapture:
+    """Captures one output stream of a process with bounded memory.
+
+    The first `head_bytes` and the last `tail_bytes` of the output are kept in memory. Output in between is dropped
+    and replaced by a marker with the number of bytes omitted. Optionally, the complete output is written to a spool
+    file, and every line is passed to a callback as it arrives.
+
+    Attributes:
+        head_bytes: The number of bytes kept from the start of the output
+        tail_bytes: The number of bytes kept from the end of the output
+        spool_file: The file the complete output is written to, or None
+        line_callback: Function called with every line (as a string) as it arrives, or None
+        total_bytes: The size of the complete output
+    """
+
+    def __init__(self, head_bytes: int=OUTPUT_HEAD_BYTES, tail_bytes: int=OUTPUT_TAIL_BYTES, spool_file: str=None, line_callback: object=None):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spool_file = spool_file
+        self.line_callback = line_callback
+        self.total_bytes = 0
+        self.head = bytearray()
+        self.tail = collections.deque()
+        self.tail_size = 0
+        self.partial_line = bytearray()
+        self.spool = None
+        if spool_file is not None:
+            self.spool = open(spool_file, 'wb')
+
+    def _emit_lines(self, data: bytes):
+        self.partial_line += data
+        while True:
+            newline_position = self.partial_line.find(b'\n')
+            if newline_position < 0:
+                break
+            self.line_callback(bytes(self.partial_line[0:newline_position]).decode('utf-8', errors='replace').rstrip('\r'))
+            del self.partial_line[0:newline_position+1]
+        if len(self.partial_line) > OUTPUT_MAX_LINE_BYTES:
+            self.line_callback(bytes(self.partial_line).decode('utf-8', errors='replace'))
+            self.partial_line = bytearray()
+
+    def write(self, data: bytes):
+        self.total_bytes += len(data)
+        if self.spool is not None:
+            self.spool.write(data)
+        if self.line_callback is not None:
+            self._emit_lines(data=data)
+        if len(self.head) < self.head_bytes:
+            head_size = self.head_bytes - len(self.head)
+            self.head += data[0:head_size]
+            data = data[head_size:]
+        if len(data) > 0 and self.tail_bytes > 0:
+            self.tail.append(data)
+            self.tail_size += len(data)
+            while self.tail_size - len(self.tail[0]) >= self.tail_bytes:
+                self.tail_size -= len(self.tail.popleft())
+
+    def read_from(self, pipe):
+        for data in iter(lambda: pipe.read(OUTPUT_READ_CHUNK_BYTES), b''):
+            self.write(data=data)
+
+    def close(self):
+        if self.line_callback is not None and len(self.partial_line) > 0:
+            self.line_callback(bytes(self.partial_line).decode('utf-8', errors='replace').rstrip('\r'))
+            self.partial_line = bytearray()
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
+    def get_parts(self)->tuple:
+        """Returns the kept output as a tuple of (head, omitted_bytes, tail)
+
+        When output was omitted, the head and the tail are trimmed to whole UTF-8 characters, so that a character is
+        never split at the point where output was left out. The trimmed bytes are added to `omitted_bytes`.
+        """
+        head = bytes(self.head)
+        tail = b''
+        if self.tail_bytes > 0:
+            tail = b''.join(self.tail)[-self.tail_bytes:]
+        omitted_bytes = self.total_bytes - len(head) - len(tail)
+        if omitted_bytes > 0:
+            head = _trim_partial_utf8_end(data=head)
+            tail = _trim_partial_utf8_start(data=tail)
+            omitted_bytes = self.total_bytes - len(head) - len(tail)
+        return (head, omitted_bytes, tail)
+
+    def get_value(self)->bytes:
+        """Returns the captured output, with a marker in place of the bytes that were not kept"""
+        head, omitted_bytes, tail = self.get_parts()
+        if omitted_bytes > 0:
+            return head + _omitted_marker(omitted_bytes=omitted_bytes).encode('utf-8') + tail
+        return head + tail
+
+    def get_text(self, encoding: str)->str:
+        """Returns the captured output decoded as text, with a marker in place of the bytes that were not kept
+
+        The head and the tail are decoded separately and the marker is added after decoding, so that the marker does
+        not end up in the middle of a multi byte character.
+
+        Args:
+          encoding: The encoding of the output
+
+        Returns:
+            The decoded output
+        """
+        head, omitted_bytes, tail = self.get_parts()
+        if omitted_bytes > 0:
+            return head.decode(encoding, errors='replace') + _omitted_marker(omitted_bytes=omitted_bytes) + tail.decode(encoding, errors='replace')
+        return (head + tail).decode(encoding)
+
+
+def _omitted_marker(omitted_bytes: int)->str:
+    return '\n[... {} bytes omitted ...]\n'.format(omitted_bytes)
+
+
+def _trim_partial_utf8_end(data: bytes)->bytes:
+    for position in range(len(data)-1, max(len(data)-4, 0)-1, -1):
+        byte = data[position]
+        if byte & 0xC0 == 0x80:
+            continue                                    # Continuation byte - keep looking for the lead byte
+        character_length = 1
+        if byte & 0xE0 == 0xC0:
+            character_length = 2
+        elif byte & 0xF0 == 0xE0:
+            character_length = 3
+        elif byte & 0xF8 == 0xF0:
+            character_length = 4
+        if position + character_length > len(data):
+            return data[0:position]
+        return data
+    return data
+
+
+def _trim_partial_utf8_start(data: bytes)->bytes:
+    position = 0
+    while position < min(len(data), 3) and data[position] & 0xC0 == 0x80:
+        position += 1
+    return data[position:]
+
+
+def run_with_output_capture(command: str, stdout_capture: OutputCapture, stderr_capture: OutputCapture)->subprocess.CompletedProcess:
+    """Runs a command and reads STDOUT and STDERR incrementally into the supplied captures
+
+    Args:
+      command: The command to run
+      stdout_capture: The OutputCapture for STDOUT
+      stderr_capture: The OutputCapture for STDERR
+
+    Returns:
+        A `subprocess.CompletedProcess` with the captured output
+
+    Raises:
+        subprocess.CalledProcessError: When the command returns a non-zero exit code
+    """
+    try:
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0) as process:
+            readers = [
+                threading.Thread(target=stdout_capture.read_from, args=(process.stdout,), daemon=True),
+                threading.Thread(target=stderr_capture.read_from, args=(process.stderr,), daemon=True),
+            ]
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+            return_code = process.wait()
+    finally:
+        stdout_capture.close()
+        stderr_capture.close()
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, command, output=stdout_capture.get_value(), stderr=stderr_capture.get_value())
+    return subprocess.CompletedProcess(command, return_code, stdout=stdout_capture.get_value(), stderr=stderr_capture.get_value())
+
+
 class ShellScript(ManifestBase):    # pragma: no cover    
     """# `ShellScript` Description
      
@@ -35,8 +216,10 @@ redirect a "delete" action to an "apply" action for this manifest.
 ## After Apply Action
 
 * `EXIT_CODE` - Contains the shell exit code
-* `STDOUT` - Output from STDOUT
-* `STDERR` - Output from STDERR
+* `STDOUT` - Output from STDOUT. Only the first `outputCapture.headBytes` and the last `outputCapture.tailBytes` are kept, with a marker showing how many bytes were left out in between.
+* `STDERR` - Output from STDERR, kept in the same way as `STDOUT`
+* `STDOUT_FILE` - The file with the complete output from STDOUT, if `outputCapture.spoolDir` is set
+* `STDERR_FILE` - The file with the complete output from STDERR, if `outputCapture.spoolDir` is set
 
 ## After Delete Action
 
@@ -55,6 +238,10 @@ No action is taken
 | `stripNewline`               |  bool    | No       | False                                       | Output may include newline or other line break characters. Setting this value to true will remove newline characters. Default=False                                                                                                             |
 | `convertRepeatingSpaces`     |  bool    | No       | False                                       | Output may contain more than one repeating space or tab characters. Setting this value to true will replace these with a single space. Default=False                                                                                            |
 | `stripLeadingTrailingSpaces` |  bool    | No       | False                                       | Output may contain more than one repeating space or tab characters. Setting this value to true will replace these with a single space. Default=False                                                                                            |
+| `outputCapture.headBytes`    |  int     | No       | 1048576                                     | The number of bytes kept from the start of STDOUT and of STDERR.                                                                                                                                                                                |
+| `outputCapture.tailBytes`    |  int     | No       | 1048576                                     | The number of bytes kept from the end of STDOUT and of STDERR.                                                                                                                                                                                  |
+| `outputCapture.spoolDir`     |  str     | No       |                                             | If supplied, the complete STDOUT and STDERR are written to the files `<metadata.name>.stdout` and `<metadata.name>.stderr` in this directory.                                                                                                   |
+| `outputCapture.logOutput`    |  bool    | No       | False                                       | If true, every line of STDOUT and STDERR is logged as it arrives.                                                                                                                                                                              |
 
     """
 
@@ -72,11 +259,11 @@ No action is taken
             raise_exception_on_expired=False,
             raise_exception_on_not_found=False
         )
-        self.log(message='      current_exit_code={}'.format(current_exit_code), level='debug')
+        self.log_debug('      current_exit_code=%s', current_exit_code)
         if current_exit_code is not None:
-            self.log(message='      returning False', level='debug')
+            self.log_debug('      returning False')
             return False
-        self.log(message='      returning True', level='debug')
+        self.log_debug('      returning True')
         return True
 
     def _id_source(self)->str:
@@ -99,7 +286,7 @@ No action is taken
         if 'source' in self.spec:
             if 'value' in self.spec['source']:
                 try:
-                    self.log(message='   Loading script source from file "{}"'.format(self.spec['source']['value']), level='debug')
+                    self.log_debug('   Loading script source from file "%s"', self.spec['source']['value'])
                     with open(self.spec['source']['value'], 'r') as f:
                         source = f.read()
                 except:
@@ -111,7 +298,7 @@ No action is taken
         if 'workDir' in self.spec:
             if 'path' in self.spec['workDir']:
                 work_dir = self.spec['workDir']['path']
-        self.log(message='   Workdir set to "{}"'.format(work_dir), level='debug')
+        self.log_debug('   Workdir set to "%s"', work_dir)
         return work_dir
 
     def _del_file(self, file: str):
@@ -126,12 +313,12 @@ No action is taken
             os.sep,
             self.metadata['name']
         )
-        self.log(message='   Writing source code to file "{}"'.format(work_file), level='debug')
+        self.log_debug('   Writing source code to file "%s"', work_file)
         self._del_file(file=work_file)
         try:
             with open(work_file, 'w') as f:
                 f.write(source)
-            self.log(message='      DONE', level='debug')
+            self.log_debug('      DONE')
         except:
             self.log(message='   EXCEPTION in _create_work_file(): {}'.format(traceback.format_exc()), level='error')
         return work_file
@@ -144,12 +331,41 @@ No action is taken
             pass
         return encoding
 
+    def _get_output_capture_option(self, option_name: str, default_value):
+        if 'outputCapture' in self.spec:
+            if isinstance(self.spec['outputCapture'], dict):
+                if self.spec['outputCapture'].get(option_name) is not None:
+                    return self.spec['outputCapture'][option_name]
+        return default_value
+
+    def _new_output_capture(self, stream_name: str)->OutputCapture:
+        spool_file = None
+        spool_dir = self._get_output_capture_option(option_name='spoolDir', default_value=None)
+        if spool_dir is not None:
+            spool_file = '{}{}{}.{}'.format(spool_dir, os.sep, self.metadata['name'], stream_name)
+            variable_cache.store_variable(
+                variable=Variable(
+                    name=self._var_name(var_name='{}_FILE'.format(stream_name.upper())),
+                    initial_value=spool_file
+                ),
+                overwrite_existing=True
+            )
+        line_callback = None
+        if '{}'.format(self._get_output_capture_option(option_name='logOutput', default_value=False)).lower().startswith('t'):
+            line_callback = lambda line: self.log(message='[{}] {}'.format(stream_name.upper(), line), level='info')
+        return OutputCapture(
+            head_bytes=int(self._get_output_capture_option(option_name='headBytes', default_value=OUTPUT_HEAD_BYTES)),
+            tail_bytes=int(self._get_output_capture_option(option_name='tailBytes', default_value=OUTPUT_TAIL_BYTES)),
+            spool_file=spool_file,
+            line_callback=line_callback
+        )
+
     def apply_manifest(self):
         self.log(message='APPLY CALLED', level='info')
             
         for action_name, expected_action in actions.get_action_values_for_manifest(manifest_kind=self.kind, manifest_name=self.metadata['name']).items():
             if action_name == 'Run ShellScript' and expected_action != Action.APPLY_PENDING:
-                self.log(message='   Apply action "{}" will not be done. Status: {}'.format(action_name, expected_action), level='debug')
+                self.log_debug('   Apply action "%s" will not be done. Status: %s', action_name, expected_action)
                 return
 
         ###
@@ -171,7 +387,7 @@ No action is taken
                 )
         else:
             script_source = self._load_source_from_file()
-        self.log(message='script_source:\n--------------------\n{}\n--------------------'.format(script_source), level='debug')
+        self.log_debug('script_source:\n--------------------\n%s\n--------------------', script_source)
         work_file = self._create_work_file(source=script_source)
 
         ###
@@ -180,12 +396,18 @@ No action is taken
         result = None
         try:
             os.chmod(work_file, 0o700)
-            result = subprocess.run('{}'.format(work_file), check=True, capture_output=True)   # Returns CompletedProcess
+            stdout_capture = self._new_output_capture(stream_name='stdout')
+            stderr_capture = self._new_output_capture(stream_name='stderr')
+            result = run_with_output_capture(
+                command='{}'.format(work_file),
+                stdout_capture=stdout_capture,
+                stderr_capture=stderr_capture
+            )   # Returns CompletedProcess
         except:
             self.log(message='   EXCEPTION in apply_manifest(): {}'.format(traceback.format_exc()), level='error')
-            self.log(message='   Storing Variables', level='debug')
+            self.log_debug('   Storing Variables')
             try:
-                self.log(message='      Storing Exit Code', level='debug')
+                self.log_debug('      Storing Exit Code')
                 variable_cache.store_variable(
                     variable=Variable(
                         name=self._var_name(var_name='EXIT_CODE'),
@@ -193,7 +415,7 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing STDOUT', level='debug')
+                self.log_debug('      Storing STDOUT')
                 variable_cache.store_variable(
                     variable=Variable(
                         name=self._var_name(var_name='STDOUT'),
@@ -201,7 +423,7 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing STDERR', level='debug')
+                self.log_debug('      Storing STDERR')
                 variable_cache.store_variable(
                     variable=Variable(
                         name=self._var_name(var_name='STDERR'),
@@ -209,7 +431,7 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing ALL DONE', level='debug')
+                self.log_debug('      Storing ALL DONE')
             except:
                 self.log(message='   EXCEPTION in apply_manifest() when storing variables: {}'.format(traceback.format_exc()), level='error')
 
@@ -217,11 +439,13 @@ No action is taken
         ### STORE VALUES
         ###
         if result is not None:
-            self.log(message='   Storing Variables', level='debug')
+            self.log_debug('   Storing Variables')
             try:
-                self.log(message='      Storing Exit Code', level='debug')
-                value_stdout_encoding = self.__detect_encoding(input_str=result.stdout)
-                value_stderr_encoding = self.__detect_encoding(input_str=result.stdout)
+                self.log_debug('      Storing Exit Code')
+                stdout_head, stdout_omitted_bytes, stdout_tail = stdout_capture.get_parts()
+                stderr_head, stderr_omitted_bytes, stderr_tail = stderr_capture.get_parts()
+                value_stdout_encoding = self.__detect_encoding(input_str=stdout_head + stdout_tail)
+                value_stderr_encoding = self.__detect_encoding(input_str=stderr_head + stderr_tail)
                 value_stdout_final = result.stdout
                 value_stderr_final = result.stderr
                 variable_cache.store_variable(
@@ -231,17 +455,17 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing STDOUT', level='debug')
+                self.log_debug('      Storing STDOUT')
 
                 if 'convertOutputToText' in self.spec:
-                    if self.spec['convertOutputToText'] is True:
+                    if '{}'.format(self.spec['convertOutputToText']).lower().startswith('t'):
                         if value_stdout_encoding is not None:
-                            value_stdout_final = value_stdout_final.decode(value_stdout_encoding)
+                            value_stdout_final = stdout_capture.get_text(encoding=value_stdout_encoding)
                         if value_stderr_encoding is not None:
-                            value_stderr_final = value_stderr_final.decode(value_stderr_encoding)
+                            value_stderr_final = stderr_capture.get_text(encoding=value_stderr_encoding)
 
                 if 'stripNewline' in self.spec:
-                    if self.spec['stripNewline'] is True:
+                    if '{}'.format(self.spec['stripNewline']).lower().startswith('t'):
                         try:
                             if value_stdout_final is not None:
                                 value_stdout_final = value_stdout_final.replace('\n', '')
@@ -254,7 +478,7 @@ No action is taken
                             self.log(message='Could not remove newline characters after "StripNewline" setting was set to True', level='warning')
 
                 if 'convertRepeatingSpaces' in self.spec:
-                    if self.spec['convertRepeatingSpaces'] is True:
+                    if '{}'.format(self.spec['convertRepeatingSpaces']).lower().startswith('t'):
                         try:
                             if value_stdout_final is not None:
                                 value_stdout_final = ' '.join(value_stdout_final.split())
@@ -265,7 +489,7 @@ No action is taken
                             self.log(message='Could not remove repeating whitespace characters after "ConvertRepeatingSpaces" setting was set to True', level='warning')
 
                 if 'stripLeadingTrailingSpaces' in self.spec:
-                    if self.spec['stripLeadingTrailingSpaces'] is True:
+                    if '{}'.format(self.spec['stripLeadingTrailingSpaces']).lower().startswith('t'):
                         try:
                             if value_stdout_final is not None:
                                 value_stdout_final = value_stdout_final.strip()
@@ -282,7 +506,7 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing STDERR', level='debug')
+                self.log_debug('      Storing STDERR')
                 variable_cache.store_variable(
                     variable=Variable(
                         name=self._var_name(var_name='STDERR'),
@@ -290,7 +514,7 @@ No action is taken
                     ),
                     overwrite_existing=True
                 )
-                self.log(message='      Storing ALL DONE', level='debug')
+                self.log_debug('      Storing ALL DONE')
             except:
                 self.log(message='   EXCEPTION in apply_manifest() when storing variables: {}'.format(traceback.format_exc()), level='error')
         return_code = variable_cache.get_value(variable_name=self._var_name(var_name='EXIT_CODE'), value_if_expired=None, default_value_if_not_found=None, raise_exception_on_expired=False, raise_exception_on_not_found=False)
@@ -313,7 +537,7 @@ No action is taken
 
         for action_name, expected_action in actions.get_action_values_for_manifest(manifest_kind=self.kind, manifest_name=self.metadata['name']).items():
             if action_name == 'Run ShellScript' and expected_action != Action.DELETE_PENDING:
-                self.log(message='   Apply action "{}" will not be done. Status: {}'.format(action_name, expected_action), level='debug')
+                self.log_debug('   Apply action "%s" will not be done. Status: %s', action_name, expected_action)
                 return
             
         self.log(message='Shell script does not have a specific delete action. If action is also required during delete actions, consider using the `metadata.actionOverrides` setting to redirect a "delete" action to an "apply" action for this manifest.', level='warning')
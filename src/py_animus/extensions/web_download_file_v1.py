@@ -1,14 +1,24 @@
 
 from py_animus.models import all_scoped_values, variable_cache, Action, actions, Variable
 from py_animus.models.extensions import ManifestBase
-from py_animus.helpers.file_io import get_file_size
+from py_animus.helpers.file_io import get_file_size, calculate_file_digest
+from py_animus.helpers.artifact_cache import artifact_cache
+from py_animus.utils.http_requests_io import get_http_session
 import traceback
 from pathlib import Path
 import requests
 from requests.auth import HTTPBasicAuth
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import json
+import hashlib
 import os
 
 
+LARGE_FILE_BYTES = 104857600                    # Anything larger than 100MiB is considered large and will be downloaded in chunks
+SEGMENT_STATE_SAVE_INTERVAL_BYTES = 8388608     # Save the progress of a segmented download after every 8MiB written
+
+
 class WebDownloadFile(ManifestBase):
     """# `WebDownloadFile` Description
      
@@ -28,6 +38,33 @@ Deletes the file as defined by the `targetOutputFile` parameter.
 
 * `FILE_PATH` - Contains the value of the `targetOutputFile` parameter
 * `STATUS` - Contains either the value `SUCCESS` or `FAIL`
+* `CONTENT_LENGTH` - The size of the remote file, as reported by the server
+* `ETAG` - The `ETag` header of the remote file, if the server supplied one
+* `LAST_MODIFIED` - The `Last-Modified` header of the remote file, if the server supplied one
+* `ACCEPT_RANGES` - The `Accept-Ranges` header of the remote file, if the server supplied one
+* `CHECKSUM` - The calculated checksum of the file, if `checksum` is set in the spec
+
+## Artifact Cache
+
+When `animus` is started with the `--artifact-cache-dir` option, downloaded files are kept in a content-addressed
+cache, keyed by the URL and the `ETag`/`Last-Modified` headers of the remote file. A following apply (of this or any
+other manifest) for the same unchanged remote file places the cached file at the `targetOutputFile` instead of
+downloading it again. Only `GET` requests without a body are cached, and only when the server supplies an `ETag` or
+`Last-Modified` header.
+
+## Checksum Verification
+
+When `checksum` is set in the spec, the checksum of the file is calculated while it is written and compared to
+`checksum.value`. On a mismatch the file is removed and the apply fails. When the target file already exists with
+the expected checksum, no download is done at all. Segmented downloads receive the segments out of order, and their
+checksum is calculated from the written file.
+
+## Segmented Downloads
+
+Files larger than 100MiB are downloaded in segments over `downloadConnections` connections when the server supports
+range requests. Progress is kept in `<targetOutputFile>.partial.json` next to the partially downloaded
+`<targetOutputFile>.partial` file. When a download is interrupted, the next apply resumes it, provided the server
+supplied an `ETag` or `Last-Modified` header that did not change.
 
 ## After Delete Action
 
@@ -49,7 +86,11 @@ Deletes the file as defined by the `targetOutputFile` parameter.
 | `method`                                         | string   | No       | `GET`         | The HTTP method to use                                                                                                                                              |
 | `body`                                           | string   | No       | NULL          | Some request types, like POST, requires a body with the data to send. Also remember to set additional headers like "Content Type" as required                       |
 | `httpBasicAuthentication.username`               | string   | No       | NULL          | If the remote site requires basic authentication, set the username using this field                                                                                 |
-| `httpBasicAuthentication.passwordVariableName`   | string   | No       | NULL          | Contains the `Variable`` name, depending on source manifest implementation, that will contain the password                                                          
+| `httpBasicAuthentication.passwordVariableName`   | string   | No       | NULL          | Contains the `Variable`` name, depending on source manifest implementation, that will contain the password                                                          |
+| `artifactCache`                                  | bool     | No       | True          | Set to false to never use the artifact cache for this manifest                                                                                                      |
+| `downloadConnections`                            | int      | No       | 4             | Files larger than 100MiB are downloaded over this many connections when the server supports range requests (`Accept-Ranges: bytes`). Set to 1 to use one connection |
+| `checksum.algorithm`                             | string   | No       | `sha256`      | The checksum algorithm: `sha256`, `sha512` or `md5`                                                                                                                 |
+| `checksum.value`                                 | string   | No       | NULL          | The expected checksum (hex digest) of the file. Required when `checksum` is set                                                                                    |
     """
 
     def __init__(self, post_parsing_method: object=None, version: str='v1', supported_versions: tuple=('v1',)):
@@ -57,20 +98,50 @@ Deletes the file as defined by the `targetOutputFile` parameter.
         self.extension_action_descriptions = (
             'Download File',
         )
+        self.download_hash = None
 
-    def _get_url_content_length(self, url: str)->dict:
+    def _get_url_headers(self, url: str)->dict:
         try:
             response = requests.head(url, allow_redirects=True)
-            self.log(message='Headers: {}'.format(response.headers), level='debug')
-            for header_name, header_value in response.headers.items():
-                if header_name.lower() == 'content-length':
-                    self.log(message='Content-Length: {}'.format(int(header_value)), level='info')
-                    return int(header_value)
+            self.log_debug('Headers: %s', response.headers)
+            return dict((header_name.lower(), header_value) for header_name, header_value in response.headers.items())
         except:
             self.log(message='EXCEPTION: {}'.format(traceback.format_exc()), level='error')
+        return dict()
+
+    def _get_url_content_length(self, url: str, headers: dict=None)->dict:
+        if headers is None:
+            headers = self._get_url_headers(url=url)
+        if 'content-length' in headers:
+            self.log(message='Content-Length: {}'.format(int(headers['content-length'])), level='info')
+            return int(headers['content-length'])
         # It may be impossible to get the initial length as we did not take into account proxy or authentication. In these cases assume a LARGE file
         return 999999999999
 
+    def _get_remote_validators(self)->dict:
+        validators = dict()
+        for variable_name, validator_name in (('ETAG', 'etag'), ('LAST_MODIFIED', 'last_modified'),):
+            validator_value = variable_cache.get_value(
+                variable_name=self._var_name(var_name=variable_name),
+                value_if_expired=None,
+                default_value_if_not_found=None,
+                raise_exception_on_expired=False,
+                raise_exception_on_not_found=False
+            )
+            if validator_value is not None:
+                validators[validator_name] = validator_value
+        if len(validators) > 0:
+            validators['content_length'] = variable_cache.get_value(variable_name=self._var_name(var_name='CONTENT_LENGTH'), raise_exception_on_not_found=False, default_value_if_not_found=None)
+        return validators
+
+    def _use_artifact_cache(self, http_method: str, use_body: bool)->bool:
+        if artifact_cache.is_enabled() is False:
+            return False
+        if 'artifactCache' in self.spec:
+            if '{}'.format(self.spec['artifactCache']).lower().startswith('f'):
+                return False
+        return http_method == 'GET' and use_body is False
+
     def _set_variables(self, all_ok: bool=True, deleted: bool=False):
         result_txt = 'SUCCESS'
         if all_ok is False:
@@ -98,16 +169,64 @@ Deletes the file as defined by the `targetOutputFile` parameter.
             overwrite_existing=True
         )
 
-    def implemented_manifest_differ_from_this_manifest(self)->bool:
-        remote_file_size = self._get_url_content_length(url=self.spec['sourceUrl'])
+    def _get_expected_checksum(self)->tuple:
+        if 'checksum' not in self.spec:
+            return None, None
+        checksum_algorithm = 'sha256'
+        if 'algorithm' in self.spec['checksum']:
+            checksum_algorithm = '{}'.format(self.spec['checksum']['algorithm']).lower()
+        if checksum_algorithm not in ('sha256', 'sha512', 'md5',):
+            raise Exception('Unsupported checksum algorithm "{}" - expected one of sha256, sha512 or md5'.format(checksum_algorithm))
+        if 'value' not in self.spec['checksum']:
+            raise Exception('The checksum value is required when a checksum is set')
+        return checksum_algorithm, '{}'.format(self.spec['checksum']['value']).strip().lower()
+
+    def _store_checksum(self, checksum: str):
         variable_cache.store_variable(
             variable=Variable(
-                name=self._var_name(var_name='CONTENT_LENGTH'),
-                initial_value=remote_file_size
+                name=self._var_name(var_name='CHECKSUM'),
+                initial_value=checksum
             ),
             overwrite_existing=True
         )
 
+    def _new_download_hash(self):
+        checksum_algorithm, expected_checksum = self._get_expected_checksum()
+        if checksum_algorithm is None:
+            return None
+        return hashlib.new(checksum_algorithm)
+
+    def _verify_download_hash(self, target_file: str):
+        checksum_algorithm, expected_checksum = self._get_expected_checksum()
+        if checksum_algorithm is None:
+            return
+        if self.download_hash is None:
+            self.log(message='   Calculating the {} checksum of "{}" from the written file'.format(checksum_algorithm, target_file), level='info')
+            checksum = calculate_file_digest(file_path=target_file, algorithm=checksum_algorithm)
+        else:
+            checksum = self.download_hash.hexdigest()
+        self._store_checksum(checksum=checksum)
+        if checksum != expected_checksum:
+            os.unlink(target_file)
+            raise Exception('The {} checksum of the downloaded file "{}" is "{}" but expected "{}" - file removed'.format(checksum_algorithm, target_file, checksum, expected_checksum))
+        self.log(message='   The {} checksum of "{}" matches'.format(checksum_algorithm, target_file), level='info')
+
+    def implemented_manifest_differ_from_this_manifest(self)->bool:
+        checksum_algorithm, expected_checksum = self._get_expected_checksum()
+        if checksum_algorithm is not None and os.path.isfile(self.spec['targetOutputFile']) is True:
+            local_checksum = calculate_file_digest(file_path=self.spec['targetOutputFile'], algorithm=checksum_algorithm)
+            if local_checksum == expected_checksum:
+                self.log(message='The {} checksum of the existing target file matches - no download required'.format(checksum_algorithm), level='info')
+                self._store_checksum(checksum=local_checksum)
+                return False
+            self.log(message='The {} checksum of the existing target file does not match'.format(checksum_algorithm), level='info')
+            remote_headers = self._get_url_headers(url=self.spec['sourceUrl'])
+            self._store_remote_headers(remote_headers=remote_headers)
+            return True
+
+        remote_headers = self._get_url_headers(url=self.spec['sourceUrl'])
+        remote_file_size = self._store_remote_headers(remote_headers=remote_headers)
+
         # Check if the local file exists:
         if os.path.exists(self.spec['targetOutputFile']) is True:
             if Path(self.spec['targetOutputFile']).is_file() is True:
@@ -121,6 +240,28 @@ Deletes the file as defined by the `targetOutputFile` parameter.
             return True
 
         return False
+
+    def _store_remote_headers(self, remote_headers: dict)->int:
+        remote_file_size = self._get_url_content_length(url=self.spec['sourceUrl'], headers=remote_headers)
+        variable_cache.store_variable(
+            variable=Variable(
+                name=self._var_name(var_name='CONTENT_LENGTH'),
+                initial_value=remote_file_size
+            ),
+            overwrite_existing=True
+        )
+        for variable_name, header_name in (('ETAG', 'etag'), ('LAST_MODIFIED', 'last-modified'), ('ACCEPT_RANGES', 'accept-ranges'),):
+            if header_name in remote_headers:
+                variable_cache.store_variable(
+                    variable=Variable(
+                        name=self._var_name(var_name=variable_name),
+                        initial_value=remote_headers[header_name]
+                    ),
+                    overwrite_existing=True
+                )
+            else:
+                variable_cache.delete_variable(variable_name=self._var_name(var_name=variable_name))
+        return remote_file_size
     
     def _build_proxy_dict(self, proxy_host: str, proxy_username: str, proxy_password: str)->dict:
         proxies = dict()
@@ -161,13 +302,15 @@ Deletes the file as defined by the `targetOutputFile` parameter.
         method: str,
         body: str
     )->bool:
-        self.log(message='Running Method "_get_data_basic_request"', level='debug')
+        self.log_debug('Running Method "_get_data_basic_request"')
         try:
             proxies=self._build_proxy_dict(proxy_host=proxy_host, proxy_username=proxy_username, proxy_password=proxy_password)
             auth = self._build_http_basic_auth_dict(username=username, password=password)
             r = requests.request(method=method, url=url, allow_redirects=True, verify=verify_ssl, proxies=proxies, auth=auth, headers=headers, data=body)
             with open(target_file, 'wb') as f:
                 f.write(r.content)
+            if self.download_hash is not None:
+                self.download_hash.update(r.content)
         except:
             self.log(message='EXCEPTION: {}'.format(traceback.format_exc()), level='error')
             return False
@@ -188,7 +331,7 @@ Deletes the file as defined by the `targetOutputFile` parameter.
         body: str
     )->bool:
         # Refer to https://stackoverflow.com/questions/16694907/download-large-file-in-python-with-requests
-        self.log(message='Running Method "_get_data_basic_request_stream"', level='debug')
+        self.log_debug('Running Method "_get_data_basic_request_stream"')
         try:
             proxies=self._build_proxy_dict(proxy_host=proxy_host, proxy_username=proxy_username, proxy_password=proxy_password)
             auth = self._build_http_basic_auth_dict(username=username, password=password)
@@ -197,9 +340,146 @@ Deletes the file as defined by the `targetOutputFile` parameter.
                 with open(target_file, 'wb') as f:
                     for chunk in r.iter_content(chunk_size=8192):
                         f.write(chunk)
+                        if self.download_hash is not None:
+                            self.download_hash.update(chunk)
+        except:
+            self.log(message='EXCEPTION: {}'.format(traceback.format_exc()), level='error')
+            return False
+        return True
+
+    def _get_download_connections(self)->int:
+        connections = 4
+        if 'downloadConnections' in self.spec:
+            try:
+                connections = int(self.spec['downloadConnections'])
+            except:
+                self.log(message='downloadConnections must be a number - using {} connections'.format(connections), level='warning')
+        return max(1, connections)
+
+    def _supports_segmented_download(self, http_method: str, use_body: bool, remote_file_size: int)->bool:
+        if hasattr(os, 'pwrite') is False:  # pragma: no cover
+            return False
+        if http_method != 'GET' or use_body is True or self._get_download_connections() < 2:
+            return False
+        accept_ranges = variable_cache.get_value(
+            variable_name=self._var_name(var_name='ACCEPT_RANGES'),
+            value_if_expired=None,
+            default_value_if_not_found=None,
+            raise_exception_on_expired=False,
+            raise_exception_on_not_found=False
+        )
+        if accept_ranges is None or accept_ranges.lower() != 'bytes':
+            return False
+        return remote_file_size != 999999999999
+
+    def _plan_segments(self, total_size: int, connections: int)->list:
+        segment_size = -(-total_size // connections)
+        segments = list()
+        for start in range(0, total_size, segment_size):
+            segments.append({'start': start, 'end': min(start + segment_size, total_size) - 1, 'done': 0})
+        return segments
+
+    def _load_segment_state(self, state_file: str, validators: dict)->list:
+        if os.path.exists(state_file) is False:
+            return None
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+        except:
+            return None
+        if len(validators) == 0 or state.get('validators') != validators:
+            self.log(message='   Remote file changed since the partial download - starting over', level='info')
+            return None
+        return state['segments']
+
+    def _save_segment_state(self, state_file: str, validators: dict, segments: list):
+        tmp_state_file = '{}.tmp'.format(state_file)
+        with open(tmp_state_file, 'w') as f:
+            json.dump({'validators': validators, 'segments': segments}, f)
+        os.replace(tmp_state_file, state_file)
+
+    def _get_data_segmented_request(
+        self,
+        url: str,
+        target_file: str,
+        verify_ssl: bool,
+        proxy_host: str,
+        proxy_username: str,
+        proxy_password: str,
+        username: str,
+        password: str,
+        headers: dict,
+        method: str,
+        body: str
+    )->bool:
+        """Downloads the file in segments over several connections, using HTTP range requests.
+
+        The file is first written to `<targetOutputFile>.partial`, which is allocated at the full size, with every
+        segment written at its own offset with `os.pwrite()`. The progress of every segment is kept in
+        `<targetOutputFile>.partial.json`, so that an interrupted download resumes where it stopped, provided the
+        `ETag`/`Last-Modified` of the remote file did not change.
+        """
+        self.log_debug('Running Method "_get_data_segmented_request"')
+        self.download_hash = None   # Segments arrive out of order - the checksum is calculated from the written file
+        partial_file = '{}.partial'.format(target_file)
+        state_file = '{}.partial.json'.format(target_file)
+        total_size = variable_cache.get_value(variable_name=self._var_name(var_name='CONTENT_LENGTH'))
+        validators = self._get_remote_validators()
+        segments = None
+        if os.path.exists(partial_file) is True and os.path.getsize(partial_file) == total_size:
+            segments = self._load_segment_state(state_file=state_file, validators=validators)
+        if segments is None:
+            segments = self._plan_segments(total_size=total_size, connections=self._get_download_connections())
+            with open(partial_file, 'wb') as f:
+                f.truncate(total_size)
+        else:
+            self.log(message='   Resuming partial download with {} of {} bytes done'.format(sum(segment['done'] for segment in segments), total_size), level='info')
+        state_lock = threading.Lock()
+        proxies = self._build_proxy_dict(proxy_host=proxy_host, proxy_username=proxy_username, proxy_password=proxy_password)
+        auth = self._build_http_basic_auth_dict(username=username, password=password)
+        fd = os.open(partial_file, os.O_RDWR)
+
+        def _download_segment(segment: dict):
+            offset = segment['start'] + segment['done']
+            if offset > segment['end']:
+                return
+            segment_headers = dict()
+            if headers is not None:
+                segment_headers.update(headers)
+            segment_headers['Range'] = 'bytes={}-{}'.format(offset, segment['end'])
+            unsaved_bytes = 0
+            with get_http_session().get(url, allow_redirects=True, verify=verify_ssl, proxies=proxies, auth=auth, headers=segment_headers, stream=True) as r:
+                if r.status_code != 206:
+                    raise Exception('Expected status 206 for a range request but got {}'.format(r.status_code))
+                for chunk in r.iter_content(chunk_size=65536):
+                    chunk = chunk[0:segment['end'] + 1 - offset]
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    unsaved_bytes += len(chunk)
+                    with state_lock:
+                        segment['done'] += len(chunk)
+                        if unsaved_bytes >= SEGMENT_STATE_SAVE_INTERVAL_BYTES:
+                            self._save_segment_state(state_file=state_file, validators=validators, segments=segments)
+                            unsaved_bytes = 0
+                    if offset > segment['end']:
+                        break
+            if offset <= segment['end']:
+                raise Exception('Segment {}-{} ended early at {}'.format(segment['start'], segment['end'], offset))
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix='animus-segment') as executor:
+                for future in [executor.submit(_download_segment, segment) for segment in segments]:
+                    future.result()
         except:
             self.log(message='EXCEPTION: {}'.format(traceback.format_exc()), level='error')
+            with state_lock:
+                self._save_segment_state(state_file=state_file, validators=validators, segments=segments)
             return False
+        finally:
+            os.close(fd)
+        os.replace(partial_file, target_file)
+        if os.path.exists(state_file):
+            os.unlink(state_file)
         return True
 
     def apply_manifest(self):
@@ -216,8 +496,8 @@ Deletes the file as defined by the `targetOutputFile` parameter.
 
         remote_file_size = variable_cache.get_value(variable_name=self._var_name(var_name='CONTENT_LENGTH'), raise_exception_on_expired=True, raise_exception_on_not_found=True, unresolved_variables_returns_original_reference=False)
         large_file = False
-        self.log(message='Checking if {} > 104857600...'.format(remote_file_size), level='info')
-        if remote_file_size > 104857600:   # Anything larger than 100MiB is considered large and will be downloaded in chunks
+        self.log(message='Checking if {} > {}...'.format(remote_file_size, LARGE_FILE_BYTES), level='info')
+        if remote_file_size > LARGE_FILE_BYTES:
             large_file = True
 
         use_ssl = False
@@ -302,7 +582,10 @@ Deletes the file as defined by the `targetOutputFile` parameter.
             if len(http_body) > 0:
                 use_body = True
 
+        segmented = large_file is True and self._supports_segmented_download(http_method=http_method, use_body=use_body, remote_file_size=remote_file_size)
+
         self.log(message='   * Large File                      : {}'.format(large_file), level='info')
+        self.log(message='   * Segmented Download              : {}'.format(segmented), level='info')
         self.log(message='   * Using SSL                       : {}'.format(use_ssl), level='info')
         if use_ssl:
             self.log(message='   * Skip SSL Verification           : {}'.format(not verify_ssl), level='info')
@@ -330,6 +613,7 @@ Deletes the file as defined by the `targetOutputFile` parameter.
 
         work_values = {
             'large_file': large_file,
+            'segmented': segmented,
             'verify_ssl': verify_ssl,
             'use_proxy': use_proxy,
             'use_proxy_authentication': use_proxy_authentication,
@@ -362,11 +646,29 @@ Deletes the file as defined by the `targetOutputFile` parameter.
             {
                 'values': {
                     'large_file': True,
+                    'segmented': False,
                 },
                 'method': self._get_data_basic_request_stream
             },
+            {
+                'values': {
+                    'large_file': True,
+                    'segmented': True,
+                },
+                'method': self._get_data_segmented_request
+            },
         ]
 
+        use_artifact_cache = self._use_artifact_cache(http_method=http_method, use_body=use_body)
+        remote_validators = self._get_remote_validators()
+        if use_artifact_cache is True and len(remote_validators) > 0:
+            if artifact_cache.get_file(url=url, validators=remote_validators, target_file=target_file) is True:
+                self.log(message='   Target file "{}" placed from the artifact cache'.format(target_file), level='info')
+                self.download_hash = None
+                self._verify_download_hash(target_file=target_file)
+                self._set_variables(all_ok=True, deleted=False)
+                return
+
         effective_method = None
         for scenario in download_scenarios:
             values = scenario['values']
@@ -382,8 +684,12 @@ Deletes the file as defined by the `targetOutputFile` parameter.
                 effective_method = scenario['method']
 
         if effective_method is not None:
+            self.download_hash = self._new_download_hash()
             result = effective_method(**parameters)
             if result is True:
+                self._verify_download_hash(target_file=target_file)
+                if use_artifact_cache is True and len(remote_validators) > 0:
+                    artifact_cache.add_file(url=url, validators=remote_validators, source_file=target_file)
                 self._set_variables(all_ok=True, deleted=False)
             else:
                 raise Exception('Failed to download "{}" to file "{}"'.format(url, target_file))
@@ -71,7 +71,22 @@ Spec fields:
             'Write File',
         )
 
+    def _target_file_matches_spec(self)->bool:
+        try:
+            with open(self.spec['targetFile'], 'r') as f:
+                if f.read() != self.spec['data']:
+                    return False
+        except:
+            return False
+        if 'fileMode' in self.spec:
+            if self.spec['fileMode'].lower().startswith('ex') and os.access(self.spec['targetFile'], os.X_OK) is False:
+                return False
+        return True
+
     def implemented_manifest_differ_from_this_manifest(self)->bool:
+        """The `WRITTEN` variable may be loaded from a state file of a previous run, so the target file itself is
+        checked: it must still exist, with the content of `spec.data` (and be executable if `fileMode` requires it).
+        """
         written_before = variable_cache.get_value(
             variable_name=self._var_name(var_name='WRITTEN'),
             value_if_expired=False,
@@ -86,14 +101,16 @@ Spec fields:
             if self.spec['actionIfFileAlreadyExists'].lower() in ('overwrite', 'skip',):
                 action_if_exists = self.spec['actionIfFileAlreadyExists'].lower()
 
-        if written_before is False:
-            if file_exists is True and action_if_exists == 'overwrite':
-                return True
+        if file_exists is False:
+            return True
 
-        if file_exists is False and written_before is False:
+        if action_if_exists == 'skip':
+            return False
+
+        if written_before is False:
             return True
 
-        return False
+        return self._target_file_matches_spec() is False
 
     def _set_variables(self):
         variable_cache.store_variable(
@@ -174,7 +191,6 @@ Spec fields:
         except:
             pass
 
-        for var_name in ('FILE_PATH', 'WRITTEN', 'EXECUTABLE', 'SIZE', 'SHA256_CHECKSUM',):
-            variable_cache.delete_variable(variable_name=self._var_name(var_name=var_name))    
+        variable_cache.delete_all_variables_starting_with(start_str=self._var_name_prefix())
 
         return
@@ -7,11 +7,18 @@
 """
 
 import os
+import json
+import time
+import hashlib
+import threading
 from datetime import datetime
 import traceback
 from git import cmd as git_cmd
 
 
+GIT_PROBE_CACHE_TTL_SECONDS = 600
+
+
 def get_utc_timestamp(with_decimal: bool=False): 
     epoch = datetime(1970,1,1,0,0,0)
     now = datetime.utcnow()
@@ -31,17 +38,118 @@ def is_debug_set_in_environment()->bool:    # pragma: no cover
     return False
 
 
+class GitRemoteProbe:
+    """Remembers the branches of remote Git repositories, so that a remote is queried at most once per run.
+
+    A remote is queried with `git ls-remote --heads`, which only lists branches (servers that support Git protocol
+    version 2 only send those). The result, a dictionary of branch refs (for example `refs/heads/main`) to commit
+    hashes, is kept for the rest of the run. A URL that is not a Git repository is remembered as None.
+
+    When a cache directory is configured, the branches of Git repositories are also kept on disk and reused by later
+    runs for `ttl_seconds`. Failed queries, which may be caused by a temporary network or authentication problem, are
+    only remembered for the current run.
+
+    Attributes:
+        cache_dir: The directory for results kept between runs, or None
+        ttl_seconds: The number of seconds a result on disk is reused
+        results: Dictionary of URL to a dictionary with the `refs`, the `timestamp` of the query and the `source`
+            (`remote` if the remote was queried in this run, or `disk`)
+    """
+
+    def __init__(self):
+        self.cache_dir = None
+        self.ttl_seconds = GIT_PROBE_CACHE_TTL_SECONDS
+        self.results = dict()
+        self.lock = threading.Lock()
+        self.url_locks = dict()
+
+    def configure(self, cache_dir: str=None, ttl_seconds: int=GIT_PROBE_CACHE_TTL_SECONDS):
+        with self.lock:
+            self.cache_dir = cache_dir
+            self.ttl_seconds = ttl_seconds
+            self.results = dict()
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+
+    def reset(self):
+        with self.lock:
+            self.results = dict()
+
+    def _get_url_lock(self, url: str)->threading.Lock:
+        with self.lock:
+            if url not in self.url_locks:
+                self.url_locks[url] = threading.Lock()
+            return self.url_locks[url]
+
+    def _cache_file(self, url: str)->str:
+        return '{}{}{}.json'.format(self.cache_dir, os.sep, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def _load_from_disk(self, url: str)->dict:
+        if self.cache_dir is None or os.path.exists(self._cache_file(url=url)) is False:
+            return None
+        try:
+            with open(self._cache_file(url=url), 'r') as f:
+                result = json.load(f)
+            if result['refs'] is None or time.time() - result['timestamp'] > self.ttl_seconds:
+                return None
+            result['source'] = 'disk'
+            return result
+        except Exception:
+            return None
+
+    def _save_to_disk(self, url: str, result: dict):
+        if self.cache_dir is None:
+            return
+        tmp_cache_file = '{}.{}.{}.tmp'.format(self._cache_file(url=url), os.getpid(), threading.get_ident())
+        with open(tmp_cache_file, 'w') as f:
+            json.dump({'refs': result['refs'], 'timestamp': result['timestamp']}, f)
+        os.replace(tmp_cache_file, self._cache_file(url=url))
+
+    def _query_remote(self, url: str, env: dict=None)->dict:
+        refs = None
+        try:
+            refs = dict()
+            g = git_cmd.Git()
+            for line in g.ls_remote('--heads', url, env=env).splitlines():
+                if '\t' in line:
+                    commit_hash, ref_name = line.split('\t', 1)
+                    refs[ref_name] = commit_hash
+        except:
+            traceback.print_exc()
+            refs = None
+        return {'refs': refs, 'timestamp': time.time(), 'source': 'remote'}
+
+    def get_remote_refs(self, url: str, env: dict=None, allow_disk_cache: bool=True)->dict:
+        """Returns the branches of a remote Git repository
+
+        Args:
+          url: The URL of the repository
+          env: Environment variables for Git, for example `GIT_SSH_COMMAND`
+          allow_disk_cache: Set to False to only use results obtained from the remote in this run, for example when
+            the current commit of a branch is needed
+
+        Returns:
+            A dictionary of branch refs to commit hashes, or None if the URL is not a Git repository
+        """
+        with self._get_url_lock(url=url):
+            result = self.results.get(url)
+            if result is not None and (allow_disk_cache is True or result['source'] == 'remote'):
+                return result['refs']
+            result = None
+            if allow_disk_cache is True:
+                result = self._load_from_disk(url=url)
+            if result is None:
+                result = self._query_remote(url=url, env=env)
+                if result['refs'] is not None:
+                    self._save_to_disk(url=url, result=result)
+            self.results[url] = result
+            return result['refs']
+
+
+git_remote_probe = GitRemoteProbe()
+
+
 def is_url_a_git_repo(url: str)->bool:
-    try:
-        if '%00' in url:
-            url = url[0:url.find('%00')]
-        remote_refs = {}
-        g = git_cmd.Git()
-        for ref in g.ls_remote(url).split('\n'):
-            hash_ref_list = ref.split('\t')
-            remote_refs[hash_ref_list[1]] = hash_ref_list[0]
-        if len(remote_refs) > 0:
-            return True
-    except:
-        traceback.print_exc()
-    return False
+    if '%00' in url:
+        url = url[0:url.find('%00')]
+    return git_remote_probe.get_remote_refs(url=url) is not None
@@ -0,0 +1,221 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from py_animus.animus_logging import logger
+
+try:    # pragma: no cover
+    import fcntl
+except ImportError: # pragma: no cover
+    fcntl = None
+
+
+FICLONE = 0x40049409    # Linux ioctl to create a copy-on-write clone (reflink) of a file
+
+
+def _reflink_file(source_file: str, target_file: str)->bool:
+    if fcntl is None:   # pragma: no cover
+        return False
+    try:
+        with open(source_file, 'rb') as source, open(target_file, 'wb') as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return True
+    except OSError:
+        if os.path.exists(target_file):
+            os.unlink(target_file)
+        return False
+
+
+def calculate_artifact_key(url: str, validators: dict)->str:
+    """Returns the cache key of a URL for the given validators (for example the `ETag` and `Last-Modified` headers)"""
+    key_data = json.dumps({'url': url, 'validators': validators}, sort_keys=True)
+    return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """A content-addressed cache of downloaded files, shared between manifests, projects and runs.
+
+    Every file is stored once, named after its SHA-256 digest, in the `objects` sub-directory of the cache directory.
+    An index (`index.json`) maps a key, calculated from the URL and the validators the server returned for it, to a
+    digest. Files are placed at their target with a reflink (copy-on-write clone) where the filesystem supports it,
+    optionally with a hardlink, and otherwise with a copy.
+
+    When a size limit is set, the least recently used files are removed until the cache fits in the limit.
+
+    Attributes:
+        cache_dir: The cache directory, or None when the cache is disabled
+        max_size_bytes: The size limit, or None for no limit
+        use_hardlinks: If True, files are hardlinked to their target. Note that the target and the cached file then
+            share the same content, and changing the target in place also changes the cached file.
+        index: Dictionary with the `keys` (key to digest) and `objects` (digest to size and last use time) of the cache
+    """
+
+    def __init__(self):
+        self.cache_dir = None
+        self.max_size_bytes = None
+        self.use_hardlinks = False
+        self.index = {'keys': dict(), 'objects': dict()}
+        self.lock = threading.RLock()
+
+    def configure(self, cache_dir: str=None, max_size_bytes: int=None, use_hardlinks: bool=False):
+        with self.lock:
+            self.cache_dir = cache_dir
+            self.max_size_bytes = max_size_bytes
+            self.use_hardlinks = use_hardlinks
+            self.index = {'keys': dict(), 'objects': dict()}
+            if cache_dir is not None:
+                os.makedirs('{}{}objects'.format(cache_dir, os.sep), exist_ok=True)
+                self._load_index()
+                logger.debug('Artifact cache in "%s" with %s objects', cache_dir, len(self.index['objects']))
+
+    def is_enabled(self)->bool:
+        return self.cache_dir is not None
+
+    def _index_file(self)->str:
+        return '{}{}index.json'.format(self.cache_dir, os.sep)
+
+    def _object_file(self, digest: str)->str:
+        return '{}{}objects{}{}'.format(self.cache_dir, os.sep, os.sep, digest)
+
+    def _load_index(self):
+        if os.path.exists(self._index_file()) is False:
+            return
+        try:
+            with open(self._index_file(), 'r') as f:
+                index = json.load(f)
+            if isinstance(index.get('keys'), dict) and isinstance(index.get('objects'), dict):
+                self.index = index
+        except Exception:
+            logger.warning('Ignoring unreadable artifact cache index "{}"'.format(self._index_file()))
+
+    def _save_index(self):
+        tmp_index_file = '{}.{}.tmp'.format(self._index_file(), os.getpid())
+        with open(tmp_index_file, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_index_file, self._index_file())
+
+    def _remove_object(self, digest: str):
+        object_file = self._object_file(digest=digest)
+        if os.path.exists(object_file):
+            os.unlink(object_file)
+        self.index['objects'].pop(digest, None)
+        for key in [key for key, key_digest in self.index['keys'].items() if key_digest == digest]:
+            self.index['keys'].pop(key)
+
+    def _place_file(self, source_file: str, target_file: str)->str:
+        if os.path.exists(target_file):
+            os.unlink(target_file)
+        if self.use_hardlinks is True:
+            try:
+                os.link(source_file, target_file)
+                return 'hardlink'
+            except OSError:
+                pass
+        if _reflink_file(source_file=source_file, target_file=target_file) is True:
+            return 'reflink'
+        shutil.copyfile(source_file, target_file)
+        return 'copy'
+
+    def get_file(self, url: str, validators: dict, target_file: str)->bool:
+        """Places the cached file for the URL and validators at `target_file`
+
+        Args:
+          url: The URL
+          validators: Dictionary of values that identify the version of the remote file, for example the `ETag`
+          target_file: The destination file
+
+        Returns:
+            True if the file was found in the cache and placed at `target_file`
+        """
+        if self.is_enabled() is False:
+            return False
+        key = calculate_artifact_key(url=url, validators=validators)
+        with self.lock:
+            digest = self.index['keys'].get(key)
+            if digest is None:
+                return False
+            object_file = self._object_file(digest=digest)
+            if os.path.exists(object_file) is False:
+                self._remove_object(digest=digest)
+                self._save_index()
+                return False
+            placement = self._place_file(source_file=object_file, target_file=target_file)
+            self.index['objects'][digest]['last_used'] = time.time()
+            self._save_index()
+        logger.debug('Artifact cache hit for "%s" (%s): placed "%s" with a %s', url, digest, target_file, placement)
+        return True
+
+    def add_file(self, url: str, validators: dict, source_file: str)->str:
+        """Adds a downloaded file to the cache
+
+        Args:
+          url: The URL the file was downloaded from
+          validators: Dictionary of values that identify the version of the remote file, for example the `ETag`
+          source_file: The downloaded file
+
+        Returns:
+            The SHA-256 digest of the file, or None if the cache is disabled or the file is larger than the size limit
+        """
+        if self.is_enabled() is False:
+            return None
+        size = os.path.getsize(source_file)
+        if self.max_size_bytes is not None and size > self.max_size_bytes:
+            logger.debug('File "%s" is larger than the artifact cache size limit - not cached', source_file)
+            return None
+        file_hash = hashlib.sha256()
+        with open(source_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(chunk)
+        digest = file_hash.hexdigest()
+        with self.lock:
+            object_file = self._object_file(digest=digest)
+            if os.path.exists(object_file) is False:
+                tmp_object_file = '{}.{}.tmp'.format(object_file, os.getpid())
+                if _reflink_file(source_file=source_file, target_file=tmp_object_file) is False:
+                    shutil.copyfile(source_file, tmp_object_file)
+                os.replace(tmp_object_file, object_file)
+            self.index['objects'][digest] = {'size': size, 'last_used': time.time()}
+            self.index['keys'][calculate_artifact_key(url=url, validators=validators)] = digest
+            self.evict()
+            self._save_index()
+        logger.debug('Added "%s" to the artifact cache as %s', url, digest)
+        return digest
+
+    def total_size(self)->int:
+        with self.lock:
+            return sum(object_data['size'] for object_data in self.index['objects'].values())
+
+    def evict(self)->int:
+        """Removes the least recently used files until the cache fits in `max_size_bytes`
+
+        Returns:
+            The number of files removed
+        """
+        if self.is_enabled() is False or self.max_size_bytes is None:
+            return 0
+        removed_count = 0
+        with self.lock:
+            total_size = self.total_size()
+            for digest, object_data in sorted(self.index['objects'].items(), key=lambda item: item[1]['last_used']):
+                if total_size <= self.max_size_bytes:
+                    break
+                self._remove_object(digest=digest)
+                total_size -= object_data['size']
+                removed_count += 1
+            if removed_count > 0:
+                self._save_index()
+        logger.debug('Evicted %s files from the artifact cache', removed_count)
+        return removed_count
+
+
+artifact_cache = ArtifactCache()
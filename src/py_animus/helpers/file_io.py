@@ -30,6 +30,7 @@ from py_animus.helpers.utils import generate_random_string
     | list_files                | List files in a given directory, optionally recursively                                                |
     | copy_file                 | Copy a file to a destination path, with options how to handle situations where the file already exists |
     | file_checksum             | Calculate the checksum of a given file                                                                 |
+    | calculate_file_digest     | Calculate the digest of a file of any size with any hashlib algorithm                                  |
 
 """
 
@@ -215,6 +216,27 @@ def calculate_file_checksum(file_path: str, checksum_algorithm: str='md5', _know
     return checksum
 
 
+def calculate_file_digest(file_path: str, algorithm: str='sha256', chunk_size: int=1048576)->str:
+    """Returns the hex digest of a file of any size, read in chunks
+
+    Args:
+        file_path: (required) string containing the path to a file
+        algorithm: (optional) any algorithm supported by `hashlib.new()`, for example 'md5', 'sha256' or 'sha512' (default='sha256')
+        chunk_size: (optional) the number of bytes to read at a time
+
+    Returns:
+        String with the hex digest of the file content
+
+    Raises:
+        Exception when the file cannot be read or the algorithm is not supported
+    """
+    file_hash = hashlib.new(algorithm.lower())
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
 def list_files(directory: str, recurse: bool=False, include_size: bool=False, calc_md5_checksum: bool=False, calc_sha256_checksum: bool=False, progress_callback_function: callable=None, result: dict=dict())->dict:
     """List all files in a directory.
 
@@ -0,0 +1,117 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import urllib.parse
+from git import Repo
+from py_animus.animus_logging import logger
+
+
+MIRROR_REFSPECS = ('+refs/heads/*:refs/heads/*', '+refs/tags/*:refs/tags/*')
+
+
+def remove_credentials_from_url(url: str)->str:
+    """Returns the URL without a `username:password@` part, so that it can be logged or used as a cache key"""
+    if '://' not in url:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    if '@' not in parts.netloc:
+        return url
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc.rsplit('@', 1)[1], parts.path, parts.query, parts.fragment))
+
+
+class GitMirrorCache:
+    """A local cache of bare mirrors of remote Git repositories.
+
+    New clones borrow objects from the mirror of their remote with `--reference` and `--dissociate`, so that only
+    objects missing from the mirror are transferred from the remote. The clone gets its own copy of the objects and
+    keeps working when the mirror is removed.
+
+    A mirror is created with the first clone of a repository and refreshed with a `git fetch` the first time it is used
+    in each run. Mirrors are named after a hash of the clone URL without credentials, and credentials are never stored
+    in the mirror configuration.
+
+    Attributes:
+        cache_dir: The directory holding the mirrors, or None when the cache is disabled
+        refreshed_mirrors: The mirror directories already fetched in this run
+    """
+
+    def __init__(self):
+        self.cache_dir = None
+        self.refreshed_mirrors = set()
+        self.lock = threading.Lock()
+        self.mirror_locks = dict()
+
+    def configure(self, cache_dir: str=None):
+        with self.lock:
+            self.cache_dir = cache_dir
+            self.refreshed_mirrors = set()
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                logger.debug('Git mirror cache in "%s"', cache_dir)
+
+    def is_enabled(self)->bool:
+        return self.cache_dir is not None
+
+    def get_mirror_dir(self, url: str)->str:
+        return '{}{}{}.git'.format(
+            self.cache_dir,
+            os.sep,
+            hashlib.sha256(remove_credentials_from_url(url=url).encode('utf-8')).hexdigest()
+        )
+
+    def _get_mirror_lock(self, mirror_dir: str)->threading.Lock:
+        with self.lock:
+            if mirror_dir not in self.mirror_locks:
+                self.mirror_locks[mirror_dir] = threading.Lock()
+            return self.mirror_locks[mirror_dir]
+
+    def _fetch(self, mirror_dir: str, url: str, env: dict):
+        Repo(mirror_dir).git.fetch(url, *MIRROR_REFSPECS, prune=True, quiet=True, env=env)
+
+    def get_mirror(self, url: str, env: dict=None)->str:
+        """Creates or refreshes the mirror of a remote repository
+
+        Args:
+          url: The clone URL
+          env: Environment variables for Git, for example `GIT_SSH_COMMAND`
+
+        Returns:
+            The mirror directory, or None if the cache is disabled or the mirror could not be created or refreshed
+        """
+        if self.is_enabled() is False:
+            return None
+        mirror_dir = self.get_mirror_dir(url=url)
+        with self._get_mirror_lock(mirror_dir=mirror_dir):
+            if mirror_dir in self.refreshed_mirrors:
+                return mirror_dir
+            try:
+                if os.path.exists(mirror_dir) is True:
+                    logger.debug('Refreshing Git mirror "%s" of "%s"', mirror_dir, remove_credentials_from_url(url=url))
+                    self._fetch(mirror_dir=mirror_dir, url=url, env=env)
+                else:
+                    logger.debug('Creating Git mirror "%s" of "%s"', mirror_dir, remove_credentials_from_url(url=url))
+                    tmp_mirror_dir = '{}.{}.tmp'.format(mirror_dir, os.getpid())
+                    shutil.rmtree(tmp_mirror_dir, ignore_errors=True)
+                    Repo.init(tmp_mirror_dir, bare=True)
+                    try:
+                        self._fetch(mirror_dir=tmp_mirror_dir, url=url, env=env)
+                        os.replace(tmp_mirror_dir, mirror_dir)
+                    finally:
+                        shutil.rmtree(tmp_mirror_dir, ignore_errors=True)
+            except Exception as e:
+                logger.warning('Git mirror of "{}" not available ({}) - cloning without it'.format(remove_credentials_from_url(url=url), type(e).__name__))
+                return None
+            self.refreshed_mirrors.add(mirror_dir)
+        return mirror_dir
+
+
+git_mirror_cache = GitMirrorCache()
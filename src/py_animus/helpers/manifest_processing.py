@@ -11,11 +11,14 @@ import sys
 import importlib
 import os
 import inspect
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
-from py_animus.animus_logging import logger
+from py_animus.animus_logging import logger, is_debug_enabled
 from py_animus.models import all_scoped_values, variable_cache, scope, ScopedValues, Value, actions, Variable
 from py_animus.helpers.file_io import file_exists
-from py_animus.helpers.yaml_helper import spit_yaml_text_from_file_with_multiple_yaml_sections, load_from_str_and_ignore_custom_tags, parse_animus_formatted_yaml
+from py_animus.helpers.yaml_helper import parse_animus_formatted_yaml, resolve_deferred_tags, yaml_parse_cache
 from py_animus.utils.http_requests_io import download_files
 from py_animus.extensions import UnitOfWork, execution_plan, extensions
 
@@ -40,6 +43,9 @@ class ProjectExecutionTracker:
 
 tracker = ProjectExecutionTracker()
 
+MANIFEST_INGESTION_WORKERS = 8
+MANIFEST_PROCESS_POOL_MIN_BYTES = 4 * 1024 * 1024
+
 
 def _parse_values_data(manifest_data: dict):
     converted_data = dict((k.lower(),v) for k,v in manifest_data.items()) # Convert keys to lowercase
@@ -71,7 +77,7 @@ def _parse_values_data(manifest_data: dict):
 def _process_values_sections(manifest_yaml_sections: dict)->dict:
     if 'Values' in manifest_yaml_sections:
         for value_manifest_section_text in manifest_yaml_sections['Values']:
-            _parse_values_data(manifest_data=load_from_str_and_ignore_custom_tags(value_manifest_section_text)['part_1'])
+            _parse_values_data(manifest_data=resolve_deferred_tags(data=yaml_parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=value_manifest_section_text), ignore_tags=True))
         manifest_yaml_sections.pop('Values')
     return manifest_yaml_sections
 
@@ -106,9 +112,30 @@ def _process_logging_sections(manifest_yaml_sections: dict)->dict:
     return manifest_yaml_sections
 
 
+def _get_parallel_workers(project_spec: dict)->int:
+    parallel_workers = variable_cache.get_value(
+        variable_name='std::parallel-workers',
+        value_if_expired=None,
+        default_value_if_not_found=None,
+        raise_exception_on_expired=False,
+        raise_exception_on_not_found=False
+    )
+    if parallel_workers is None:
+        if 'parallelWorkers' in project_spec:
+            parallel_workers = project_spec['parallelWorkers']
+    try:
+        parallel_workers = int(parallel_workers)
+    except:
+        parallel_workers = 1
+    if parallel_workers < 1:
+        logger.warning('Parallel workers must be at least 1 - falling back to serial execution')
+        parallel_workers = 1
+    return parallel_workers
+
+
 def convert_yaml_to_extension_instances(yaml_sections: dict=None):
     for manifest_kind, manifest_yaml_string in yaml_sections.items():
-        logger.debug('Converting raw yaml with kind "{}"'.format(manifest_kind))
+        logger.debug('Converting raw yaml with kind "%s"', manifest_kind)
         if manifest_kind != 'Project' and manifest_kind != 'Values' and manifest_kind.endswith('Logging') is False:
             for yaml_section in manifest_yaml_string:
                 work_instance = parse_animus_formatted_yaml(raw_yaml_str=yaml_section)
@@ -128,17 +155,202 @@ def convert_yaml_to_extension_instances(yaml_sections: dict=None):
                     )
 
 
-def extract_yaml_section_from_supplied_manifest_file(manifest_uri: str)->dict:
+class ManifestFilePrefetcher:
+    """Downloads remote manifest files concurrently before they are needed.
+
+    Attributes:
+        local_files: Dictionary of URL to the local file it was downloaded to
+    """
+
+    def __init__(self):
+        self.local_files = dict()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.local_files = dict()
+
+    def get_local_file(self, manifest_uri: str)->str:
+        with self.lock:
+            return self.local_files.get(manifest_uri)
+
+    def _download(self, url: str):
+        try:
+            files = download_files(urls=[url,])
+        except Exception:
+            logger.warning('Prefetch of "{}" failed - it will be retried when needed'.format(url))
+            return
+        if len(files) > 0:
+            with self.lock:
+                self.local_files[url] = files[0]
+
+    def prefetch(self, manifest_uris: list, max_workers: int=MANIFEST_INGESTION_WORKERS)->int:
+        """Downloads the URLs in `manifest_uris` that were not yet downloaded. Local paths are ignored.
+
+        Args:
+          manifest_uris: List of manifest file paths or URLs
+          max_workers: The maximum number of downloads at the same time
+
+        Returns:
+            The number of URLs downloaded
+        """
+        urls = list()
+        for manifest_uri in manifest_uris:
+            if manifest_uri.lower().startswith('http') and manifest_uri not in urls and self.get_local_file(manifest_uri=manifest_uri) is None:
+                urls.append(manifest_uri)
+        if len(urls) == 0:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))), thread_name_prefix='animus-prefetch') as executor:
+            list(executor.map(self._download, urls))
+        logger.debug('Prefetched %s URLs', len(urls))
+        return len(urls)
+
+
+manifest_file_prefetcher = ManifestFilePrefetcher()
+
+
+def _get_local_manifest_file(manifest_uri: str)->str:
     final_manifest_file_to_parse = '{}'.format(manifest_uri)
-    if manifest_uri.lower().startswith('http'):
+    prefetched_file = manifest_file_prefetcher.get_local_file(manifest_uri=manifest_uri)
+    if prefetched_file is not None:
+        final_manifest_file_to_parse = prefetched_file
+    elif manifest_uri.lower().startswith('http'):
         files = download_files(urls=[manifest_uri,])
         if len(files) > 0:
             final_manifest_file_to_parse = files[0]
 
     if file_exists(final_manifest_file_to_parse) is False:
         raise Exception('Manifest file "{}" does not exist!'.format(final_manifest_file_to_parse))
-    
-    return spit_yaml_text_from_file_with_multiple_yaml_sections(yaml_text=final_manifest_file_to_parse)
+    return final_manifest_file_to_parse
+
+
+def extract_yaml_section_from_supplied_manifest_file(manifest_uri: str)->dict:
+    return yaml_parse_cache.get_yaml_sections_from_file(file_path=_get_local_manifest_file(manifest_uri=manifest_uri))
+
+
+def merge_yaml_sections(all_yaml_sections: list)->dict:
+    """Merges the YAML sections of several files in one pass, keeping the sections of every file.
+
+    Args:
+      all_yaml_sections: List of dictionaries of kind to a list of section text, in file order
+
+    Returns:
+        A dictionary of kind to the combined list of section text of that kind
+    """
+    merged_yaml_sections = dict()
+    for yaml_sections in all_yaml_sections:
+        for kind, section_texts in yaml_sections.items():
+            if kind not in merged_yaml_sections:
+                merged_yaml_sections[kind] = list()
+            merged_yaml_sections[kind].extend(section_texts)
+    return merged_yaml_sections
+
+
+def load_manifest_files(manifest_uris: list, max_workers: int=MANIFEST_INGESTION_WORKERS)->dict:
+    """Fetches, splits and loads several manifest files (or URLs) and merges their YAML sections.
+
+    URLs are downloaded concurrently in a thread pool. When the files together are at least
+    `MANIFEST_PROCESS_POOL_MIN_BYTES` and more than one CPU is available, the YAML sections not yet in the parse cache
+    are loaded in a process pool.
+
+    Args:
+      manifest_uris: List of manifest file paths or URLs
+      max_workers: The maximum number of downloads, or processes, at the same time
+
+    Returns:
+        A dictionary of kind to the combined list of section text of that kind, in the order of `manifest_uris`
+    """
+    if len(manifest_uris) == 0:
+        return dict()
+    max_workers = max(1, min(max_workers, len(manifest_uris)))
+    remote_uri_count = len([manifest_uri for manifest_uri in manifest_uris if manifest_uri.lower().startswith('http')])
+    if max_workers > 1 and remote_uri_count > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='animus-ingest') as executor:
+            local_files = list(executor.map(_get_local_manifest_file, manifest_uris))
+    else:
+        local_files = [_get_local_manifest_file(manifest_uri=manifest_uri) for manifest_uri in manifest_uris]
+
+    process_pool = None
+    process_count = min(max_workers, os.cpu_count() or 1)
+    if process_count > 1 and sum(os.path.getsize(local_file) for local_file in local_files) >= MANIFEST_PROCESS_POOL_MIN_BYTES:
+        process_pool = ProcessPoolExecutor(max_workers=process_count, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        all_yaml_sections = yaml_parse_cache.get_yaml_sections_from_files(file_paths=local_files, process_pool=process_pool)
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    logger.debug('Loaded %s manifest files (%s remote)', len(manifest_uris), remote_uri_count)
+    return merge_yaml_sections(all_yaml_sections=all_yaml_sections)
+
+
+def _get_project_references(project_data: dict)->tuple:
+    parent_projects = list()
+    manifest_uris = list()
+    spec = project_data.get('spec')
+    if isinstance(spec, dict) is False:
+        return parent_projects, manifest_uris
+    if isinstance(spec.get('parentProjects'), list):
+        for parent_project_data in spec['parentProjects']:
+            if isinstance(parent_project_data, dict) and isinstance(parent_project_data.get('name'), str) and isinstance(parent_project_data.get('path'), str):
+                parent_projects.append((parent_project_data['path'], parent_project_data['name']))
+    for spec_field in ('valuesConfig', 'manifestFiles',):
+        if isinstance(spec.get(spec_field), list):
+            manifest_uris += [manifest_uri for manifest_uri in spec[spec_field] if isinstance(manifest_uri, str)]
+    if isinstance(spec.get('loggingConfig'), str):
+        manifest_uris.append(spec['loggingConfig'])
+    return parent_projects, manifest_uris
+
+
+def prefetch_project_manifest_files(project_manifest_uri: str, project_name: str, max_workers: int=MANIFEST_INGESTION_WORKERS)->int:
+    """Discovers all manifest files referenced by a project and its parent projects and prefetches the remote ones.
+
+    The project tree is walked one level at a time. All project files of a level, together with the `valuesConfig`,
+    `loggingConfig` and `manifestFiles` URIs of the level above, are downloaded concurrently. Values using tags are
+    not followed. Any problem is left to be reported by `process_project()`.
+
+    Args:
+      project_manifest_uri: The path or URL of the manifest file with the starting project
+      project_name: The name of the starting project
+      max_workers: The maximum number of downloads at the same time
+
+    Returns:
+        The number of URLs downloaded
+    """
+    download_count = 0
+    processed_projects = list()
+    pending_projects = [(project_manifest_uri, project_name),]
+    pending_manifest_uris = list()
+    while len(pending_projects) > 0 or len(pending_manifest_uris) > 0:
+        download_count += manifest_file_prefetcher.prefetch(
+            manifest_uris=[manifest_uri for manifest_uri, name in pending_projects] + pending_manifest_uris,
+            max_workers=max_workers
+        )
+        next_pending_projects = list()
+        pending_manifest_uris = list()
+        for manifest_uri, name in pending_projects:
+            if (manifest_uri, name) in processed_projects:
+                continue
+            processed_projects.append((manifest_uri, name))
+            try:
+                yaml_sections = extract_yaml_section_from_supplied_manifest_file(manifest_uri=manifest_uri)
+            except Exception:
+                logger.debug('Project file "%s" could not be read during prefetch', manifest_uri)
+                continue
+            for section_text in yaml_sections.get('Project', list()):
+                try:
+                    project_data = yaml_parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=section_text)
+                except Exception:
+                    continue
+                if isinstance(project_data, dict) is False or isinstance(project_data.get('metadata'), dict) is False:
+                    continue
+                if project_data['metadata'].get('name') != name:
+                    continue
+                parent_projects, manifest_uris = _get_project_references(project_data=project_data)
+                next_pending_projects += parent_projects
+                pending_manifest_uris += manifest_uris
+        pending_projects = next_pending_projects
+    logger.info('Prefetched {} remote manifest files'.format(download_count))
+    return download_count
 
 
 def get_modules_in_package(files: list):
@@ -205,15 +417,15 @@ def process_project(project_manifest_uri: str, project_name: str):
             project_instance.determine_actions()
 
             # Process values
-            logger.debug('Values processing for project "{}" starting'.format(project_instance.metadata['name']))
+            logger.debug('Values processing for project "%s" starting', project_instance.metadata['name'])
             if 'valuesConfig' in project_instance.spec:
                 for values_config_uri in project_instance.spec['valuesConfig']:
                     potential_values_yaml_sections = extract_yaml_section_from_supplied_manifest_file(manifest_uri=values_config_uri)
                     _process_values_sections(manifest_yaml_sections=potential_values_yaml_sections)
-            logger.debug('   Values processing for project "{}" completed'.format(project_instance.metadata['name']))
+            logger.debug('   Values processing for project "%s" completed', project_instance.metadata['name'])
 
             # Process logging
-            logger.debug('Logging processing for project "{}" starting'.format(project_instance.metadata['name']))
+            logger.debug('Logging processing for project "%s" starting', project_instance.metadata['name'])
             logging_manifest = variable_cache.get_value(
                 variable_name='LOGGING_CONFIG',
                 value_if_expired=None,
@@ -225,10 +437,10 @@ def process_project(project_manifest_uri: str, project_name: str):
                 potential_logging_yaml_sections = extract_yaml_section_from_supplied_manifest_file(manifest_uri=logging_manifest)
                 _process_logging_sections(manifest_yaml_sections=potential_logging_yaml_sections)
                 project_instance.reset_logger()
-            logger.debug('   Logging processing for project "{}" completed'.format(project_instance.metadata['name']))
+            logger.debug('   Logging processing for project "%s" completed', project_instance.metadata['name'])
 
             # Load Extensions
-            logger.debug('Extensions processing for project "{}" starting'.format(project_instance.metadata['name']))
+            logger.debug('Extensions processing for project "%s" starting', project_instance.metadata['name'])
             project_instance.collect_extension_files()
             extension_files = variable_cache.get_value(
                 variable_name='{}PROJECT_EXTENSION_FILES'.format(project_instance_variables_base_name),
@@ -241,18 +453,16 @@ def process_project(project_manifest_uri: str, project_name: str):
                 extensions.add_extension(extension=returned_class)
                 logger.info('Added extension kind "{}"'.format(kind))
             
-            logger.debug('   Extensions processing for project "{}" completed'.format(project_instance.metadata['name']))
-            logger.debug('Extensions Ingested: {}'.format(str(extensions)))
+            logger.debug('   Extensions processing for project "%s" completed', project_instance.metadata['name'])
+            logger.debug('Extensions Ingested: %s', extensions)
 
             # Load manifest files and parse sections.
-            logger.debug('Manifest processing for project "{}" starting'.format(project_instance.metadata['name']))
-            combined_project_manifest_sections = dict()
+            logger.debug('Manifest processing for project "%s" starting', project_instance.metadata['name'])
             final_combined_project_manifest_sections = dict()
-            for project_manifest_file_or_url in project_instance.spec['manifestFiles']:
-                combined_project_manifest_sections = {**combined_project_manifest_sections, **extract_yaml_section_from_supplied_manifest_file(manifest_uri=project_manifest_file_or_url)}
+            combined_project_manifest_sections = load_manifest_files(manifest_uris=project_instance.spec['manifestFiles'])
             for section_name, section_data in combined_project_manifest_sections.items():
                 if section_name != 'Project' and section_name != 'Values' and section_name.endswith('Logging') is False:
-                    final_combined_project_manifest_sections[section_name] = copy.deepcopy(section_data)
+                    final_combined_project_manifest_sections[section_name] = section_data
 
             # Add sections to execution plan
             convert_yaml_to_extension_instances(yaml_sections=final_combined_project_manifest_sections)
@@ -262,12 +472,10 @@ def process_project(project_manifest_uri: str, project_name: str):
             # The idea now is that the project extension sets various variables for next actions
             # execution_plan.do_work(scope=scope.value, action=actions.command)
             if actions.command == 'apply':
-                project_instance.metadata = project_instance.resolve_all_pending_variables(iterable=copy.deepcopy(project_instance.metadata))
-                project_instance.spec = project_instance.resolve_all_pending_variables(iterable=copy.deepcopy(project_instance.spec))
+                project_instance.resolve_manifest_variables()
                 project_instance.apply_manifest()
             elif actions.command == 'delete':
-                project_instance.metadata = project_instance.resolve_all_pending_variables(iterable=copy.deepcopy(project_instance.metadata))
-                project_instance.spec = project_instance.resolve_all_pending_variables(iterable=copy.deepcopy(project_instance.spec))
+                project_instance.resolve_manifest_variables()
                 project_instance.delete_manifest()
             else:
                 raise Exception('Unrecognized Command "{}" - expected either "apply" or "delete"'.format(actions.command))
@@ -297,12 +505,13 @@ def process_project(project_manifest_uri: str, project_name: str):
             else:
                 logger.info('   User confirmation NOT required')
 
-            execution_plan.do_work(scope=scope.value, action=actions.command)
+            execution_plan.do_work(scope=scope.value, action=actions.command, max_workers=_get_parallel_workers(project_spec=project_instance.spec))
             
-            logger.debug('   Manifest processing for project "{}" completed'.format(project_instance.metadata['name']))
+            logger.debug('   Manifest processing for project "%s" completed', project_instance.metadata['name'])
             
-            project_instance_variable_names = variable_cache.get_all_variable_names_staring_with(project_instance_variables_base_name)
-            logger.debug('Collected variable names: {}'.format(project_instance_variable_names))
+            if is_debug_enabled() is True:
+                project_instance_variable_names = variable_cache.get_all_variable_names_staring_with(project_instance_variables_base_name)
+                logger.debug('Collected variable names: %s', project_instance_variable_names)
         else:
             logger.info('Project "{}" not in scope for processing'.format(project_instance.metadata['name']))
     return
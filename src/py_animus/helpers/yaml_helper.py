@@ -8,9 +8,13 @@ import yaml
 import traceback
 import copy
 import re
+import os
+import hashlib
+import pickle
+import threading
 from py_animus.models import VariableCache, AllScopedValues, all_scoped_values, variable_cache, scope
 from py_animus.models.extensions import ManifestBase
-from py_animus.animus_logging import logger
+from py_animus.animus_logging import logger, is_debug_enabled
 from py_animus.extensions import extensions
 
 try:    # pragma: no cover
@@ -18,6 +22,11 @@ try:    # pragma: no cover
 except ImportError: # pragma: no cover
     from yaml import Loader, Dumper
 
+try:    # pragma: no cover
+    from yaml import CSafeLoader as BaseSafeLoader
+except ImportError: # pragma: no cover
+    from yaml import SafeLoader as BaseSafeLoader
+
 
 #######################################################################################################################
 ###                                                                                                                 ###
@@ -133,26 +142,55 @@ def add_new_yaml_section_to_yaml_sections(yaml_sections: dict, section_text: str
         if kind not in yaml_sections:
             yaml_sections[kind] = list()
         yaml_sections[kind].append(section_text)
-    return copy.deepcopy(yaml_sections)
+    return yaml_sections
+
+
+def iter_yaml_sections_from_file(file_path: str):
+    """Reads a file with one or more YAML sections (separated by lines starting with `---`) and yields each section
+    as soon as it is complete.
+
+    The file is read line by line through a buffered reader and each section is joined once, so the time is linear
+    in the file size and only one section is kept in memory at a time.
+
+    Args:
+      file_path: Path to the YAML file
+
+    Yields:
+        A tuple `(kind, text, byte_offset)` for every non-empty section, where `byte_offset` is the offset in the file
+        of the first line of the section text.
+    """
+    lines = list()
+    kind = None
+    section_offset = 0
+    offset = 0
+    with open(file_path, 'rb') as f:
+        for raw_line in f:
+            line_offset = offset
+            offset += len(raw_line)
+            if raw_line.startswith(b'---'):  # YAML Section start
+                if len(lines) > 0:
+                    yield kind if kind is not None else 'unknown', '\n'.join(lines), section_offset
+                lines = list()
+                kind = None
+                continue
+            line = raw_line.decode('utf-8').replace('\n', '').replace('\r', '')
+            if len(lines) == 0:
+                if len(line) == 0:
+                    continue    # Leading empty lines are not part of the section text
+                section_offset = line_offset
+            if kind is None and line.lower().startswith('kind:'):
+                kind = line.split(':')[1].strip()
+            lines.append(line)
+    if len(lines) > 0:
+        yield kind if kind is not None else 'unknown', '\n'.join(lines), section_offset
 
 
 def spit_yaml_text_from_file_with_multiple_yaml_sections(yaml_text: str)->dict:
     yaml_sections = dict()  # index is the "kind" each section, with the value a list of manifests of that kind
-    section_text = ''
-    with open(yaml_text, 'r') as f:
-        for line in f:
-            if line.startswith('---'):  # YAML Section start
-                yaml_sections = add_new_yaml_section_to_yaml_sections(yaml_sections=copy.deepcopy(yaml_sections), section_text=section_text)
-                section_text = ''
-            else:
-                line = line.replace('\n', '')
-                line = line.replace('\r', '')
-                if len(section_text) > 0:    
-                    section_text = '{}\n{}'.format(section_text, line)
-                else:
-                    section_text = '{}'.format(line)
-    if len(section_text) > 0:
-        yaml_sections = add_new_yaml_section_to_yaml_sections(yaml_sections=copy.deepcopy(yaml_sections), section_text=section_text)
+    for kind, section_text, byte_offset in iter_yaml_sections_from_file(file_path=yaml_text):
+        if kind not in yaml_sections:
+            yaml_sections[kind] = list()
+        yaml_sections[kind].append(section_text)
     return yaml_sections
 
 
@@ -241,7 +279,9 @@ class ValuePlaceHolders:
             default_value_when_not_found: object='',
             raise_exception_when_not_found: bool=False
         ):
-        logger.debug('Parsing for placeholders. input_str="{}"'.format(input_str))
+        debug_enabled = is_debug_enabled()
+        if debug_enabled is True:
+            logger.debug('Parsing for placeholders. input_str="%s"', input_str)
         return_str = copy.deepcopy(input_str)
         if input_str.find('{}{}'.format('$', '{')) >= 0:
             for matched_placeholder in re.findall('\$\{([\w|\s|\-|\_|\.|\:]+)\}', input_str):
@@ -252,15 +292,18 @@ class ValuePlaceHolders:
                     default_value_when_not_found=default_value_when_not_found,
                     raise_exception_when_not_found=raise_exception_when_not_found
                 )
-                logger.debug('(pre) val type={}'.format(type(val)))
+                if debug_enabled is True:
+                    logger.debug('(pre) val type=%s', type(val))
                 if val is None:
                     val = ''
                     logger.warning('NoneType detected')
                 if isinstance(val, str) is False:
                     val = '{}'.format(str(val))
-                logger.debug('val={}   type={}'.format(val, type(val)))
+                if debug_enabled is True:
+                    logger.debug('val=%s   type=%s', val, type(val))
                 return_str = return_str.replace('{}{}{}{}'.format('$', '{', matched_placeholder, '}'),val)
-        logger.debug('   return_str="{}'.format(return_str))
+        if debug_enabled is True:
+            logger.debug('   return_str="%s', return_str)
         return return_str
 
 
@@ -323,12 +366,8 @@ class VariableTag(yaml.YAMLObject):
 
 
 def parse_sub_yaml(raw_yaml_str: str)->dict:
-    logger.debug('Parsing input YAML: {}'.format(raw_yaml_str))
-    yaml.SafeLoader.add_constructor(        '!Value',       ValueTag.from_yaml      )
-    yaml.SafeLoader.add_constructor(        '!Variable',    VariableTag.from_yaml   )
-    yaml.SafeDumper.add_multi_representer(  ValueTag,       ValueTag.to_yaml        )
-    yaml.SafeDumper.add_multi_representer(  VariableTag,    VariableTag.to_yaml     )
-    manifest_data = yaml.safe_load(raw_yaml_str)
+    logger.debug('Parsing input YAML: %s', raw_yaml_str)
+    manifest_data = yaml.load(raw_yaml_str, Loader=AnimusSafeLoader)
     # converted_data = dict((k.lower(),v) for k,v in manifest_data.items()) # Convert keys to lowercase
     return manifest_data
 
@@ -369,7 +408,7 @@ class SubTag(yaml.YAMLObject):
                     value_placeholders.add_environment_value(placeholder_name=yaml_key, value=parsed_value)
         # self.resolved_value = value_placeholders.parse_and_replace_placeholders_in_string(input_str=main_line, default_value_when_not_found=None, raise_exception_when_not_found=True)
         self.resolved_value = value_placeholders.parse_and_replace_placeholders_in_string(input_str=main_line, default_value_when_not_found='', raise_exception_when_not_found=False)
-        logger.debug('resolved_value={}'.format(self.resolved_value))
+        logger.debug('resolved_value=%s', self.resolved_value)
         
 
     def __repr__(self):
@@ -387,22 +426,323 @@ class SubTag(yaml.YAMLObject):
         return dumper.represent_scalar(cls.yaml_tag, data.value_reference)
 
 
+class AnimusSafeLoader(BaseSafeLoader):
+    """A safe YAML loader with the `!Value`, `!Variable` and `!Sub` tags registered.
+
+    The libyaml based `CSafeLoader` is used when PyYAML was built with libyaml, otherwise the pure Python `SafeLoader`.
+    """
+    pass
+
+
+AnimusSafeLoader.add_constructor(       '!Value',       ValueTag.from_yaml      )
+AnimusSafeLoader.add_constructor(       '!Variable',    VariableTag.from_yaml   )
+AnimusSafeLoader.add_constructor(       '!Sub',         SubTag.from_yaml        )
+
+yaml.SafeDumper.add_multi_representer(  ValueTag,       ValueTag.to_yaml        )
+yaml.SafeDumper.add_multi_representer(  VariableTag,    VariableTag.to_yaml     )
+yaml.SafeDumper.add_multi_representer(  SubTag,         SubTag.to_yaml          )
+
+
+#######################################################################################################################
+###                                                                                                                 ###
+###                                         P A R S E    C A C H E                                                  ###
+###                                                                                                                 ###
+#######################################################################################################################
+
+
+PARSE_CACHE_FORMAT = 1
+
+
+def _get_py_animus_version()->str:
+    try:
+        from importlib.metadata import version
+        return version('py_animus')
+    except Exception:   # pragma: no cover
+        return 'unknown'
+
+
+def _get_parse_cache_code_hash()->str:
+    """Returns a hash of this module, which defines the loader and the tag classes of cached documents. The package
+    version alone is not enough, as it is missing (or does not change) when running from a source checkout."""
+    with open(os.path.realpath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[0:16]
+
+
+class DeferredTag:
+    """Stands in for a `!Value`, `!Variable` or `!Sub` tag in a cached YAML document.
+
+    The tag is only turned into a `ValueTag`, `VariableTag` or `SubTag` (and therefore resolved against the current
+    scope and variables) by `resolve_deferred_tags()`, which keeps cached documents valid across scopes.
+
+    Attributes:
+        tag: The YAML tag, for example `!Value`
+        value: The node value as supplied to the tag class `from_yaml()` method
+    """
+
+    def __init__(self, tag: str, value: object):
+        self.tag = tag
+        self.value = value
+
+    @classmethod
+    def from_yaml(cls, loader, node):
+        return DeferredTag(tag=node.tag, value=node.value)
+
+
+class DeferredTagLoader(BaseSafeLoader):
+    """A safe YAML loader that keeps `!Value`, `!Variable` and `!Sub` tags as `DeferredTag` instances"""
+    pass
+
+
+DeferredTagLoader.add_constructor(      '!Value',       DeferredTag.from_yaml   )
+DeferredTagLoader.add_constructor(      '!Variable',    DeferredTag.from_yaml   )
+DeferredTagLoader.add_constructor(      '!Sub',         DeferredTag.from_yaml   )
+
+
+def _plain_node_value(node: object)->object:
+    if isinstance(node, yaml.MappingNode):
+        return dict((_plain_node_value(node=key_node), _plain_node_value(node=value_node)) for key_node, value_node in node.value)
+    if isinstance(node, yaml.SequenceNode):
+        return [_plain_node_value(node=item_node) for item_node in node.value]
+    if isinstance(node, yaml.Node):
+        return node.value
+    return node
+
+
+def load_yaml_sections_with_deferred_tags(section_texts: list)->list:
+    """Loads each section text with `DeferredTagLoader`.
+
+    This is a module level function so that it can also be run in a process pool.
+
+    Args:
+      section_texts: List of YAML section text
+
+    Returns:
+        A list with the loaded document of each section, or None for a section that failed to load
+    """
+    documents = list()
+    for section_text in section_texts:
+        try:
+            documents.append(yaml.load(section_text, Loader=DeferredTagLoader))
+        except Exception:
+            documents.append(None)
+    return documents
+
+
+def resolve_deferred_tags(data: object, ignore_tags: bool=False)->object:
+    """Returns a copy of a document loaded with `DeferredTagLoader` with every `DeferredTag` resolved.
+
+    Args:
+      data: The document, as returned by `YamlParseCache.load_yaml_with_deferred_tags()`. It is not modified.
+      ignore_tags: If True, tags are replaced by their plain (unresolved) value instead of a resolved tag instance
+
+    Returns:
+        The resolved document
+    """
+    if isinstance(data, dict):
+        return dict((key, resolve_deferred_tags(data=value, ignore_tags=ignore_tags)) for key, value in data.items())
+    if isinstance(data, list):
+        return [resolve_deferred_tags(data=item, ignore_tags=ignore_tags) for item in data]
+    if isinstance(data, DeferredTag):
+        if ignore_tags is True:
+            return _plain_node_value(node=data.value)
+        if data.tag == '!Value':
+            return ValueTag(data.value)
+        if data.tag == '!Variable':
+            return VariableTag(data.value)
+        return SubTag(data.value)
+    return data
+
+
+class YamlParseCache:
+    """Caches split and parsed manifest files, keyed by a hash of the content and the py-animus version.
+
+    Files are split into YAML sections and every section is loaded with `DeferredTagLoader`. Tags are resolved only
+    when a document is used, so the same cached document can be used for any scope.
+
+    The cache is kept in memory for the run. When a cache directory is set with `enable_disk_cache()`, the sections
+    and documents of each file are also pickled to the directory, so that unchanged files are not split or parsed
+    again in the next run.
+
+    Attributes:
+        file_sections: Dictionary of file content hash to the YAML sections of the file (kind to list of text)
+        documents: Dictionary of section text hash to the document loaded with `DeferredTagLoader`
+        cache_dir: The directory for the on disk cache, or None if only the memory cache is used
+        version_key: Mixed into every hash so that cache entries of other versions (or of changed code) are never used
+        hits: Count of files and sections found in the cache
+        misses: Count of files and sections that had to be split or parsed
+        process_pool_min_sections: The minimum number of sections in a file before a supplied process pool is used
+    """
+
+    def __init__(self):
+        self.file_sections = dict()
+        self.documents = dict()
+        self.cache_dir = None
+        self.version_key = '{}:{}:{}:{}'.format(_get_py_animus_version(), _get_parse_cache_code_hash(), yaml.__version__, PARSE_CACHE_FORMAT)
+        self.hits = 0
+        self.misses = 0
+        self.process_pool_min_sections = 400
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.file_sections = dict()
+            self.documents = dict()
+            self.hits = 0
+            self.misses = 0
+
+    def enable_disk_cache(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        logger.debug('Parse cache directory set to "%s"', cache_dir)
+
+    def disable_disk_cache(self):
+        self.cache_dir = None
+
+    def _hash_text(self, text: str)->str:
+        return hashlib.sha256('{}\n{}'.format(self.version_key, text).encode('utf-8')).hexdigest()
+
+    def _hash_file(self, file_path: str)->str:
+        file_hash = hashlib.sha256(self.version_key.encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def _load_from_disk(self, file_hash: str)->dict:
+        if self.cache_dir is None:
+            return None
+        cache_file = '{}{}{}.pickle'.format(self.cache_dir, os.sep, file_hash)
+        if os.path.exists(cache_file) is False:
+            return None
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            logger.warning('Ignoring unreadable parse cache file "{}"'.format(cache_file))
+            return None
+
+    def _save_to_disk(self, file_hash: str, cache_entry: dict):
+        if self.cache_dir is None:
+            return
+        cache_file = '{}{}{}.pickle'.format(self.cache_dir, os.sep, file_hash)
+        tmp_cache_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        try:
+            with open(tmp_cache_file, 'wb') as f:
+                pickle.dump(cache_entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_cache_file, cache_file)
+        except Exception:   # pragma: no cover
+            logger.warning('Failed to write parse cache file "{}"'.format(cache_file))
+
+    def _load_documents(self, section_texts: list, process_pool: object=None)->list:
+        if process_pool is not None and len(section_texts) >= self.process_pool_min_sections:
+            chunk_size = max(1, self.process_pool_min_sections // 4)
+            chunks = [section_texts[i:i+chunk_size] for i in range(0, len(section_texts), chunk_size)]
+            return [document for chunk_documents in process_pool.map(load_yaml_sections_with_deferred_tags, chunks) for document in chunk_documents]
+        return load_yaml_sections_with_deferred_tags(section_texts=section_texts)
+
+    def get_yaml_sections_from_files(self, file_paths: list, process_pool: object=None)->list:
+        """Returns the YAML sections of each file, as `spit_yaml_text_from_file_with_multiple_yaml_sections()` would.
+
+        Files not found in the cache are split and every section is loaded, so that later calls to
+        `load_yaml_with_deferred_tags()` for these sections are cache hits. Sections that fail to load are left to
+        fail again when they are used.
+
+        Args:
+          file_paths: List of paths to YAML files
+          process_pool: An optional `concurrent.futures.ProcessPoolExecutor`. When supplied and at least
+            `process_pool_min_sections` sections must be loaded, the sections are loaded in the pool
+
+        Returns:
+            A list with, for every file, a new dictionary of kind to a list of section text, which the caller may
+            modify
+        """
+        all_yaml_sections = list()
+        missed_files = list()
+        for file_path in file_paths:
+            file_hash = self._hash_file(file_path=file_path)
+            with self.lock:
+                yaml_sections = self.file_sections.get(file_hash)
+            if yaml_sections is None:
+                cache_entry = self._load_from_disk(file_hash=file_hash)
+                if cache_entry is None:
+                    yaml_sections = spit_yaml_text_from_file_with_multiple_yaml_sections(yaml_text=file_path)
+                    missed_files.append((file_hash, yaml_sections))
+                    with self.lock:
+                        self.misses += 1
+                    logger.debug('Parse cache miss for file "%s"', file_path)
+                else:
+                    yaml_sections = cache_entry['sections']
+                    with self.lock:
+                        self.file_sections[file_hash] = yaml_sections
+                        self.documents.update(cache_entry['documents'])
+                        self.hits += 1
+                    logger.debug('Parse cache hit on disk for file "%s"', file_path)
+            else:
+                with self.lock:
+                    self.hits += 1
+                logger.debug('Parse cache hit for file "%s"', file_path)
+            all_yaml_sections.append(yaml_sections)
+
+        if len(missed_files) > 0:
+            section_texts = [section_text for file_hash, yaml_sections in missed_files for kind_section_texts in yaml_sections.values() for section_text in kind_section_texts]
+            loaded_documents = iter(self._load_documents(section_texts=section_texts, process_pool=process_pool))
+            for file_hash, yaml_sections in missed_files:
+                documents = dict()
+                for kind_section_texts in yaml_sections.values():
+                    for section_text in kind_section_texts:
+                        document = next(loaded_documents)
+                        if document is None:
+                            logger.debug('Section could not be loaded - not cached: %s', section_text)
+                            continue
+                        documents[self._hash_text(text=section_text)] = document
+                self._save_to_disk(file_hash=file_hash, cache_entry={'sections': yaml_sections, 'documents': documents})
+                with self.lock:
+                    self.file_sections[file_hash] = yaml_sections
+                    self.documents.update(documents)
+
+        return [dict((kind, list(section_texts)) for kind, section_texts in yaml_sections.items()) for yaml_sections in all_yaml_sections]
+
+    def get_yaml_sections_from_file(self, file_path: str, process_pool: object=None)->dict:
+        """Returns the YAML sections of a single file. See `get_yaml_sections_from_files()`"""
+        return self.get_yaml_sections_from_files(file_paths=[file_path,], process_pool=process_pool)[0]
+
+    def load_yaml_with_deferred_tags(self, raw_yaml_str: str)->object:
+        """Returns the document loaded from the text with `DeferredTagLoader`.
+
+        The returned document is shared with the cache and must not be modified. Use `resolve_deferred_tags()` to
+        get a resolved copy.
+
+        Args:
+          raw_yaml_str: The YAML text of a single section
+
+        Returns:
+            The loaded document
+        """
+        text_hash = self._hash_text(text=raw_yaml_str)
+        with self.lock:
+            data = self.documents.get(text_hash)
+        if data is None:
+            data = yaml.load(raw_yaml_str, Loader=DeferredTagLoader)
+            with self.lock:
+                self.documents[text_hash] = data
+                self.misses += 1
+        else:
+            with self.lock:
+                self.hits += 1
+        return data
+
+
+yaml_parse_cache = YamlParseCache()
+
+
 def parse_animus_formatted_yaml(raw_yaml_str: str)->ManifestBase:
     IGNORED_KINDS = (
         'Values',   # These manifests should by now already be parsed...
     )
 
-    logger.debug('Parsing input YAML: {}'.format(raw_yaml_str))
+    logger.debug('Parsing input YAML: %s', raw_yaml_str)
 
-    yaml.SafeLoader.add_constructor(        '!Value',       ValueTag.from_yaml      )
-    yaml.SafeLoader.add_constructor(        '!Variable',    VariableTag.from_yaml   )
-    yaml.SafeLoader.add_constructor(        '!Sub',         SubTag.from_yaml        )
-    
-    yaml.SafeDumper.add_multi_representer(  ValueTag,       ValueTag.to_yaml        )
-    yaml.SafeDumper.add_multi_representer(  VariableTag,    VariableTag.to_yaml     )
-    yaml.SafeDumper.add_multi_representer(  SubTag,         SubTag.to_yaml          )
-    
-    manifest_data = yaml.safe_load(raw_yaml_str)
+    manifest_data = resolve_deferred_tags(data=yaml_parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=raw_yaml_str))
     converted_data = dict((k.lower(),v) for k,v in manifest_data.items()) # Convert keys to lowercase
     if 'kind' in converted_data and 'version' in converted_data:
         if converted_data['kind'] not in IGNORED_KINDS:
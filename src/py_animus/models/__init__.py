@@ -7,45 +7,60 @@
 """
 import copy
 import json
-import importlib
+import itertools
+import bisect
+import heapq
+import threading
+import time
+from collections.abc import Mapping, Sequence
 # from py_animus.animus_logging import logger
 import py_animus.animus_logging as animus_logger
-from py_animus.helpers import get_utc_timestamp, is_debug_set_in_environment
+from py_animus.helpers import is_debug_set_in_environment
 
 
+EXPIRY_HEAP_COMPACT_MIN_SIZE = 1024
+
 class LoggerHelper:
+    """Resolves the `py-animus` logger once and keeps the reference until the logging configuration changes.
+
+    Logging extensions (the `*HandlerLogging` kinds) call `add_handler()`, which invalidates the logging context. The
+    next log call will then resolve the logger again.
+    """
 
     def __init__(self):
         self.logger_is_initialized = False
         self.logger = None
+        self.logger_generation = None
 
     def initialize(self):
-        if self.logger_is_initialized is False:
-            importlib.reload(animus_logger)
+        if self.logger_is_initialized is False or self.logger_generation != animus_logger.logging_context.generation:
             self.logger = animus_logger.logger
+            self.logger_generation = animus_logger.logging_context.generation
+            self.logger_is_initialized = True
 
-    def log_info(self, message: str):
+    def log_info(self, message: str, *args):
         self.initialize()
-        self.logger.info(message)
+        self.logger.info(message, *args)
 
-    def log_debug(self, message: str):
+    def log_debug(self, message: str, *args):
+        """Log a debug message. Any `%`-style args are only formatted when the logger is enabled for debug."""
         self.initialize()
-        self.logger.debug(message)
+        self.logger.debug(message, *args)
 
-    def log_error(self, message: str):
+    def log_error(self, message: str, *args):
         self.initialize()
-        self.logger.error(message)
+        self.logger.error(message, *args)
 
-    def log_warning(self, message: str):
+    def log_warning(self, message: str, *args):
         self.initialize()
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
 
-    def log_warn(self, message: str):
-        self.log_warning(message=message)
+    def log_warn(self, message: str, *args):
+        self.log_warning(message, *args)
 
     def reload_logger(self):
-        importlib.reload(animus_logger)
-        self.logger = animus_logger.logger
+        self.logger_is_initialized = False
+        self.initialize()
 
 
 class Action:
@@ -190,11 +205,11 @@ class Values:
 
     def add_value(self, value: Value):
         self.values[value.name] = value
-        self.log_helper.log_debug('Added value {}'.format(value.name))
+        self.log_helper.log_debug('Added value %s', value.name)
 
     def find_value_by_name(self, name: str)->Value:
         if name not in self.values:
-            self.log_helper.log_error('Dump of current values keys: {}'.format(list(self.values.keys())))
+            self.log_helper.log_error('Dump of current values keys: %s', list(self.values.keys()))
             return Value(name=name, initial_value=None)
         return self.values[name]
     
@@ -216,7 +231,7 @@ class ScopedValues:
 
     def add_value(self, value: Value):
         self.values.add_value(value=value)
-        self.log_helper.log_debug('   Added value {} for scope {}'.format(value.name, self.scope))
+        self.log_helper.log_debug('   Added value %s for scope %s', value.name, self.scope)
 
     def find_value_by_name(self, name: str)->Value:
         return self.values.find_value_by_name(name=name)
@@ -242,7 +257,7 @@ class AllScopedValues:
         else:
             if replace is True:
                 self.scoped_values_collection[scoped_values.scope] = scoped_values
-        self.log_helper.log_debug('Added scoped values for scope {}'.format(scoped_values.scope))
+        self.log_helper.log_debug('Added scoped values for scope %s', scoped_values.scope)
 
     def find_scoped_values(self, scope: str)->ScopedValues:
         if scope not in self.scoped_values_collection:
@@ -254,7 +269,7 @@ class AllScopedValues:
         current_scoped_values = self.find_scoped_values(scope=scope)
         current_scoped_values.add_value(value=value)
         self.add_scoped_values(scoped_values=copy.deepcopy(current_scoped_values), replace=True)
-        self.log_helper.log_debug('Scoped value named "{}" added for scope "{}"'.format(value.name, scope))
+        self.log_helper.log_debug('Scoped value named "%s" added for scope "%s"', value.name, scope)
 
     def clear(self):
         self.scoped_values_collection = dict()
@@ -266,6 +281,91 @@ class AllScopedValues:
             scoped_values.reset_logger()
 
 
+class FrozenList(Sequence):
+    """A read-only view of the first `length` items of a list.
+
+    Lists in frozen Variables are only ever appended to, so a view with a fixed length remains a valid snapshot while
+    more items are added to the underlying list.
+    """
+
+    def __init__(self, items: list, length: int=None):
+        self._items = items
+        self._length = len(items) if length is None else length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._items[:self._length])[index]
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError('FrozenList index out of range')
+        return self._items[index]
+
+    def __len__(self)->int:
+        return self._length
+
+    def __iter__(self):
+        return itertools.islice(self._items, self._length)
+
+    def __eq__(self, other)->bool:
+        if isinstance(other, (list, tuple, FrozenList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return False
+
+    __hash__ = None
+
+    def __repr__(self)->str:
+        return repr(thaw_value(value=self))
+
+
+class FrozenDict(Mapping):
+    """A read-only view of a dict."""
+
+    def __init__(self, items: dict):
+        self._items = items
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __len__(self)->int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    __hash__ = None
+
+    def __repr__(self)->str:
+        return repr(thaw_value(value=self))
+
+
+def freeze_value(value):
+    """Returns an immutable version of the value: dicts become FrozenDict, lists and tuples become FrozenList and sets
+    become frozenset. Other values are returned as is."""
+    if isinstance(value, (FrozenDict, FrozenList, frozenset)):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenDict(items=dict((k, freeze_value(value=v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return FrozenList(items=[freeze_value(value=v) for v in value])
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def thaw_value(value):
+    """Returns a mutable (deep) copy of a value produced by `freeze_value()`"""
+    if isinstance(value, Mapping):
+        return dict((k, thaw_value(value=v)) for k, v in value.items())
+    if isinstance(value, (list, FrozenList)):
+        return [thaw_value(value=v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(thaw_value(value=v) for v in value)
+    if isinstance(value, frozenset):
+        return set(value)
+    return copy.deepcopy(value)
+
+
 class Variable:
     """A Variable is a runtime value generated by some operation that will be stored in a VariableCache in the 
     ManifestManager. Any other operation launched from the ManifestManager will have access to the current runtime 
@@ -282,32 +382,97 @@ class Variable:
 
     >>> variable_cache.store_variable(variable=Variable(name='some-name', initial_value='Overriding some existing value...'), overwrite_existing=True)
 
+    A frozen Variable returns read-only views (`FrozenList`, `FrozenDict`) of its value instead of a deep copy on every 
+    read. Use it for large values, for example a list that is extended with `add_list_item_to_existing_variable()`:
+
+    >>> variable_cache.store_variable(variable=Variable(name='downloaded-files', initial_value=list(), frozen=True))
+
     Attributes:
         name: A String with the Variable name.
         initial_value: Any object containing a any value
         ttl: Integer with the time to live for the variable value in the cache (in seconds, default is -1 or unlimited lifespan while the application is running)
+        init_timestamp: Integer UTC timestamp of when the TTL timers were last reset
+        expires_at: The `time.monotonic()` time after which the value is expired, or None if the value never expires
         mask_in_logs: A boolean to indicate if the value is sensitive and that it should be masked in logs
+        frozen: A boolean to indicate the value is immutable. Reads are then zero-copy and lists and dicts are updated in place, copying a dict only when it is changed after a read (copy-on-write)
     """
 
-    def __init__(self, name: str, initial_value=None, ttl: int=-1, mask_in_logs: bool=False):
+    def __init__(self, name: str, initial_value=None, ttl: int=-1, mask_in_logs: bool=False, frozen: bool=False):
         """Initializes a new instance of a Variable to be stored in the VariableCache.
 
         Args:
           name: String with a unique name of this variable. (Will be validated as unique in VariableCache)
           initial_value: Object storing some initial value (Optional, default=None)
           ttl: Integer of seconds for Variable's value to be considered valid in the context of the VariableCache. (Optional, default=-1 which never expires)
+          mask_in_logs: Boolean to indicate if the value must be masked in logs (Optional, default=False)
+          frozen: Boolean to store the value as immutable, with copy-on-write updates (Optional, default=False)
         """
         self.name = name
-        self.value = initial_value
-        self.ttl = ttl
-        self.init_timestamp = get_utc_timestamp(with_decimal=False)
+        self.frozen = frozen
+        self.value_is_shared = False
+        self.value = self._prepare_value(value=initial_value)
+        self._ttl = ttl
+        self.expires_at = None
+        self._reset_timers()
         self.debug = is_debug_set_in_environment()
         self.mask_in_logs = mask_in_logs
         self.log_helper = LoggerHelper()
 
-    def _log_debug(self, message):
+    def _log_debug(self, message: str, *args):
         if self.debug is True:
-            self.log_helper.log_debug('[{}:{}] {}'.format(self.__class__.__name__, self.name, message))
+            self.log_helper.log_debug('[%s:%s] ' + message, self.__class__.__name__, self.name, *args)
+
+    @property
+    def ttl(self)->int:
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, ttl: int):
+        self._ttl = ttl
+        self._calculate_expires_at()
+
+    @property
+    def init_timestamp(self)->int:
+        return self._init_timestamp
+
+    @init_timestamp.setter
+    def init_timestamp(self, init_timestamp: int):
+        # Translate the wall clock timestamp to the monotonic clock used for expiry checks
+        self._init_monotonic = time.monotonic() - (time.time() - init_timestamp)
+        self._init_timestamp = init_timestamp
+        self._calculate_expires_at()
+
+    def _calculate_expires_at(self):
+        if self._ttl < 0:
+            self.expires_at = None
+        else:
+            self.expires_at = self._init_monotonic + self._ttl
+
+    def _reset_timers(self):
+        self._init_timestamp = int(time.time())
+        self._init_monotonic = time.monotonic()
+        self._calculate_expires_at()
+
+    def _prepare_value(self, value):
+        if self.frozen is False:
+            return value
+        self.value_is_shared = False
+        # The top level list or dict is owned by this Variable so that it can be updated in place
+        if isinstance(value, Mapping):
+            return dict((k, freeze_value(value=v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return [freeze_value(value=v) for v in value]
+        return freeze_value(value=value)
+
+    def _read_value(self):
+        if self.frozen is False:
+            return copy.deepcopy(self.value)
+        if isinstance(self.value, list):
+            return FrozenList(items=self.value)
+        if isinstance(self.value, dict):
+            self.value_is_shared = True
+            return FrozenDict(items=self.value)
+        return self.value
 
     def set_value(self, value, reset_ttl: bool=True):
         """Set the value of the Variable.
@@ -316,21 +481,19 @@ class Variable:
           value: Object storing some value (required)
           reset_ttl: Boolean to indicate of the timers of TTL must be reset (optional, default=True)
         """
-        self.value = value
+        self.value = self._prepare_value(value=value)
         if reset_ttl is True:
-            self._log_debug(message='Resetting timers')
-            self.init_timestamp = get_utc_timestamp(with_decimal=False)
+            self._log_debug('Resetting timers')
+            self._reset_timers()
 
     def _is_expired(self):
-        if self.ttl < 0:
-            self._log_debug(message='NOT EXPIRED - TTL less than zero - expiry ignored')
+        if self.expires_at is None:
+            self._log_debug('NOT EXPIRED - TTL less than zero - expiry ignored')
             return False
-        elapsed_time = get_utc_timestamp(with_decimal=False) - self.init_timestamp
-        self._log_debug(message='elapsed_time={}   ttl={}'.format(elapsed_time, self.ttl))
-        if elapsed_time > self.ttl:
-            self._log_debug(message='EXPIRED')
+        if time.monotonic() > self.expires_at:
+            self._log_debug('EXPIRED')
             return True
-        self._log_debug(message='NOT EXPIRED')
+        self._log_debug('NOT EXPIRED')
         return False
 
     def get_value(self, value_if_expired=None, raise_exception_on_expired: bool=True, reset_timer_on_value_read: bool=False, for_logging: bool=False):
@@ -351,16 +514,16 @@ class Variable:
         """
         final_value = None
         if self.value is not None:
-            final_value = copy.deepcopy(self.value)
+            final_value = self._read_value()
         if self._is_expired() is True:
             if raise_exception_on_expired is True:
                 raise Exception('Expired')
-            self._log_debug(message='Expired, but alternate value supplied. Returning alternate value.')
+            self._log_debug('Expired, but alternate value supplied. Returning alternate value.')
             final_value = copy.deepcopy(value_if_expired)
         elif reset_timer_on_value_read is True:
-            self._log_debug(message='Resetting timers')
-            self.init_timestamp = get_utc_timestamp(with_decimal=False)
-        self._log_debug(message='Returning value')
+            self._log_debug('Resetting timers')
+            self._reset_timers()
+        self._log_debug('Returning value')
 
         if final_value is not None:
             if self.mask_in_logs is True and for_logging is True and isinstance(final_value, str):
@@ -370,17 +533,49 @@ class Variable:
 
         return final_value
     
+    def append_item(self, item):
+        """Append an item to a list value in place. The TTL timers are reset.
+
+        Raises:
+            Exception: When the value is not a list
+        """
+        if isinstance(self.value, list) is False:
+            raise Exception('Expected a list type variable')
+        if self.frozen is True:
+            item = freeze_value(value=item)
+        self.value.append(item)
+        self._reset_timers()
+
+    def set_item(self, key, item):
+        """Set a key of a dict value in place. The TTL timers are reset.
+
+        Raises:
+            Exception: When the value is not a dict
+        """
+        if isinstance(self.value, dict) is False:
+            raise Exception('Expected a dict type variable')
+        if self.frozen is True:
+            if self.value_is_shared is True:
+                self._log_debug('Copy on write')
+                self.value = dict(self.value)
+                self.value_is_shared = False
+            item = freeze_value(value=item)
+        self.value[key] = item
+        self._reset_timers()
+
     def log_value(self, value_if_expired=None, raise_exception_on_expired: bool=True, reset_timer_on_value_read: bool=False):
         value = self.get_value(value_if_expired=value_if_expired, raise_exception_on_expired=raise_exception_on_expired, reset_timer_on_value_read=reset_timer_on_value_read, for_logging=True)
         if is_debug_set_in_environment() is True:
-            self.log_helper.log_debug('Variable(name="{}", init_timestamp={}, ttl={}, mask_in_logs={}): "{}"'.format(self.name, self. init_timestamp, self.ttl, self.mask_in_logs, value))
+            self.log_helper.log_debug('Variable(name="%s", init_timestamp=%s, ttl=%s, mask_in_logs=%s): "%s"', self.name, self.init_timestamp, self.ttl, self.mask_in_logs, value)
         else:
-            self.log_helper.log_info('Variable(name="{}"): "{}"'.format(self.name, value))
+            self.log_helper.log_info('Variable(name="%s"): "%s"', self.name, value)
     
     def to_dict(self, for_logging: bool=False):
         final_value = ''
         if self.value is not None:
             final_value = '{}'.format(str(self.value))
+            if self.frozen is True:
+                final_value = '{}'.format(str(thaw_value(value=self.value)))
             if self.mask_in_logs is True and for_logging is True and isinstance(final_value, str):
                 final_value = '*' * len(final_value)
             elif self.mask_in_logs is True and for_logging is True:
@@ -402,8 +597,22 @@ class Variable:
 class VariableCache:
     """A VariableCache holds a collection of Variable instances
 
+    Variable names follow the `Kind:name:scope:VARIABLE` convention (see `ManifestBase._var_name()`). A sorted index of
+    the names is kept, so that all the variables of a manifest (or of a manifest in a scope) can be found or deleted
+    in O(log n + k) with a prefix like `Kind:name:` or `Kind:name:scope:`.
+
+    Expired Variables are kept by default, because reading one returns `value_if_expired` (or raises an exception)
+    which some manifests rely on. Call `enable_eviction()` (or use the `--variable-eviction-grace-period` command line
+    option) to remove Variables once they have been expired for a grace period. While eviction is enabled, Variables
+    with a TTL are tracked in a min-heap ordered by expiry time, and eviction is done lazily when values are read or
+    stored, and optionally by a background sweeper thread.
+
     Attributes:
         values: Dictionary of Variable instance, index by each Variable name
+        sorted_names: A sorted list of the Variable names in `values`
+        expiry_heap: A heap of `(expires_at, sequence, variable_name)` tuples for Variables with a TTL, only kept while eviction is enabled
+        eviction_grace_period: Seconds a Variable must be expired before it is evicted, or None if eviction is disabled
+        eviction_counters: Dictionary with the number of Variables evicted on access (`on_access`) and by the sweeper (`sweeper`)
     """
 
     def __init__(self):
@@ -413,15 +622,142 @@ class VariableCache:
           logger: An instance of logging.Logger used for logging (Optional, default is teh result from internal call to get_logger())
         """
         self.values = dict()
+        self.sorted_names = list()
+        self.expiry_heap = list()
+        self.expiry_sequence = itertools.count()
+        self.eviction_grace_period = None
+        self.eviction_counters = {'on_access': 0, 'sweeper': 0}
+        self.sweeper_thread = None
+        self.sweeper_stop_event = None
+        self.lock = threading.RLock()
+        self.storage = None
         self.log_helper = LoggerHelper()
 
+    def attach_storage(self, storage)->int:
+        """Attach a storage backend (see `py_animus.models.variable_cache_storage`) and load the Variables it kept from a
+        previous run. Variables already in the cache are not replaced.
+
+        Args:
+          storage: An instance of a `VariableCacheStorage` implementation
+
+        Returns:
+            The number of Variables loaded
+        """
+        self.storage = storage
+        loaded_qty = 0
+        for variable in storage.load_variables():
+            if variable.name not in self.values:
+                self.store_variable(variable=variable)
+                loaded_qty += 1
+        self.log_helper.log_info('Loaded %s variables from storage', loaded_qty)
+        return loaded_qty
+
+    def detach_storage(self):
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def persist(self):
+        """Save the current Variables to the attached storage backend, if any"""
+        if self.storage is None:
+            return
+        with self.lock:
+            variables = list(self.values.values())
+        self.storage.save_variables(variables=variables)
+
+    def enable_eviction(self, grace_period: float=0.0, sweep_interval: float=None):
+        """Evict Variables that have been expired for longer than the grace period.
+
+        Args:
+          grace_period: Seconds an expired Variable is kept before it is evicted (Optional, default=0.0)
+          sweep_interval: If set, a daemon thread evicts expired Variables every `sweep_interval` seconds. (Optional, default=None)
+        """
+        with self.lock:
+            self.eviction_grace_period = grace_period
+            self._rebuild_expiry_heap()
+        self.stop_sweeper()
+        if sweep_interval is not None:
+            self.sweeper_stop_event = threading.Event()
+            self.sweeper_thread = threading.Thread(target=self._sweep, args=(sweep_interval, self.sweeper_stop_event,), name='VariableCacheSweeper', daemon=True)
+            self.sweeper_thread.start()
+
+    def disable_eviction(self):
+        self.stop_sweeper()
+        with self.lock:
+            self.eviction_grace_period = None
+            self.expiry_heap = list()
+
+    def stop_sweeper(self):
+        if self.sweeper_thread is not None:
+            self.sweeper_stop_event.set()
+            self.sweeper_thread.join()
+            self.sweeper_thread = None
+            self.sweeper_stop_event = None
+
+    def _sweep(self, sweep_interval: float, stop_event: threading.Event):
+        while stop_event.wait(timeout=sweep_interval) is False:
+            self.evict_expired_variables(counter_name='sweeper')
+
+    def _rebuild_expiry_heap(self):
+        self.expiry_heap = [(variable.expires_at, next(self.expiry_sequence), variable.name) for variable in self.values.values() if variable.expires_at is not None]
+        heapq.heapify(self.expiry_heap)
+
+    def _track_expiry(self, variable: Variable):
+        if self.eviction_grace_period is None or variable.expires_at is None:
+            return
+        heapq.heappush(self.expiry_heap, (variable.expires_at, next(self.expiry_sequence), variable.name))
+        if len(self.expiry_heap) > 2 * len(self.values) + EXPIRY_HEAP_COMPACT_MIN_SIZE:
+            # Overwritten and deleted Variables leave stale entries behind
+            self._rebuild_expiry_heap()
+
+    def evict_expired_variables(self, counter_name: str='on_access')->int:
+        """Remove Variables that have been expired for longer than the eviction grace period.
+
+        Only the heap entries that are due are inspected. Variables of which the timers were reset since the entry was
+        added are pushed back onto the heap with their new expiry time.
+
+        Args:
+          counter_name: The key in `eviction_counters` to increment (Optional, default='on_access')
+
+        Returns:
+            The number of evicted Variables
+        """
+        if self.eviction_grace_period is None:
+            return 0
+        evicted = 0
+        now = time.monotonic()
+        with self.lock:
+            while len(self.expiry_heap) > 0 and self.expiry_heap[0][0] + self.eviction_grace_period < now:
+                expires_at, sequence, variable_name = heapq.heappop(self.expiry_heap)
+                variable = self.values.get(variable_name)
+                if variable is None or variable.expires_at is None:
+                    continue
+                if variable.expires_at + self.eviction_grace_period < now:
+                    self.delete_variable(variable_name=variable_name)
+                    evicted += 1
+                elif variable.expires_at != expires_at:
+                    self._track_expiry(variable=variable)
+            self.eviction_counters[counter_name] += evicted
+        if evicted > 0:
+            self.log_helper.log_debug('Evicted %s expired variables', evicted)
+        return evicted
+
     def get_all_variable_names_staring_with(self, start_str: str)->list:
+        """Returns the names of all Variables starting with the given prefix, in sorted order"""
         names = list()
-        for values_key in list(self.values.keys()):
-            if values_key.startswith(start_str):
-                names.append(values_key)
+        with self.lock:
+            idx = bisect.bisect_left(self.sorted_names, start_str)
+            while idx < len(self.sorted_names) and self.sorted_names[idx].startswith(start_str):
+                names.append(self.sorted_names[idx])
+                idx += 1
         return names
 
+    def get_all_variable_names_for_manifest(self, manifest_kind: str, manifest_name: str, scope_name: str=None)->list:
+        """Returns the names of all Variables set by a manifest, optionally limited to one scope"""
+        if scope_name is None:
+            return self.get_all_variable_names_staring_with(start_str='{}:{}:'.format(manifest_kind, manifest_name))
+        return self.get_all_variable_names_staring_with(start_str='{}:{}:{}:'.format(manifest_kind, manifest_name, scope_name))
+
     def store_variable(self, variable: Variable, overwrite_existing: bool=False):
         """Stores an instance of Variable
 
@@ -431,8 +767,16 @@ class VariableCache:
           variable: An instance of Variable
           overwrite_existing: Boolean to indicate if a any pre-existing Variable (with the same name) must be over written with this value. (Optional, Default=False)
         """
-        if variable.name not in self.values or overwrite_existing is True:
-            self.values[variable.name] = variable
+        with self.lock:
+            if variable.name not in self.values:
+                bisect.insort(self.sorted_names, variable.name)
+                self.values[variable.name] = variable
+                self._track_expiry(variable=variable)
+            elif overwrite_existing is True:
+                self.values[variable.name] = variable
+                self._track_expiry(variable=variable)
+        if self.eviction_grace_period is not None:
+            self.evict_expired_variables()
 
     def get_value(
             self,
@@ -468,6 +812,8 @@ class VariableCache:
             Exception: When the value has expired (From Variable) (pass through), and if `raise_exception_on_expired` is True
             Exception: When the Variable is not found, and if `raise_exception_on_not_found` is True
         """
+        if self.eviction_grace_period is not None:
+            self.evict_expired_variables()
         if variable_name not in self.values and init_with_default_value_if_not_found is True:
             self.store_variable(
                 variable=Variable(
@@ -476,18 +822,19 @@ class VariableCache:
                 )
             )
         if variable_name not in self.values and raise_exception_on_not_found is True:
-            self.log_helper.log_debug('[variable_name={}] Variable NOT FOUND, and raise_exception_on_not_found is set to True'.format(variable_name))
+            self.log_helper.log_debug('[variable_name=%s] Variable NOT FOUND, and raise_exception_on_not_found is set to True', variable_name)
             if unresolved_variables_returns_original_reference is True:
-                self.log_helper.log_debug('[variable_name={}] unresolved_variables_returns_original_reference was TRUE - returning: !Variable {}'.format(variable_name, variable_name))
+                self.log_helper.log_debug('[variable_name=%s] unresolved_variables_returns_original_reference was TRUE - returning: !Variable %s', variable_name, variable_name)
                 return '!Variable {}'.format(variable_name)
                 # return PendingVariable(original_variable_name=variable_name)
             else:
                 raise Exception('Variable "{}" not found'.format(variable_name))
         elif variable_name not in self.values and raise_exception_on_not_found is False:
-            self.log_helper.log_debug('[variable_name={}] Variable NOT FOUND, and raise_exception_on_not_found is set to False - Returning default_value_if_not_found: {}'.format(variable_name, default_value_if_not_found))
+            self.log_helper.log_debug('[variable_name=%s] Variable NOT FOUND, and raise_exception_on_not_found is set to False - Returning default_value_if_not_found: %s', variable_name, default_value_if_not_found)
             return default_value_if_not_found
-        final_value = copy.deepcopy(self.values[variable_name].get_value(value_if_expired=value_if_expired, raise_exception_on_expired=raise_exception_on_expired, reset_timer_on_value_read=reset_timer_on_value_read, for_logging=for_logging))
-        self.log_helper.log_debug('[variable_name={}] final_value: {}'.format(variable_name, final_value))
+        # Variable.get_value() already returns either a copy or, for frozen variables, a read-only view
+        final_value = self.values[variable_name].get_value(value_if_expired=value_if_expired, raise_exception_on_expired=raise_exception_on_expired, reset_timer_on_value_read=reset_timer_on_value_read, for_logging=for_logging)
+        self.log_helper.log_debug('[variable_name=%s] final_value: %s', variable_name, final_value)
         return final_value
 
     def add_dict_item_to_existing_variable(
@@ -498,70 +845,93 @@ class VariableCache:
             ignore_if_already_exists: bool=False,
             raise_exception_if_value_type_is_not_a_dict: bool=True
         )->dict:
-        update_value = False
-        if variable_name in self.values:
-            current_value = copy.deepcopy(self.values[variable_name].get_value(value_if_expired=dict(), raise_exception_on_expired=False, reset_timer_on_value_read=False, for_logging=False))
-            if isinstance(current_value, dict) is True:
-                if key in current_value:
-                    if ignore_if_already_exists is False:
-                        update_value = True
+        """Set a key in a dict Variable, creating the Variable if it does not exist yet.
+
+        The dict is updated in place. For frozen Variables the dict is only copied when it was read since the last
+        change.
+
+        Returns:
+            The updated value (a copy, or a read-only view for frozen Variables)
+        """
+        with self.lock:
+            if variable_name in self.values:
+                variable = self.values[variable_name]
+                if variable._is_expired() is True:
+                    variable.set_value(value=dict())
+                if isinstance(variable.value, dict) is True:
+                    if key not in variable.value or ignore_if_already_exists is False:
+                        variable.set_item(key=key, item=value)
                 else:
-                    update_value = True
-                if update_value is True:
-                    current_value[key] = value
-                    self.store_variable(
-                        variable=Variable(
-                            name=variable_name,
-                            initial_value=current_value
-                        ),
-                        overwrite_existing=True
-                    )
+                    if raise_exception_if_value_type_is_not_a_dict is True:
+                        raise Exception('Expected a dict type variable')
+                    return dict()
             else:
-                if raise_exception_if_value_type_is_not_a_dict is True:
-                    raise Exception('Expected a dict type variable')
-                return dict()
-        else:
-            self.store_variable(
-                variable=Variable(
-                    name=variable_name,
-                    initial_value={key: value}
+                self.store_variable(
+                    variable=Variable(
+                        name=variable_name,
+                        initial_value={key: value}
+                    )
                 )
-            )
-        return copy.deepcopy(self.values[variable_name].get_value(value_if_expired=dict(), raise_exception_on_expired=False, reset_timer_on_value_read=True, for_logging=False))
+            return self.values[variable_name].get_value(value_if_expired=dict(), raise_exception_on_expired=False, reset_timer_on_value_read=True, for_logging=False)
     
     def add_list_item_to_existing_variable(self, variable_name: str, value: object, ignore_if_already_exists: bool=False, raise_exception_if_value_type_is_not_a_list: bool=True)->dict:
-        if variable_name in self.values:
-            current_value = copy.deepcopy(self.values[variable_name].get_value(value_if_expired=dict(), raise_exception_on_expired=False, reset_timer_on_value_read=False, for_logging=False))
-            if isinstance(current_value, list) is True:
-                current_value.append(value)
+        """Append an item to a list Variable, creating the Variable if it does not exist yet.
+
+        The list is appended to in place and a read-only view is returned instead of a copy, so adding N items is O(N).
+
+        Returns:
+            A `FrozenList` view of the updated value
+        """
+        with self.lock:
+            if variable_name in self.values:
+                variable = self.values[variable_name]
+                if variable._is_expired() is False and isinstance(variable.value, list) is True:
+                    variable.append_item(item=value)
+                else:
+                    if raise_exception_if_value_type_is_not_a_list is True:
+                        raise Exception('Expected a dict type variable')
+                    return list()
+            else:
                 self.store_variable(
                     variable=Variable(
                         name=variable_name,
-                        initial_value=current_value
-                    ),
-                    overwrite_existing=True
-                )
-            else:
-                if raise_exception_if_value_type_is_not_a_list is True:
-                    raise Exception('Expected a dict type variable')
-                return list()
-        else:
-            self.store_variable(
-                variable=Variable(
-                    name=variable_name,
-                    initial_value=[value,]
+                        initial_value=[value,]
+                    )
                 )
-            )
-        return self.get_value(variable_name=variable_name)
+            return FrozenList(items=self.values[variable_name].value)
 
     def delete_variable(self, variable_name: str):
-        if variable_name in self.values:
-            self.log_helper.log_debug('[variable_name={}] Deleted'.format(variable_name))
-            self.values.pop(variable_name)
+        with self.lock:
+            if variable_name in self.values:
+                self.log_helper.log_debug('[variable_name=%s] Deleted', variable_name)
+                self.values.pop(variable_name)
+                self.sorted_names.pop(bisect.bisect_left(self.sorted_names, variable_name))
+
+    def delete_all_variables_starting_with(self, start_str: str)->list:
+        """Deletes all Variables of which the name starts with the given prefix.
+
+        Example, to delete all variables set by a manifest in the current scope:
+
+        >>> variable_cache.delete_all_variables_starting_with(start_str=self._var_name_prefix())
+
+        Returns:
+            A list of the deleted Variable names
+        """
+        with self.lock:
+            start_idx = bisect.bisect_left(self.sorted_names, start_str)
+            end_idx = start_idx
+            while end_idx < len(self.sorted_names) and self.sorted_names[end_idx].startswith(start_str):
+                end_idx += 1
+            deleted_names = self.sorted_names[start_idx:end_idx]
+            del self.sorted_names[start_idx:end_idx]
+            for variable_name in deleted_names:
+                self.values.pop(variable_name)
+        self.log_helper.log_debug('[start_str=%s] Deleted %s variables', start_str, len(deleted_names))
+        return deleted_names
 
     def to_dict(self, for_logging: bool=False):
         data = dict()
-        for k,v in self.values.items():
+        for k,v in list(self.values.items()):
             v_dict = v.to_dict(for_logging=for_logging)
             data[k] = v_dict
         return data
@@ -570,7 +940,10 @@ class VariableCache:
         return json.dumps(self.to_dict(for_logging=True))
     
     def clear(self):
-        self.values = dict()
+        with self.lock:
+            self.values = dict()
+            self.sorted_names = list()
+            self.expiry_heap = list()
 
     def reset_logger(self):
         self.log_helper = LoggerHelper()
@@ -585,6 +958,65 @@ class VariableCache:
 variable_cache = VariableCache()
 
 
+class ManifestRunStates:
+    """Records the outcome of the last run of each manifest, keyed by `(kind, name, scope)`.
+
+    Each record holds the manifest `checksum` (calculated when the manifest was parsed), an `inputs_checksum` of the
+    resolved metadata and spec (so changed Variable values are detected), the `outcome` and the names of the
+    `output_variables` the manifest had set. When a storage backend is attached (see
+    `py_animus.models.variable_cache_storage`), records are kept between runs.
+
+    Attributes:
+        states: Dictionary of records, indexed by `(kind, name, scope)` tuples
+        storage: The storage backend, or None
+    """
+
+    def __init__(self):
+        self.states = dict()
+        self.storage = None
+        self.lock = threading.Lock()
+        self.log_helper = LoggerHelper()
+
+    def reset(self):
+        self.detach_storage()
+        with self.lock:
+            self.states = dict()
+
+    def attach_storage(self, storage)->int:
+        self.storage = storage
+        with self.lock:
+            self.states.update(storage.load_states())
+        self.log_helper.log_info('Loaded %s manifest run states from storage', len(self.states))
+        return len(self.states)
+
+    def detach_storage(self):
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def get_state(self, kind: str, name: str, scope_name: str)->dict:
+        """Returns the last recorded state as a dict with keys `checksum`, `inputs_checksum`, `outcome` and 
+        `output_variables` (None for records of older versions), or None"""
+        return self.states.get((kind, name, scope_name))
+
+    def record_state(self, kind: str, name: str, scope_name: str, checksum: str, inputs_checksum: str, outcome: str, output_variables: list=list()):
+        state = {'checksum': checksum, 'inputs_checksum': inputs_checksum, 'outcome': outcome, 'output_variables': list(output_variables)}
+        with self.lock:
+            self.states[(kind, name, scope_name)] = state
+        if self.storage is not None:
+            self.storage.save_state(kind=kind, name=name, scope_name=scope_name, state=state)
+        self.log_helper.log_debug('[%s:%s:%s] Run state recorded: %s', kind, name, scope_name, outcome)
+
+    def remove_state(self, kind: str, name: str, scope_name: str):
+        with self.lock:
+            self.states.pop((kind, name, scope_name), None)
+        if self.storage is not None:
+            self.storage.delete_state(kind=kind, name=name, scope_name=scope_name)
+
+
+manifest_run_states = ManifestRunStates()
+
+
 class Scope:
 
     def __init__(self):
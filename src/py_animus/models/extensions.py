@@ -11,10 +11,13 @@ import json
 import hashlib
 import yaml
 import re
+import logging
+import functools
 from py_animus.helpers import is_debug_set_in_environment
 # from py_animus.animus_logging import logger
 import py_animus.animus_logging
-from py_animus.models import actions, Action, scope, variable_cache
+from py_animus.animus_logging import LazyJson
+from py_animus.models import actions, Action, scope, variable_cache, manifest_run_states
 
 
 SUPPORTED_TYPES = (
@@ -54,6 +57,89 @@ def convert_dict_items_to_serializable_objects(data: dict)->dict:
     return converted
 
 
+VARIABLE_REFERENCE_REGEX = re.compile(r'!Variable ([\w|\:|\-]+)')
+
+
+class VariableTemplate:
+    """A string value containing `!Variable` references, split once into literal and reference segments.
+
+    Rendering only needs one lookup in the `VariableCache` per reference. References to variables that are not in the
+    cache are kept as-is (for example `!Variable some-name`) so that they can be resolved later.
+
+    Attributes:
+        source: The original string
+        segments: A tuple of `(is_reference, text)` tuples. When `is_reference` is True, text is a variable name
+        variable_names: A tuple of the referenced variable names, in order of appearance
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        segments = list()
+        position = 0
+        for match in VARIABLE_REFERENCE_REGEX.finditer(source):
+            if match.start() > position:
+                segments.append((False, source[position:match.start()]))
+            segments.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            segments.append((False, source[position:]))
+        self.segments = tuple(segments)
+        self.variable_names = tuple(text for is_reference, text in self.segments if is_reference is True)
+
+    def render(self, cache)->str:
+        """Produce the final string, using the current values in the cache
+
+        Args:
+          cache: The VariableCache holding the variable values
+
+        Returns:
+            A String with all resolvable references replaced by their values
+        """
+        parts = list()
+        for is_reference, text in self.segments:
+            if is_reference is True and text in cache.values:
+                parts.append('{}'.format(cache.get_value(variable_name=text, unresolved_variables_returns_original_reference=True)))
+            elif is_reference is True:
+                parts.append('!Variable {}'.format(text))
+            else:
+                parts.append(text)
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=4096)
+def get_variable_template(source: str)->VariableTemplate:
+    """Returns a (cached) VariableTemplate for the source string"""
+    return VariableTemplate(source=source)
+
+
+def compile_variable_templates(data, path: tuple=())->tuple:
+    """Find every string value in some parsed manifest data that contains a `!Variable` reference.
+
+    Args:
+      data: A dict, list or tuple as parsed from a manifest
+      path: The path to `data` from the root (used internally)
+
+    Returns:
+        A tuple of `(path, VariableTemplate)` tuples, where path is a tuple of dict keys and list indexes
+    """
+    templates = list()
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list) or isinstance(data, tuple):
+        items = enumerate(data)
+    else:
+        return tuple()
+    for k, v in items:
+        if isinstance(v, str):
+            if '!Variable' in v:
+                template = get_variable_template(source=v)
+                if len(template.variable_names) > 0:
+                    templates.append((path + (k,), template))
+        elif isinstance(v, dict) or isinstance(v, list) or isinstance(v, tuple):
+            templates.extend(compile_variable_templates(data=v, path=path + (k,)))
+    return tuple(templates)
+
+
 class ManifestBase:
     """ManifestBase needs to be extended by a user to implement a class that can handle the implementation logic of 
     applying a manifest during runtime.
@@ -136,6 +222,8 @@ class ManifestBase:
         initialized: A boolean that will be set to True once a manifest has been parsed and the values for this instance has been set
         post_parsing_method: Any custom method the user can provide that will be called after parsing (right after the `initialized` boolean is set to True)
         checksum: A calculated checksum of the parsed manifest. Can be used in the implementation of the `implemented_manifest_differ_from_this_manifest()` method to determine if some prior execution is different from the current manifest
+        run_state_unchanged: Set by `determine_actions()` to True when the manifest and its resolved inputs are unchanged since the last successful apply (see `ManifestRunStates`)
+        variable_templates: Dictionary with the compiled `!Variable` templates (see `compile_variable_templates()`) for `metadata` and `spec`, prepared when the manifest is parsed
     """
 
     def __init__(self, post_parsing_method: object=None, version: str='v1', supported_versions: tuple=('v1',)):
@@ -170,120 +258,52 @@ class ManifestBase:
         )
         self.logger = py_animus.animus_logging.logger
         self.extension_action_descriptions = ('Generic Action',)
+        self.variable_templates = {'metadata': None, 'spec': None}
+        self.run_state_unchanged = False
 
-    def _var_name(self, var_name: str):
-        return '{}:{}:{}:{}'.format(
+    def _var_name_prefix(self):
+        return '{}:{}:{}:'.format(
             self.__class__.__name__,
             self.metadata['name'],
-            scope.value,
-            var_name
+            scope.value
         )
 
+    def _var_name(self, var_name: str):
+        return '{}{}'.format(self._var_name_prefix(), var_name)
+
     def _get_variable_name_from_full_variable_string(self, input_str: str)->dict:
         variables = dict()
-        all_variable_names = variable_cache.get_all_current_names()
-        self.log(message='         all_variable_names      : {}'.format(all_variable_names), level='debug')
         if '!Variable' in input_str:
-            self.log(message='         FOUND variable input_str', level='debug')
-            sections = input_str.split('!Variable') # NOTE: There may be MORE than one variable in a single line...
-            self.log(message='         sections : {}'.format(sections), level='debug')
-            self.log(message='            QTY   : {}'.format(len(sections)), level='debug')
-            if len(sections) > 1:
-                sections_qty = len(sections)
-                self.log(message='         sections_qty: {}'.format(sections_qty), level='debug')
-                for section in sections:
-                    self.log(message='         Parsing sections', level='debug')
-                    variable_name = '{}'.format(section)
-                    variable_name.strip()
-                    self.log(message='            variable_name interim value: "{}"'.format(variable_name), level='debug')
-                    result = re.search(r"([\w|\:|\-]+)", variable_name)
-                    try:
-                        if len(result.groups()) > 0:
-                            self.log(message='            Extracting group 0 for variable_name in regex groups'.format(variable_name), level='debug')
-                            variable_name = result.groups()[0]
-
-                            if variable_name in all_variable_names:
-                                original_variable_str = '!Variable {}'.format(variable_name)
-                                original_variable_str = original_variable_str.replace('  ', ' ')
-                                original_variable_str = original_variable_str.strip()
-                                self.log(message='            original_variable_str: {}'.format(original_variable_str), level='debug')
-                                self.log(message='            FINAL variable_name "{}"'.format(variable_name), level='debug')
-                                if original_variable_str not in variables:
-                                    self.log(message='         Added variable to variables DICT', level='debug')
-                                    variables[original_variable_str] = variable_name
-                                else:
-                                    self.log(message='            Not adding variable to variables DICT - already exists', level='debug')
-                        else:
-                            self.log(message='            No REGEX match for variable name...'.format(variable_name), level='debug')
-                    except AttributeError:
-                        self.log(message='No groups found in regex', level='error')
-                    except:
-                        self.log(message='EXCEPTION: {}'.format(traceback.format_exc()), level='error')
-            else:
-                self.log(message='         No sections to parse', level='debug')
-        else:
-            self.log(message='         NO variable found in input_str', level='debug')
-        self.log(message='         input_str={}   variables: {}'.format(input_str, json.dumps(variables, default=str)), level='debug')
+            for variable_name in get_variable_template(source=input_str).variable_names:
+                if variable_name in variable_cache.values:
+                    variables['!Variable {}'.format(variable_name)] = variable_name
+        self.log_debug('         input_str=%s   variables: %s', input_str, LazyJson(variables))
         return variables
 
+    def _resolve_string(self, input_str: str)->str:
+        if '!Variable' not in input_str:
+            return input_str
+        final_value = get_variable_template(source=input_str).render(cache=variable_cache)
+        self.log_debug('         RESULT: %s', final_value)
+        return final_value
+
     def resolve_all_pending_variables(self, iterable):
         resolved_iterable = None
-        self.log(message='Resolving data in iterable: {}'.format(iterable), level='debug')
+        self.log_debug('Resolving data in iterable: %s', iterable)
         if isinstance(iterable, dict):
-            self.log(message='   DICT detected', level='debug')
             resolved_iterable = dict()
             for k,v in iterable.items():
-                final_value = copy.deepcopy(v)
-                self.log(message='   k: {}'.format(k), level='debug')
-                self.log(message='   v: {}'.format(v), level='debug')
                 if isinstance(v, str):
-                    self.log(message='      Identifying variable in string...', level='debug')
-                    variables = self._get_variable_name_from_full_variable_string(input_str=v)
-                    if len(variables) > 0:
-                        for original_variable_str, variable_name in variables.items():
-                            self.log(message='         original_variable_str={}   variable name identified as "{}"'.format(original_variable_str, variable_name), level='debug')
-                            if variable_name is not None:
-                                self.log(message='         Resolving variable_name "{}"'.format(variable_name), level='debug')
-                                resolved_value = variable_cache.get_value(variable_name=variable_name, unresolved_variables_returns_original_reference=True)
-                                self.log(message='         resolved_value={}'.format(resolved_value), level='debug')
-                                final_value = final_value.replace(original_variable_str, resolved_value)
-                                resolved_iterable[k] = final_value
-                                self.log(message='            RESULT: {}={}'.format(k, final_value), level='debug')
-                            else:
-                                self.log(message='         No Variable to resolve found in string', level='debug')
-                                resolved_iterable[k] = v
-                    else:
-                        self.log(message='         No Variable to resolve found in string', level='debug')
-                        resolved_iterable[k] = v
+                    resolved_iterable[k] = self._resolve_string(input_str=v)
                 elif isinstance(v, dict) or isinstance(v, list) or isinstance(v, tuple):
                     resolved_iterable[k] = self.resolve_all_pending_variables(iterable=v)
                 else:
                     resolved_iterable[k] = v
         elif isinstance(iterable, list) or isinstance(iterable, tuple):
-            self.log(message='   LIST detected', level='debug')
             resolved_iterable = list()
             for v in iterable:
-                final_value = copy.deepcopy(v)
-                self.log(message='   v: {}'.format(v), level='debug')
                 if isinstance(v, str):
-                    self.log(message='      Identifying variable in string...', level='debug')
-                    variables = self._get_variable_name_from_full_variable_string(input_str=v)
-                    if len(variables) > 0:
-                        for original_variable_str, variable_name in variables.items():
-                            self.log(message='         original_variable_str={}   variable name identified as "{}"'.format(original_variable_str, variable_name), level='debug')
-                            if variable_name is not None:
-                                self.log(message='         Resolving variable_name "{}"'.format(variable_name), level='debug')
-                                resolved_value = variable_cache.get_value(variable_name=variable_name, unresolved_variables_returns_original_reference=True)
-                                self.log(message='         resolved_value={}'.format(resolved_value), level='debug')
-                                final_value = final_value.replace(original_variable_str, resolved_value)
-                                resolved_iterable.append(final_value)
-                                self.log(message='            RESULT: {}'.format(final_value), level='debug')
-                            else:
-                                self.log(message='         No Variable to resolve found in string', level='debug')
-                                resolved_iterable.append(v)
-                    else:
-                        self.log(message='         No Variable to resolve found in string', level='debug')
-                        resolved_iterable.append(v)
+                    resolved_iterable.append(self._resolve_string(input_str=v))
                 elif isinstance(v, dict) or isinstance(v, list) or isinstance(v, tuple):
                     resolved_iterable.append(self.resolve_all_pending_variables(iterable=v))
                 else:
@@ -292,6 +312,44 @@ class ManifestBase:
                 resolved_iterable = tuple(resolved_iterable)
         return resolved_iterable
 
+    def _resolve_compiled_variables(self, iterable, templates: tuple):
+        if templates is None:
+            return self.resolve_all_pending_variables(iterable=copy.deepcopy(iterable))
+        if len(templates) == 0:
+            return iterable
+        # Copy-on-write: only the containers on the path to a template are copied, everything else is shared
+        resolved_iterable = copy.copy(iterable)
+        copied_containers = {(): resolved_iterable}
+        try:
+            for path, template in templates:
+                container = resolved_iterable
+                for depth in range(1, len(path)):
+                    container_path = path[:depth]
+                    if container_path not in copied_containers:
+                        copied_containers[container_path] = copy.copy(container[path[depth-1]])
+                        container[path[depth-1]] = copied_containers[container_path]
+                    container = copied_containers[container_path]
+                current_value = container[path[-1]]
+                if isinstance(current_value, str) is False:
+                    raise TypeError('Expected a string at path {}'.format(path))
+                if current_value != template.source:
+                    template = get_variable_template(source=current_value)
+                container[path[-1]] = template.render(cache=variable_cache)
+        except (KeyError, IndexError, TypeError):
+            self.log_debug('Data no longer matches the compiled templates - resolving all values')
+            return self.resolve_all_pending_variables(iterable=copy.deepcopy(iterable))
+        return resolved_iterable
+
+    def resolve_manifest_variables(self):
+        """Resolve all `!Variable` references in `metadata` and `spec`.
+
+        Only the values recorded in `variable_templates` when the manifest was parsed are visited. Unchanged parts of
+        `metadata` and `spec` are shared with the previous values, while the containers leading to a resolved value 
+        are copied.
+        """
+        self.metadata = self._resolve_compiled_variables(iterable=self.metadata, templates=self.variable_templates['metadata'])
+        self.spec = self._resolve_compiled_variables(iterable=self.spec, templates=self.variable_templates['spec'])
+
     def register_action(self, action_name: str, initial_status: str=Action.UNKNOWN):
         """
         This should be called during the determine_Actions() method processing
@@ -327,10 +385,44 @@ class ManifestBase:
         elif level.lower().startswith('e'):
             self.logger.error('[{}:{}:{}] {}'.format(self.kind, name, self.version, message))
 
+    def debug_logging_enabled(self)->bool:
+        """Returns True when debug messages from this manifest will actually be emitted.
+
+        Use this as a guard before preparing debug data that is expensive to produce.
+        """
+        if self.debug is False:
+            return False
+        if self.logger is None:
+            self.logger = py_animus.animus_logging.logger
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def log_debug(self, message: str, *args):
+        """Log a debug message with `%`-style arguments.
+
+        Nothing is formatted unless debug logging is enabled, which makes this suitable for hot code paths. 
+
+        Example:
+
+        >>> self.log_debug('Resolved %s to %s', variable_name, resolved_value)
+
+        Args:
+          message: A String with the message to log. Use `%s` placeholders for each of the args
+          args: Arguments for the placeholders in the message
+        """
+        if self.debug_logging_enabled() is True:
+            name = 'not-yet-known'
+            if 'name' in self.metadata:
+                name = self.metadata['name']
+            prefix = '[{}:{}:{}] '.format(self.kind, name, self.version)
+            if len(args) == 0:
+                self.logger.debug('{}{}'.format(prefix, message))
+            else:
+                self.logger.debug(prefix.replace('%', '%%') + message, *args)
+
     def logger_reset(self, new_logger):
         self.logger = new_logger
         # self.log(message='Logger for "{}" reloaded'.format(self.kind), level='info')
-        self.log(message='Logger for "{}" reloaded'.format(self.kind), level='debug')
+        self.log_debug('Logger for "%s" reloaded', self.kind)
 
     def parse_manifest(self, manifest_data: dict):
         """Called via the ManifestManager when manifests files are parsed and one is found to belong to a class of this implementation.
@@ -354,10 +446,10 @@ class ManifestBase:
             supported_version_found = False
             if converted_data['version'] in self.supported_versions:
                 supported_version_found = True
-                self.log(message='Manifest version "{}" found in class supported versions'.format(converted_data['version']), level='debug')
+                self.log_debug('Manifest version "%s" found in class supported versions', converted_data['version'])
             elif converted_data['version'] == self.version:
                 supported_version_found = True
-                self.log(message='Manifest version "{}" found in class main versions'.format(converted_data['version']), level='debug')
+                self.log_debug('Manifest version "%s" found in class main versions', converted_data['version'])
             if supported_version_found is False:
                 self.log(message='Version {} not supported by this implementation. Supported versions: {}'.format(converted_data['version'], self.supported_versions), level='error')
                 raise Exception('Version {} not supported by this implementation.'.format(converted_data['version']))
@@ -382,17 +474,20 @@ class ManifestBase:
             except:
                 self.log(message='post_parsing_method failed with EXCEPTION: {}'.format(traceback.format_exc()), level='error')
 
+        self.variable_templates = {
+            'metadata': compile_variable_templates(data=self.metadata),
+            'spec': compile_variable_templates(data=self.spec),
+        }
+
         converted_data = convert_dict_items_to_serializable_objects(data=converted_data)
 
         self.checksum = hashlib.sha256(json.dumps(converted_data, sort_keys=True, ensure_ascii=True).encode('utf-8')).hexdigest() # Credit to https://stackoverflow.com/users/2082964/chris-maes for his hint on https://stackoverflow.com/questions/6923780/python-checksum-of-a-dict
-        self.log(
-            message='\n\nPOST PARSING. Manifest kind "{}" named "{}":\n   metadata: {}\n   spec: {}\n\n'.format(
-                self.kind,
-                self.metadata['name'],
-                json.dumps(self.metadata),
-                json.dumps(converted_data)
-            ),
-            level='debug'
+        self.log_debug(
+            '\n\nPOST PARSING. Manifest kind "%s" named "%s":\n   metadata: %s\n   spec: %s\n\n',
+            self.kind,
+            self.metadata['name'],
+            LazyJson(self.metadata),
+            LazyJson(converted_data)
         )
 
     def to_dict(self):
@@ -472,12 +567,57 @@ class ManifestBase:
             self.register_action(action_name='{}'.format(action_description), initial_status=final_action)
             self.log(message='Registered action "{}" with status "{}"'.format(action_description, final_action), level='info')
 
+    def calculate_inputs_checksum(self)->str:
+        """Returns a SHA256 checksum of the resolved metadata and spec, which changes when any referenced Variable 
+        value changes."""
+        data = {'metadata': self.metadata, 'spec': self.spec}
+        return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=True, default=str).encode('utf-8')).hexdigest()
+
+    def manifest_unchanged_since_last_apply(self)->bool:
+        """Returns True when the last recorded apply of this manifest in the current scope was successful, with the 
+        same manifest checksum and the same resolved inputs, and all the output Variables it set are available again.
+        Output Variables are not restored from a state file when they are masked in logs or cannot be serialized, in
+        which case the manifest must be applied again. Always returns False when the `--force` command line option was
+        supplied."""
+        if variable_cache.get_value(variable_name='std::force', raise_exception_on_not_found=False, default_value_if_not_found=False) is True:
+            return False
+        state = manifest_run_states.get_state(kind=self.kind, name=self.metadata['name'], scope_name=scope.value)
+        if state is None:
+            return False
+        if state['outcome'] != Action.APPLY_DONE or state['checksum'] != self.checksum:
+            return False
+        if state['inputs_checksum'] != self.calculate_inputs_checksum():
+            return False
+        if state.get('output_variables') is None:
+            return False
+        for variable_name in state['output_variables']:
+            if variable_name not in variable_cache.values:
+                self.log(message='Output variable "{}" of the last apply was not restored - applying again'.format(variable_name), level='info')
+                return False
+        return True
+
+    def record_run_state(self, outcome: str):
+        """Record the outcome of an apply for this manifest in the current scope. A successful delete removes the record."""
+        if outcome == Action.DELETE_DONE:
+            manifest_run_states.remove_state(kind=self.kind, name=self.metadata['name'], scope_name=scope.value)
+            return
+        manifest_run_states.record_state(
+            kind=self.kind,
+            name=self.metadata['name'],
+            scope_name=scope.value,
+            checksum=self.checksum,
+            inputs_checksum=self.calculate_inputs_checksum(),
+            outcome=outcome,
+            output_variables=variable_cache.get_all_variable_names_staring_with(start_str=self._var_name_prefix())
+        )
+
     def determine_actions(self, action_override: str=None, rerouted: bool=False):
         """
             This is a generic function which can be overridden for finer 
             grained control in extensions withy multiple actions.
 
         """
+        self.run_state_unchanged = False
         final_Action = copy.deepcopy(actions.command)
         if action_override is not None:
             if action_override in ('apply', 'delete',):
@@ -492,7 +632,20 @@ class ManifestBase:
                 if self.metadata['skipApplyAll'] is True and rerouted is False:
                     self._bulk_register_actions(final_action=Action.APPLY_SKIP)
                     return
-        if self.implemented_manifest_differ_from_this_manifest() is True:
+        implementation_differs = None
+        if final_Action == 'apply':
+            if self.manifest_unchanged_since_last_apply() is True:
+                # Outputs outside the VariableCache (files, directories, ...) may have changed since the last apply
+                implementation_differs = self.implemented_manifest_differ_from_this_manifest()
+                if implementation_differs is False:
+                    self.log(message='Manifest and inputs unchanged since the last successful apply - skipping', level='info')
+                    self.run_state_unchanged = True
+                    self._bulk_register_actions(final_action=Action.APPLY_SKIP)
+                    return
+                self.log(message='Manifest and inputs unchanged since the last successful apply, but the implemented state differs', level='info')
+        if implementation_differs is None:
+            implementation_differs = self.implemented_manifest_differ_from_this_manifest()
+        if implementation_differs is True:
             if final_Action == 'apply':
                 self._bulk_register_actions(final_action=Action.APPLY_PENDING)
             elif final_Action == 'delete':
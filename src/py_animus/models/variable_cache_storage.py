@@ -0,0 +1,161 @@
+"""
+    Copyright (c) 2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from py_animus.models import Variable, LoggerHelper, thaw_value
+
+
+class VariableCacheStorage:
+    """Base class for storage backends that keep `VariableCache` Variables between runs.
+
+    A backend is attached with `VariableCache.attach_storage()`, which loads the stored Variables. At the end of a
+    run `VariableCache.persist()` hands all Variables to `save_variables()`.
+
+    The following Variables are never stored:
+
+    * Standard variables (names starting with `std::`), as these describe the current run
+    * Variables with `mask_in_logs` set to True, so that sensitive values are never written to disk
+    * Expired Variables
+    """
+
+    def __init__(self):
+        self.log_helper = LoggerHelper()
+
+    def is_persistable(self, variable: Variable)->bool:
+        if variable.name.startswith('std::'):
+            return False
+        if variable.mask_in_logs is True:
+            return False
+        if variable._is_expired() is True:
+            return False
+        return True
+
+    def load_variables(self)->list:     # pragma: no cover
+        """Returns a list of Variable instances that were previously saved and that have not yet expired"""
+        raise Exception('To be implemented by user')
+
+    def save_variables(self, variables: list):     # pragma: no cover
+        """Replace the stored Variables with the given list of Variable instances"""
+        raise Exception('To be implemented by user')
+
+    def close(self):    # pragma: no cover
+        return
+
+
+class SqliteVariableCacheStorage(VariableCacheStorage):
+    """Stores Variables in a local SQLite database file.
+
+    Values are stored as JSON. Values that cannot be serialized to JSON are not stored.
+
+    Attributes:
+        db_file: The path to the SQLite database file
+    """
+
+    def __init__(self, db_file: str):
+        super().__init__()
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        if os.path.exists(db_dir) is False:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS variables (name TEXT PRIMARY KEY, value TEXT NOT NULL, ttl INTEGER NOT NULL, init_timestamp INTEGER NOT NULL, frozen INTEGER NOT NULL)'
+            )
+
+    def load_variables(self)->list:
+        variables = list()
+        now = time.time()
+        with self.lock:
+            rows = self.connection.execute('SELECT name, value, ttl, init_timestamp, frozen FROM variables').fetchall()
+        for name, value, ttl, init_timestamp, frozen in rows:
+            if ttl >= 0 and init_timestamp + ttl < now:
+                self.log_helper.log_debug('[variable_name=%s] Stored variable expired - not loaded', name)
+                continue
+            variable = Variable(name=name, initial_value=json.loads(value), ttl=ttl, frozen=bool(frozen))
+            variable.init_timestamp = init_timestamp
+            variables.append(variable)
+        self.log_helper.log_debug('Loaded %s variables from "%s"', len(variables), self.db_file)
+        return variables
+
+    def save_variables(self, variables: list):
+        rows = list()
+        for variable in variables:
+            if self.is_persistable(variable=variable) is False:
+                continue
+            value = variable.value
+            if variable.frozen is True:
+                value = thaw_value(value=value)
+            try:
+                serialized_value = json.dumps(value)
+            except (TypeError, ValueError):
+                self.log_helper.log_debug('[variable_name=%s] Value cannot be serialized to JSON - not stored', variable.name)
+                continue
+            rows.append((variable.name, serialized_value, variable.ttl, variable.init_timestamp, int(variable.frozen)))
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM variables')
+            self.connection.executemany('INSERT INTO variables (name, value, ttl, init_timestamp, frozen) VALUES (?, ?, ?, ?, ?)', rows)
+        self.log_helper.log_debug('Saved %s variables to "%s"', len(rows), self.db_file)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class SqliteManifestRunStateStorage:
+    """Stores `ManifestRunStates` records in a local SQLite database file, which may be the same file used by
+    `SqliteVariableCacheStorage`.
+
+    Attributes:
+        db_file: The path to the SQLite database file
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        if os.path.exists(db_dir) is False:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS manifest_run_states (kind TEXT NOT NULL, name TEXT NOT NULL, scope TEXT NOT NULL, checksum TEXT NOT NULL, inputs_checksum TEXT NOT NULL, outcome TEXT NOT NULL, output_variables TEXT, PRIMARY KEY (kind, name, scope))'
+            )
+            column_names = [row[1] for row in self.connection.execute('PRAGMA table_info(manifest_run_states)').fetchall()]
+            if 'output_variables' not in column_names:
+                # State files of older versions did not record the output variables
+                self.connection.execute('ALTER TABLE manifest_run_states ADD COLUMN output_variables TEXT')
+
+    def load_states(self)->dict:
+        states = dict()
+        with self.lock:
+            rows = self.connection.execute('SELECT kind, name, scope, checksum, inputs_checksum, outcome, output_variables FROM manifest_run_states').fetchall()
+        for kind, name, scope_name, checksum, inputs_checksum, outcome, output_variables in rows:
+            if output_variables is not None:
+                output_variables = json.loads(output_variables)
+            states[(kind, name, scope_name)] = {'checksum': checksum, 'inputs_checksum': inputs_checksum, 'outcome': outcome, 'output_variables': output_variables}
+        return states
+
+    def save_state(self, kind: str, name: str, scope_name: str, state: dict):
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO manifest_run_states (kind, name, scope, checksum, inputs_checksum, outcome, output_variables) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, name, scope_name, state['checksum'], state['inputs_checksum'], state['outcome'], json.dumps(state['output_variables']))
+            )
+
+    def delete_state(self, kind: str, name: str, scope_name: str):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM manifest_run_states WHERE kind = ? AND name = ? AND scope = ?', (kind, name, scope_name))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -8,7 +8,7 @@
 
 import copy
 from py_animus.animus_logging import logger
-from py_animus.models import variable_cache, scope, actions, Variable
+from py_animus.models import variable_cache, scope, actions, Variable, manifest_run_states
 
 
 def initialize_animus(cli_arguments: tuple):
@@ -43,6 +43,70 @@ def initialize_animus(cli_arguments: tuple):
         overwrite_existing=True
     )
 
+    for cli_option in cli_arguments[5:]:
+        option_name = cli_option[2:]
+        option_value = True
+        if '=' in option_name:
+            option_name, option_value = option_name.split('=', 1)
+        variable_cache.store_variable(
+            variable=Variable(
+                name='std::{}'.format(option_name),
+                initial_value=option_value
+            ),
+            overwrite_existing=True
+        )
+        logger.info('   Option "{}" set'.format(option_name))
+
+    variable_cache.detach_storage()
+    manifest_run_states.reset()
+    state_file = variable_cache.get_value(variable_name='std::state-file', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    if state_file is not None:
+        from py_animus.models.variable_cache_storage import SqliteVariableCacheStorage, SqliteManifestRunStateStorage
+        variable_cache.attach_storage(storage=SqliteVariableCacheStorage(db_file=state_file))
+        manifest_run_states.attach_storage(storage=SqliteManifestRunStateStorage(db_file=state_file))
+        logger.info('   Variables will be kept in state file "{}"'.format(state_file))
+
+    from py_animus.helpers.yaml_helper import yaml_parse_cache
+    yaml_parse_cache.reset()
+    yaml_parse_cache.disable_disk_cache()
+    parse_cache_dir = variable_cache.get_value(variable_name='std::parse-cache-dir', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    if parse_cache_dir is not None:
+        yaml_parse_cache.enable_disk_cache(cache_dir=parse_cache_dir)
+        logger.info('   Parsed manifest files will be cached in "{}"'.format(parse_cache_dir))
+
+    from py_animus.helpers.artifact_cache import artifact_cache
+    artifact_cache_dir = variable_cache.get_value(variable_name='std::artifact-cache-dir', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    artifact_cache_max_size = variable_cache.get_value(variable_name='std::artifact-cache-max-size', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    if artifact_cache_max_size is not None:
+        artifact_cache_max_size = int(artifact_cache_max_size)
+    artifact_cache.configure(
+        cache_dir=artifact_cache_dir,
+        max_size_bytes=artifact_cache_max_size,
+        use_hardlinks=variable_cache.get_value(variable_name='std::artifact-cache-hardlinks', raise_exception_on_not_found=False, default_value_if_not_found=False) is True
+    )
+    if artifact_cache_dir is not None:
+        logger.info('   Downloaded files will be cached in "{}"'.format(artifact_cache_dir))
+
+    from py_animus.helpers.git_mirror_cache import git_mirror_cache
+    git_mirror_cache_dir = variable_cache.get_value(variable_name='std::git-mirror-cache-dir', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    git_mirror_cache.configure(cache_dir=git_mirror_cache_dir)
+    if git_mirror_cache_dir is not None:
+        logger.info('   Git repositories will be mirrored in "{}"'.format(git_mirror_cache_dir))
+
+    from py_animus.helpers import git_remote_probe, GIT_PROBE_CACHE_TTL_SECONDS
+    git_probe_cache_dir = variable_cache.get_value(variable_name='std::git-probe-cache-dir', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    git_probe_cache_ttl = variable_cache.get_value(variable_name='std::git-probe-cache-ttl', raise_exception_on_not_found=False, default_value_if_not_found=GIT_PROBE_CACHE_TTL_SECONDS)
+    git_remote_probe.configure(cache_dir=git_probe_cache_dir, ttl_seconds=int(git_probe_cache_ttl))
+    if git_probe_cache_dir is not None:
+        logger.info('   Git repository probes will be cached in "{}" for {} seconds'.format(git_probe_cache_dir, git_probe_cache_ttl))
+
+    variable_eviction_grace_period = variable_cache.get_value(variable_name='std::variable-eviction-grace-period', raise_exception_on_not_found=False, default_value_if_not_found=None)
+    if variable_eviction_grace_period is not None:
+        variable_cache.enable_eviction(grace_period=float(variable_eviction_grace_period))
+        logger.info('   Variables will be removed {} seconds after they expired'.format(variable_eviction_grace_period))
+    else:
+        variable_cache.disable_eviction()
+
     logger.info('   Init Done')
     return start_manifest, project_name
 
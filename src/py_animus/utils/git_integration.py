@@ -7,9 +7,14 @@
 """
 
 import os
-from git import Repo
-import urllib
+import threading
+from git import Repo, RemoteProgress
+import urllib.parse
 from py_animus.helpers.file_io import create_temp_directory, find_matching_files
+from py_animus.helpers.git_mirror_cache import git_mirror_cache
+
+
+GIT_CLONES_PER_HOST = 2
 
 
 def extract_parameters_from_url(
@@ -42,12 +47,153 @@ def extract_parameters_from_url(
     )
 
 
+class CloneProgress(RemoteProgress):
+    """Passes Git clone progress to a callback, once per stage and for every 10% of a stage that reports a total
+
+    The callback is called with the stage name (for example `Receiving objects`), the current count, the total count
+    (or None if unknown) and the message of Git.
+    """
+
+    STAGE_NAMES = {
+        RemoteProgress.COUNTING: 'Counting objects',
+        RemoteProgress.COMPRESSING: 'Compressing objects',
+        RemoteProgress.WRITING: 'Writing objects',
+        RemoteProgress.RECEIVING: 'Receiving objects',
+        RemoteProgress.RESOLVING: 'Resolving deltas',
+        RemoteProgress.FINDING_SOURCES: 'Finding sources',
+        RemoteProgress.CHECKING_OUT: 'Checking out files',
+    }
+
+    def __init__(self, callback: object):
+        super().__init__()
+        self.callback = callback
+        self.last_reported = dict()
+
+    def update(self, op_code, cur_count, max_count=None, message=''):
+        stage = op_code & RemoteProgress.OP_MASK
+        step = 0
+        if max_count:
+            step = int(10 * float(cur_count) / float(max_count))
+        if op_code & RemoteProgress.END:
+            step = 10
+        if self.last_reported.get(stage) == step:
+            return
+        self.last_reported[stage] = step
+        self.callback(self.STAGE_NAMES.get(stage, 'Stage {}'.format(stage)), cur_count, max_count, message)
+
+
+def git_clone(
+    url: str,
+    target_dir: str,
+    branch: str=None,
+    env: dict=None,
+    depth: int=None,
+    single_branch: bool=False,
+    clone_filter: str=None,
+    use_mirror_cache: bool=True,
+    progress_callback: object=None
+)->Repo:
+    """Clone a Git repository with optional shallow, single branch and partial clone options
+
+    When the Git mirror cache is enabled, the clone borrows objects from a local mirror of the repository with
+    `--reference` and `--dissociate`, so that only objects missing from the mirror are transferred.
+
+    Args:
+        url: A string containing the Git repository clone URL
+        target_dir: A string containing the target directory
+        branch: String containing the branch name to check out. Default is the default branch of the remote
+        env: Dictionary with environment variables for Git, for example `GIT_SSH_COMMAND`
+        depth: If set, create a shallow clone with the history truncated to this number of commits
+        single_branch: If True, only fetch the history of `branch`
+        clone_filter: If set, create a partial clone with this filter, for example `blob:none`
+        use_mirror_cache: Set to False to not use the Git mirror cache, even when it is enabled
+        progress_callback: If set, called with the progress of the clone. See `CloneProgress`
+
+    Returns:
+        The cloned `git.Repo`
+    """
+    clone_options = dict()
+    if branch is not None:
+        clone_options['branch'] = branch
+    if depth is not None:
+        clone_options['depth'] = int(depth)
+    if single_branch is True:
+        clone_options['single_branch'] = True
+    if clone_filter is not None:
+        clone_options['filter'] = clone_filter
+    if use_mirror_cache is True:
+        mirror_dir = git_mirror_cache.get_mirror(url=url, env=env)
+        if mirror_dir is not None:
+            clone_options['reference'] = mirror_dir
+            clone_options['dissociate'] = True
+    progress = None
+    if progress_callback is not None:
+        progress = CloneProgress(callback=progress_callback)
+    return Repo.clone_from(url=url, to_path=target_dir, progress=progress, env=env, **clone_options)
+
+
+def get_git_url_host(url: str)->str:
+    """Returns the host of a Git URL, for example `github.com` for both `https://github.com/a/b.git` and
+    `git@github.com:a/b.git`. Local paths and `file://` URLs return an empty string."""
+    if '://' in url:
+        host = urllib.parse.urlsplit(url).hostname
+        if host is None:
+            return ''
+        return host.lower()
+    if ':' in url.split('/', 1)[0]:
+        return url.split(':', 1)[0].rsplit('@', 1)[-1].lower()
+    return ''
+
+
+class GitCloneHostLimit:
+    """Limits the number of Git clones from the same host that run at the same time.
+
+    Clones run in the thread of the caller: this class does not start any threads, and clones only overlap when
+    callers run in different threads, for example when manifests are processed concurrently (see the
+    `--parallel-workers` command line option, which defaults to 1). Callers cloning from a busy host wait for a free
+    slot, while clones from other hosts are not held up.
+
+    Attributes:
+        max_clones_per_host: The maximum number of clones running at the same time from the same host
+    """
+
+    def __init__(self, max_clones_per_host: int=GIT_CLONES_PER_HOST):
+        self.max_clones_per_host = max_clones_per_host
+        self.host_semaphores = dict()
+        self.lock = threading.Lock()
+
+    def _get_host_semaphore(self, host: str)->threading.Semaphore:
+        with self.lock:
+            if host not in self.host_semaphores:
+                self.host_semaphores[host] = threading.Semaphore(self.max_clones_per_host)
+            return self.host_semaphores[host]
+
+    def run(self, function: object, url: str, **kwargs):
+        """Runs `function(url=url, **kwargs)` once the host of `url` has a free slot
+
+        Args:
+          function: The function that clones the repository
+          url: The Git URL
+
+        Returns:
+            The return value of `function`
+        """
+        with self._get_host_semaphore(host=get_git_url_host(url=url)):
+            return function(url=url, **kwargs)
+
+
+git_clone_host_limit = GitCloneHostLimit()
+
+
 def git_clone_to_local(
     git_clone_url: str,
     branch: str='main',
     target_dir: str=None,
     ssh_private_key_path: str=None,
-    set_no_verify_ssl: bool=False
+    set_no_verify_ssl: bool=False,
+    depth: int=None,
+    single_branch: bool=False,
+    clone_filter: str=None
 )->str:
     """Clone a Git repository, and check out a branch
 
@@ -57,6 +203,9 @@ def git_clone_to_local(
         target_dir: A string containing the target directory. Default is `None` in which case a random temporary directory will be created and returned
         ssh_private_key_path: A string containing the SSH private key to use. Optional, and if value is `None`, the default transport (HTTPS) will be used.
         set_no_verify_ssl: A boolean that will not check SSL certificates if set to True (default=`False`). Useful when using self-signed certificates, but use with caution!!
+        depth: If set, create a shallow clone with the history truncated to this number of commits
+        single_branch: If True, only fetch the history of `branch`
+        clone_filter: If set, create a partial clone with this filter, for example `blob:none`
 
     Returns:
         A string to the location of the cloned repository.
@@ -71,13 +220,21 @@ def git_clone_to_local(
     if target_dir is None:
         target_dir = create_temp_directory()
 
+    env = None
     if ssh_private_key_path is not None:
-        git_ssh_cmd = 'ssh -i {}'.format(ssh_private_key_path)
-        Repo.clone_from(url=git_clone_url, to_path=target_dir, env=dict(GIT_SSH_COMMAND=git_ssh_cmd), branch=branch)
+        env = dict(GIT_SSH_COMMAND='ssh -i {}'.format(ssh_private_key_path))
     elif set_no_verify_ssl is True:
-        Repo.clone_from(url=git_clone_url, to_path=target_dir, env=dict(GIT_SSL_NO_VERIFY='1'), branch=branch)
-    else:
-        Repo.clone_from(git_clone_url, target_dir, branch=branch)
+        env = dict(GIT_SSL_NO_VERIFY='1')
+    git_clone_host_limit.run(
+        function=git_clone,
+        url=git_clone_url,
+        target_dir=target_dir,
+        branch=branch,
+        env=env,
+        depth=depth,
+        single_branch=single_branch,
+        clone_filter=clone_filter
+    )
 
     return target_dir
 
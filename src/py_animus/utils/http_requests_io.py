@@ -7,30 +7,137 @@
 """
 
 import os
+import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from py_animus.animus_logging import logger
 
 
-def download_files(urls: list, target_dir: str='/tmp', set_no_verify_ssl: bool=False)->list:
-    files = list()
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session()->requests.Session:
+    """Returns the `requests.Session` shared by all downloads, so that connections are pooled and kept alive"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+            _http_session.mount('http://', adapter)
+            _http_session.mount('https://', adapter)
+        return _http_session
+
+
+def _get_sidecar_file(outfile: str)->str:
+    return '{}.meta.json'.format(outfile)
+
+
+def _read_validators(outfile: str, url: str)->dict:
+    sidecar_file = _get_sidecar_file(outfile=outfile)
+    if os.path.exists(outfile) is False or os.path.exists(sidecar_file) is False:
+        return dict()
+    try:
+        with open(sidecar_file, 'r') as f:
+            validators = json.load(f)
+    except Exception:
+        return dict()
+    if validators.get('url') != url:
+        return dict()
+    return validators
+
+
+def _write_validators(outfile: str, url: str, response: requests.Response):
+    validators = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    sidecar_file = _get_sidecar_file(outfile=outfile)
+    if validators['etag'] is None and validators['last_modified'] is None:
+        if os.path.exists(sidecar_file):
+            os.unlink(sidecar_file)
+        return
+    with open(sidecar_file, 'w') as f:
+        json.dump(validators, f)
+
+
+def download_file(url: str, outfile: str, verify_ssl: bool=True, chunk_size: int=DOWNLOAD_CHUNK_SIZE)->bool:
+    """Downloads a URL to a local file with a conditional, streamed request.
+
+    When the file was downloaded before and the server supplied an `ETag` or `Last-Modified` header, these are sent
+    as `If-None-Match` and `If-Modified-Since`. A `304 Not Modified` response keeps the existing file. Otherwise the
+    body is streamed to a temporary file that replaces `outfile` once complete.
+
+    Args:
+      url: The URL to download
+      outfile: The local file
+      verify_ssl: Set to False to skip SSL verification
+      chunk_size: The number of bytes to write at a time
+
+    Returns:
+        True if `outfile` holds the content of the URL, or False if the server responded with an error
+    """
+    headers = dict()
+    validators = _read_validators(outfile=outfile, url=url)
+    if validators.get('etag') is not None:
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified') is not None:
+        headers['If-Modified-Since'] = validators['last_modified']
+    with get_http_session().get(url, headers=headers, verify=verify_ssl, stream=True) as r:
+        if r.status_code == 304:
+            logger.debug('Not modified: %s', url)
+            return True
+        if r.status_code >= 400:
+            logger.error('Download of "{}" failed with status {}'.format(url, r.status_code))
+            return False
+        tmp_outfile = '{}.{}.{}.part'.format(outfile, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp_outfile, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_outfile, outfile)
+        finally:
+            if os.path.exists(tmp_outfile):
+                os.unlink(tmp_outfile)
+        _write_validators(outfile=outfile, url=url, response=r)
+    logger.debug('Downloaded %s to %s', url, outfile)
+    return True
+
+
+def download_files(urls: list, target_dir: str='/tmp', set_no_verify_ssl: bool=False, max_workers: int=DOWNLOAD_WORKERS)->list:
+    outfiles = list()
+    unique_urls = list()
     for url in urls:
         outfile = '{}{}{}'.format(
             target_dir,
             os.sep,
             hashlib.sha256(url.encode('utf-8')).hexdigest()
         )
-        if outfile not in files:
-            if os.path.exists(outfile):
-                os.unlink(outfile)
-            r = None
-            if set_no_verify_ssl is False:
-                r = requests.get(url)
-            else:
-                r = requests.get(url, verify=False)
-            if r is not None:
-                with open(outfile, 'w') as f:
-                    f.write(r.text)
-                    files.append(outfile)
-    return files
+        if outfile not in outfiles:
+            outfiles.append(outfile)
+            unique_urls.append(url)
+    if len(unique_urls) == 0:
+        return list()
+
+    def _download(url_and_outfile: tuple)->bool:
+        return download_file(url=url_and_outfile[0], outfile=url_and_outfile[1], verify_ssl=not set_no_verify_ssl)
 
+    max_workers = max(1, min(max_workers, len(unique_urls)))
+    if max_workers == 1:
+        results = [_download(url_and_outfile) for url_and_outfile in zip(unique_urls, outfiles)]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='animus-download') as executor:
+            results = list(executor.map(_download, zip(unique_urls, outfiles)))
+    files = list()
+    for outfile, result in zip(outfiles, results):
+        if result is True:
+            files.append(outfile)
+    return files
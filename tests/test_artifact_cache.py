@@ -0,0 +1,162 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+
+
+from py_animus.helpers.artifact_cache import ArtifactCache, artifact_cache
+from py_animus.extensions.web_download_file_v1 import WebDownloadFile
+from py_animus.models import actions, variable_cache
+
+
+class TestClassArtifactCache(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = '{}{}cache'.format(self.tmp_dir.name, os.sep)
+        self.source_files = list()
+        for i in range(3):
+            source_file = '{}{}source-{}'.format(self.tmp_dir.name, os.sep, i)
+            with open(source_file, 'w') as f:
+                f.write(str(i) * 100)
+            self.source_files.append(source_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _target_file(self, name: str)->str:
+        return '{}{}{}'.format(self.tmp_dir.name, os.sep, name)
+
+    def test_cached_file_is_placed_at_target(self):
+        cache = ArtifactCache()
+        cache.configure(cache_dir=self.cache_dir)
+        self.assertFalse(cache.get_file(url='http://example/a', validators={'etag': '"1"'}, target_file=self._target_file('a')))
+        digest = cache.add_file(url='http://example/a', validators={'etag': '"1"'}, source_file=self.source_files[0])
+        self.assertIsNotNone(digest)
+        self.assertTrue(cache.get_file(url='http://example/a', validators={'etag': '"1"'}, target_file=self._target_file('a')))
+        with open(self._target_file('a'), 'r') as f:
+            self.assertEqual(f.read(), '0' * 100)
+        self.assertFalse(cache.get_file(url='http://example/a', validators={'etag': '"2"'}, target_file=self._target_file('b')))
+
+        next_run_cache = ArtifactCache()
+        next_run_cache.configure(cache_dir=self.cache_dir)
+        self.assertTrue(next_run_cache.get_file(url='http://example/a', validators={'etag': '"1"'}, target_file=self._target_file('c')))
+
+    def test_identical_content_is_stored_once(self):
+        cache = ArtifactCache()
+        cache.configure(cache_dir=self.cache_dir)
+        digest_1 = cache.add_file(url='http://example/a', validators={'etag': '"1"'}, source_file=self.source_files[0])
+        digest_2 = cache.add_file(url='http://mirror/a', validators={'etag': '"x"'}, source_file=self.source_files[0])
+        self.assertEqual(digest_1, digest_2)
+        self.assertEqual(len(os.listdir('{}{}objects'.format(self.cache_dir, os.sep))), 1)
+        self.assertEqual(cache.total_size(), 100)
+
+    def test_hardlinks(self):
+        cache = ArtifactCache()
+        cache.configure(cache_dir=self.cache_dir, use_hardlinks=True)
+        digest = cache.add_file(url='http://example/a', validators={'etag': '"1"'}, source_file=self.source_files[0])
+        cache.get_file(url='http://example/a', validators={'etag': '"1"'}, target_file=self._target_file('a'))
+        self.assertTrue(os.path.samefile(self._target_file('a'), '{}{}objects{}{}'.format(self.cache_dir, os.sep, os.sep, digest)))
+
+    def test_least_recently_used_files_are_evicted(self):
+        cache = ArtifactCache()
+        cache.configure(cache_dir=self.cache_dir, max_size_bytes=250)
+        cache.add_file(url='http://example/0', validators={'etag': '"1"'}, source_file=self.source_files[0])
+        time.sleep(0.01)
+        cache.add_file(url='http://example/1', validators={'etag': '"1"'}, source_file=self.source_files[1])
+        time.sleep(0.01)
+        cache.get_file(url='http://example/0', validators={'etag': '"1"'}, target_file=self._target_file('a'))
+        time.sleep(0.01)
+        cache.add_file(url='http://example/2', validators={'etag': '"1"'}, source_file=self.source_files[2])
+        self.assertEqual(cache.total_size(), 200)
+        self.assertTrue(cache.get_file(url='http://example/0', validators={'etag': '"1"'}, target_file=self._target_file('b')))
+        self.assertFalse(cache.get_file(url='http://example/1', validators={'etag': '"1"'}, target_file=self._target_file('c')))
+        self.assertTrue(cache.get_file(url='http://example/2', validators={'etag': '"1"'}, target_file=self._target_file('d')))
+
+
+class CountingHttpRequestHandler(SimpleHTTPRequestHandler):   # pragma: no cover
+
+    get_count = 0
+
+    def do_GET(self):
+        CountingHttpRequestHandler.get_count += 1
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+class TestClassWebDownloadFileArtifactCache(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        CountingHttpRequestHandler.get_count = 0
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.www_dir = '{}{}www'.format(self.tmp_dir.name, os.sep)
+        os.mkdir(self.www_dir)
+        with open('{}{}artifact.bin'.format(self.www_dir, os.sep), 'wb') as f:
+            f.write(b'artifact' * 1000)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(CountingHttpRequestHandler, directory=self.www_dir))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/artifact.bin'.format(self.server.server_address[1])
+        artifact_cache.configure(cache_dir='{}{}cache'.format(self.tmp_dir.name, os.sep))
+        actions.set_command(command='apply')
+
+    def tearDown(self):
+        artifact_cache.configure(cache_dir=None)
+        variable_cache.delete_all_variables_starting_with(start_str='WebDownloadFile:')
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _apply(self, name: str, target_file: str, use_artifact_cache: bool=True):
+        spec = {'sourceUrl': self.url, 'targetOutputFile': target_file}
+        if use_artifact_cache is False:
+            spec['artifactCache'] = False
+        manifest = WebDownloadFile()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'WebDownloadFile',
+                'version': 'v1',
+                'metadata': {'name': name},
+                'spec': spec,
+            }
+        )
+        manifest.determine_actions()
+        manifest.apply_manifest()
+
+    def test_same_artifact_is_downloaded_once(self):
+        target_files = ['{}{}target-{}.bin'.format(self.tmp_dir.name, os.sep, i) for i in range(3)]
+        for i, target_file in enumerate(target_files):
+            self._apply(name='download-{}'.format(i), target_file=target_file)
+        self.assertEqual(CountingHttpRequestHandler.get_count, 1)
+        for target_file in target_files:
+            with open(target_file, 'rb') as f:
+                self.assertEqual(f.read(), b'artifact' * 1000)
+
+    def test_artifact_cache_opt_out(self):
+        target_files = ['{}{}target-{}.bin'.format(self.tmp_dir.name, os.sep, i) for i in range(2)]
+        for i, target_file in enumerate(target_files):
+            self._apply(name='download-{}'.format(i), target_file=target_file, use_artifact_cache=False)
+        self.assertEqual(CountingHttpRequestHandler.get_count, 2)
+        self.assertEqual(artifact_cache.total_size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
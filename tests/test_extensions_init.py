@@ -0,0 +1,381 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+from unittest import mock
+
+
+from py_animus.extensions import UnitOfWork, AllWork, ExecutionPlan
+from py_animus.models.extensions import ManifestBase, VariableTemplate
+from py_animus.models import actions, Action, variable_cache, Variable, manifest_run_states
+from py_animus.models.variable_cache_storage import SqliteVariableCacheStorage, SqliteManifestRunStateStorage
+
+running_path = os.getcwd()
+print('Current Working Path: {}'.format(running_path))
+
+
+run_log = list()
+run_log_lock = threading.Lock()
+drifted_manifest_names = set()
+
+
+class MockWorkExtension(ManifestBase):    # pragma: no cover
+
+    def __init__(self, post_parsing_method: object=None, version: str='v1', supported_versions: tuple=('v1',)):
+        super().__init__(post_parsing_method=post_parsing_method, version=version, supported_versions=supported_versions)
+
+    def implemented_manifest_differ_from_this_manifest(self)->bool:
+        return self.metadata['name'] in drifted_manifest_names
+
+    def apply_manifest(self):
+        with run_log_lock:
+            run_log.append(('start', self.metadata['name'], time.time()))
+        time.sleep(float(self.spec['sleep']))
+        if 'output' in self.spec:
+            variable_cache.store_variable(
+                variable=Variable(
+                    name=self._var_name(var_name='VALUE'),
+                    initial_value=self.spec['output']['value'],
+                    mask_in_logs='{}'.format(self.spec['output']['masked']).lower().startswith('t')
+                ),
+                overwrite_existing=True
+            )
+        if '{}'.format(self.spec['fail']).lower().startswith('t'):
+            raise Exception('Failing on purpose')
+        with run_log_lock:
+            run_log.append(('end', self.metadata['name'], time.time()))
+
+    def delete_manifest(self):
+        return
+
+
+def _create_unit_of_work(name: str, apply_dependencies: list=list(), sleep: float=0.0, fail: bool=False, extra_metadata: dict=dict())->UnitOfWork:
+    metadata = {'name': name}
+    metadata.update(extra_metadata)
+    if len(apply_dependencies) > 0:
+        metadata['dependencies'] = {'apply': apply_dependencies}
+    work_instance = MockWorkExtension()
+    work_instance.parse_manifest(
+        manifest_data={
+            'kind': 'MockWorkExtension',
+            'version': 'v1',
+            'metadata': metadata,
+            'spec': {'sleep': sleep, 'fail': fail},
+        }
+    )
+    return UnitOfWork(work_instance=work_instance)
+
+
+def _event_time(event: str, name: str)->float:
+    for logged_event, logged_name, logged_time in run_log:
+        if logged_event == event and logged_name == name:
+            return logged_time
+    return None
+
+
+def _build_plan(units_of_work: list)->ExecutionPlan:
+    all_work = AllWork()
+    for uow in units_of_work:
+        all_work.add_unit_of_work(unit_of_work=uow)
+    plan = ExecutionPlan(all_work=all_work)
+    plan.calculate_execution_plan()
+    return plan
+
+
+class TestClassAllWork(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def test_add_get_and_remove_unit_of_work(self):
+        all_work = AllWork()
+        for name in ('c', 'a', 'b',):
+            all_work.add_unit_of_work(unit_of_work=_create_unit_of_work(name=name))
+        all_work.add_unit_of_work(unit_of_work=_create_unit_of_work(name='a'))
+        self.assertEqual(len(all_work), 3)
+        self.assertEqual([uow.id for uow in all_work], ['c', 'a', 'b'])
+        self.assertTrue(all_work.unit_of_work_by_id_exists(id='a'))
+        self.assertEqual(all_work.get_unit_of_work_by_id(id='b').id, 'b')
+        self.assertIsNone(all_work.get_unit_of_work_by_id(id='x'))
+
+        all_work.remove_unit_of_work(id='a')
+        all_work.remove_unit_of_work(id='x')
+        self.assertFalse(all_work.unit_of_work_by_id_exists(id='a'))
+        self.assertEqual([uow.id for uow in all_work.all_work_list], ['c', 'b'])
+
+    def test_all_work_list_can_be_assigned(self):
+        all_work = AllWork()
+        all_work.all_work_list = [_create_unit_of_work(name='x'), _create_unit_of_work(name='y'),]
+        self.assertEqual(len(all_work), 2)
+        self.assertEqual(all_work.get_unit_of_work_by_id(id='y').id, 'y')
+
+
+class TestClassExecutionPlanCalculation(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def test_dependencies_are_planned_first(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='d', apply_dependencies=['b', 'c',]),
+                _create_unit_of_work(name='c', apply_dependencies=['a',]),
+                _create_unit_of_work(name='b', apply_dependencies=['a',]),
+                _create_unit_of_work(name='a'),
+            ]
+        )
+        apply_order = plan.execution_order['apply']
+        self.assertEqual(len(apply_order), 4)
+        self.assertEqual(apply_order[0], 'a')
+        self.assertEqual(apply_order[-1], 'd')
+        self.assertEqual(plan.execution_order['delete'], ['d', 'c', 'b', 'a'])
+
+    def test_skipped_units_of_work_are_not_planned(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='a', extra_metadata={'skipDeleteAll': True}),
+                _create_unit_of_work(name='b', apply_dependencies=['a',]),
+            ]
+        )
+        self.assertEqual(plan.execution_order['apply'], ['a', 'b'])
+        self.assertEqual(plan.execution_order['delete'], ['b',])
+
+    def test_missing_dependency_is_skipped(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='a', apply_dependencies=['does-not-exist',]),
+            ]
+        )
+        self.assertEqual(plan.execution_order['apply'], ['a',])
+
+    def test_circular_dependency_raises_exception_with_names(self):
+        all_work = AllWork()
+        for uow in (
+            _create_unit_of_work(name='a', apply_dependencies=['c',]),
+            _create_unit_of_work(name='b', apply_dependencies=['a',]),
+            _create_unit_of_work(name='c', apply_dependencies=['b',]),
+            _create_unit_of_work(name='d', apply_dependencies=['c',]),
+        ):
+            all_work.add_unit_of_work(unit_of_work=uow)
+        plan = ExecutionPlan(all_work=all_work)
+        with self.assertRaises(Exception) as context:
+            plan.calculate_execution_plan()
+        message = str(context.exception)
+        self.assertTrue('Circular dependency' in message)
+        self.assertTrue(
+            'a -> b -> c -> a' in message or 'b -> c -> a -> b' in message or 'c -> a -> b -> c' in message,
+            message
+        )
+        self.assertTrue("'d'" in message, message)
+
+    def test_long_dependency_chain(self):
+        units_of_work = [_create_unit_of_work(name='uow-0'),]
+        for i in range(1, 2000):
+            units_of_work.append(_create_unit_of_work(name='uow-{}'.format(i), apply_dependencies=['uow-{}'.format(i-1),]))
+        units_of_work.reverse()
+        plan = _build_plan(units_of_work=units_of_work)
+        self.assertEqual(len(plan.execution_order['apply']), 2000)
+        self.assertEqual(plan.execution_order['apply'][0], 'uow-0')
+        self.assertEqual(plan.execution_order['apply'][-1], 'uow-1999')
+
+    def test_plan_is_calculated_once_before_work(self):
+        run_log.clear()
+        plan = ExecutionPlan(all_work=AllWork())
+        with mock.patch.object(plan, '_calculate_execution_order_for_action', wraps=plan._calculate_execution_order_for_action) as calculate:
+            plan.add_unit_of_work_to_execution_order(uow=_create_unit_of_work(name='lazy-b', apply_dependencies=['lazy-a',]))
+            plan.add_unit_of_work_to_execution_order(uow=_create_unit_of_work(name='lazy-a'))
+            self.assertEqual(calculate.call_count, 0)
+            plan.do_work(scope='default', action='apply')
+            self.assertEqual(calculate.call_count, 2)
+        self.assertEqual([name for event, name, event_time in run_log if event == 'start'], ['lazy-a', 'lazy-b'])
+
+
+class TestClassManifestVariableResolution(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        variable_cache.store_variable(variable=Variable(name='resolution-test:a', initial_value='value-a'), overwrite_existing=True)
+        variable_cache.store_variable(variable=Variable(name='resolution-test:b', initial_value=5), overwrite_existing=True)
+
+    def _parse(self, spec: dict)->MockWorkExtension:
+        work_instance = MockWorkExtension()
+        work_instance.parse_manifest(
+            manifest_data={
+                'kind': 'MockWorkExtension',
+                'version': 'v1',
+                'metadata': {'name': 'resolution-test', 'label': '!Variable resolution-test:a'},
+                'spec': spec,
+            }
+        )
+        return work_instance
+
+    def test_template_segments(self):
+        template = VariableTemplate(source='x !Variable one:two-3 y !Variable z')
+        self.assertEqual(template.variable_names, ('one:two-3', 'z',))
+        self.assertEqual(template.segments[0], (False, 'x '))
+        self.assertEqual(template.segments[-1], (True, 'z'))
+
+    def test_only_paths_with_references_are_compiled(self):
+        work_instance = self._parse(spec={'plain': 'text', 'nested': {'items': ['one', 'two !Variable resolution-test:a']}, 'sleep': 0, 'fail': False})
+        self.assertEqual([path for path, template in work_instance.variable_templates['spec']], [('nested', 'items', 1),])
+        self.assertEqual([path for path, template in work_instance.variable_templates['metadata']], [('label',),])
+
+    def test_resolve_manifest_variables(self):
+        original_spec = {
+            'plain': {'untouched': ['a', 'b']},
+            'nested': {'items': ['one', 'two !Variable resolution-test:a and !Variable resolution-test:b']},
+            'unknown': '!Variable resolution-test:does-not-exist',
+        }
+        work_instance = self._parse(spec=original_spec)
+        parsed_spec = work_instance.spec
+        work_instance.resolve_manifest_variables()
+        self.assertEqual(work_instance.metadata['label'], 'value-a')
+        self.assertEqual(work_instance.spec['nested']['items'], ['one', 'two value-a and 5'])
+        self.assertEqual(work_instance.spec['unknown'], '!Variable resolution-test:does-not-exist')
+        self.assertEqual(parsed_spec['nested']['items'][1], 'two !Variable resolution-test:a and !Variable resolution-test:b')
+        self.assertIs(work_instance.spec['plain'], parsed_spec['plain'])
+        self.assertEqual(work_instance.spec, work_instance.resolve_all_pending_variables(iterable=parsed_spec))
+
+    def test_log_debug_keeps_percent_in_manifest_name(self):
+        work_instance = MockWorkExtension()
+        work_instance.parse_manifest(manifest_data={'kind': 'MockWorkExtension', 'version': 'v1', 'metadata': {'name': '100%-done'}, 'spec': {}})
+        work_instance.debug = True
+        with self.assertLogs(logger=work_instance.logger, level='DEBUG') as captured:
+            work_instance.log_debug('no arguments')
+            work_instance.log_debug('value=%s', 'x')
+        self.assertEqual([record.getMessage() for record in captured.records], ['[MockWorkExtension:100%-done:v1] no arguments', '[MockWorkExtension:100%-done:v1] value=x'])
+
+    def test_changed_structure_falls_back_to_full_resolution(self):
+        work_instance = self._parse(spec={'items': ['!Variable resolution-test:a',]})
+        work_instance.spec = {'items': 'now !Variable resolution-test:a'}
+        work_instance.resolve_manifest_variables()
+        self.assertEqual(work_instance.spec, {'items': 'now value-a'})
+
+
+class TestClassExecutionPlanDoWork(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        run_log.clear()
+        actions.set_command(command='apply')
+        manifest_run_states.reset()
+
+    def tearDown(self):
+        manifest_run_states.reset()
+        variable_cache.delete_variable(variable_name='std::force')
+
+    def test_unchanged_manifest_is_skipped_on_next_apply(self):
+        work_instance = _create_unit_of_work(name='incremental', extra_metadata={'label': '!Variable incremental-test:input'}).work_instance
+        variable_cache.store_variable(variable=Variable(name='incremental-test:input', initial_value='one'), overwrite_existing=True)
+
+        def _apply():
+            work_instance.resolve_manifest_variables()
+            UnitOfWork(work_instance=work_instance).run(action='apply', scope='default', rerouted=True)
+            return len([name for event, name, t in run_log if event == 'end'])
+
+        self.assertEqual(_apply(), 1)
+        self.assertEqual(manifest_run_states.get_state(kind='MockWorkExtension', name='incremental', scope_name='default')['outcome'], Action.APPLY_DONE)
+        self.assertEqual(_apply(), 1, 'Expected the unchanged manifest to be skipped')
+
+        variable_cache.store_variable(variable=Variable(name='std::force', initial_value=True), overwrite_existing=True)
+        self.assertEqual(_apply(), 2, 'Expected --force to apply the manifest again')
+        variable_cache.delete_variable(variable_name='std::force')
+
+        work_instance.metadata['label'] = '!Variable incremental-test:input'
+        variable_cache.store_variable(variable=Variable(name='incremental-test:input', initial_value='two'), overwrite_existing=True)
+        self.assertEqual(_apply(), 3, 'Expected a changed input to apply the manifest again')
+
+        drifted_manifest_names.add('incremental')
+        self.assertEqual(_apply(), 4, 'Expected a drifted implementation to apply the manifest again')
+        drifted_manifest_names.clear()
+
+    def test_manifest_with_outputs_not_restored_from_state_file_is_applied_again(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_file = '{}{}state.db'.format(tmp_dir, os.sep)
+            for masked, expected_apply_count in ((False, 1), (True, 2),):
+                run_log.clear()
+                work_instance = _create_unit_of_work(name='outputs-{}'.format(masked)).work_instance
+                work_instance.spec['output'] = {'value': 'secret', 'masked': masked}
+                for run in range(2):
+                    # Every run starts with the variables and run states loaded from the state file
+                    variable_cache.delete_all_variables_starting_with(start_str='MockWorkExtension:')
+                    variable_cache.attach_storage(storage=SqliteVariableCacheStorage(db_file=state_file))
+                    manifest_run_states.attach_storage(storage=SqliteManifestRunStateStorage(db_file=state_file))
+                    UnitOfWork(work_instance=work_instance).run(action='apply', scope='default', rerouted=True)
+                    variable_cache.persist()
+                    variable_cache.detach_storage()
+                    manifest_run_states.reset()
+                self.assertEqual(len([name for event, name, t in run_log if event == 'end']), expected_apply_count)
+                self.assertEqual(variable_cache.get_value(variable_name=work_instance._var_name(var_name='VALUE')), 'secret')
+        variable_cache.delete_all_variables_starting_with(start_str='MockWorkExtension:')
+
+    def test_serial_execution_follows_plan_order(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='c', apply_dependencies=['b',]),
+                _create_unit_of_work(name='a'),
+                _create_unit_of_work(name='b', apply_dependencies=['a',]),
+            ]
+        )
+        plan.do_work(scope='default', action='apply')
+        names = [name for event, name, t in run_log if event == 'end']
+        self.assertEqual(names, ['a', 'b', 'c'])
+
+    def test_concurrent_execution_overlaps_independent_work(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='w1', sleep=0.3),
+                _create_unit_of_work(name='w2', sleep=0.3),
+                _create_unit_of_work(name='w3', sleep=0.3),
+                _create_unit_of_work(name='w4', sleep=0.3),
+            ]
+        )
+        start = time.time()
+        plan.do_work(scope='default', action='apply', max_workers=4)
+        duration = time.time() - start
+        self.assertEqual(len(plan.completed_work_ids), 4)
+        self.assertTrue(duration < 1.0, 'Expected overlapping execution but took {} seconds'.format(duration))
+
+    def test_concurrent_execution_respects_dependencies(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='root', sleep=0.1),
+                _create_unit_of_work(name='left', apply_dependencies=['root',], sleep=0.1),
+                _create_unit_of_work(name='right', apply_dependencies=['root',], sleep=0.1),
+                _create_unit_of_work(name='join', apply_dependencies=['left', 'right',]),
+            ]
+        )
+        plan.do_work(scope='default', action='apply', max_workers=4)
+        self.assertTrue(_event_time('start', 'left') >= _event_time('end', 'root'))
+        self.assertTrue(_event_time('start', 'right') >= _event_time('end', 'root'))
+        self.assertTrue(_event_time('start', 'join') >= _event_time('end', 'left'))
+        self.assertTrue(_event_time('start', 'join') >= _event_time('end', 'right'))
+        self.assertEqual(len(plan.completed_work_ids), 4)
+
+    def test_concurrent_execution_failure_stops_dependants(self):
+        plan = _build_plan(
+            units_of_work=[
+                _create_unit_of_work(name='broken', fail=True),
+                _create_unit_of_work(name='child', apply_dependencies=['broken',]),
+            ]
+        )
+        with self.assertRaises(Exception):
+            plan.do_work(scope='default', action='apply', max_workers=2)
+        self.assertIsNone(_event_time('start', 'child'))
+
+
+if __name__ == '__main__':
+    unittest.main()
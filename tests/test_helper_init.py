@@ -18,6 +18,8 @@ print('sys.path={}'.format(sys.path))
 import unittest
 
 
+from unittest import mock
+from git import Repo, Actor
 from py_animus.helpers import *
 
 class TestFunctionGetUtcTimestamp(unittest.TestCase):    # pragma: no cover
@@ -74,5 +76,73 @@ class TestFunctionIsUrlAGitRepo(unittest.TestCase):    # pragma: no cover
         self.assertTrue(result)
 
 
+class TestClassGitRemoteProbe(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        repo_dir = '{}{}source'.format(self.tmp_dir.name, os.sep)
+        self.repo = Repo.init(repo_dir, initial_branch='main')
+        with open('{}{}README.md'.format(repo_dir, os.sep), 'w') as f:
+            f.write('test')
+        self.repo.index.add(['{}{}README.md'.format(repo_dir, os.sep)])
+        actor = Actor('Test', 'test@example.com')
+        self.repo.index.commit('Initial commit', author=actor, committer=actor)
+        self.repo.git.tag('v1')
+        self.url = 'file://{}'.format(repo_dir)
+        self.cache_dir = '{}{}cache'.format(self.tmp_dir.name, os.sep)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_remote_is_queried_once_per_run(self):
+        probe = GitRemoteProbe()
+        with mock.patch.object(probe, '_query_remote', wraps=probe._query_remote) as query_remote:
+            for i in range(3):
+                refs = probe.get_remote_refs(url=self.url)
+                self.assertEqual(refs, {'refs/heads/main': self.repo.head.commit.hexsha})
+            self.assertIsNone(probe.get_remote_refs(url='{}-missing'.format(self.url)))
+            self.assertIsNone(probe.get_remote_refs(url='{}-missing'.format(self.url)))
+        self.assertEqual(query_remote.call_count, 2)
+
+    def test_results_on_disk_are_reused_until_expired(self):
+        probe = GitRemoteProbe()
+        probe.configure(cache_dir=self.cache_dir)
+        probe.get_remote_refs(url=self.url)
+
+        next_run_probe = GitRemoteProbe()
+        next_run_probe.configure(cache_dir=self.cache_dir)
+        with mock.patch.object(next_run_probe, '_query_remote', wraps=next_run_probe._query_remote) as query_remote:
+            self.assertEqual(next_run_probe.get_remote_refs(url=self.url), {'refs/heads/main': self.repo.head.commit.hexsha})
+            self.assertEqual(query_remote.call_count, 0)
+            next_run_probe.get_remote_refs(url=self.url, allow_disk_cache=False)
+            next_run_probe.get_remote_refs(url=self.url, allow_disk_cache=False)
+            self.assertEqual(query_remote.call_count, 1)
+
+        expired_probe = GitRemoteProbe()
+        expired_probe.configure(cache_dir=self.cache_dir, ttl_seconds=-1)
+        with mock.patch.object(expired_probe, '_query_remote', wraps=expired_probe._query_remote) as query_remote:
+            expired_probe.get_remote_refs(url=self.url)
+            self.assertEqual(query_remote.call_count, 1)
+
+    def test_failed_query_is_not_kept_on_disk(self):
+        probe = GitRemoteProbe()
+        probe.configure(cache_dir=self.cache_dir)
+        self.assertIsNone(probe.get_remote_refs(url='{}-missing'.format(self.url)))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+        next_run_probe = GitRemoteProbe()
+        next_run_probe.configure(cache_dir=self.cache_dir)
+        with mock.patch.object(next_run_probe, '_query_remote', wraps=next_run_probe._query_remote) as query_remote:
+            next_run_probe.get_remote_refs(url='{}-missing'.format(self.url))
+            self.assertEqual(query_remote.call_count, 1)
+
+    def test_is_url_a_git_repo_uses_probe(self):
+        git_remote_probe.reset()
+        self.assertTrue(is_url_a_git_repo(url='{}{}00abc'.format(self.url, '%')))
+        self.assertIn(self.url, git_remote_probe.results)
+        self.assertFalse(is_url_a_git_repo(url='{}-missing'.format(self.url)))
+
+
 if __name__ == '__main__':
     unittest.main()
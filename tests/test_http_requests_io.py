@@ -9,6 +9,9 @@
 import sys
 import os
 import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
 print('sys.path={}'.format(sys.path))
 
@@ -52,5 +55,84 @@ class TestClassMainBasic01(unittest.TestCase):    # pragma: no cover
         self.assertTrue('GNU GENERAL PUBLIC LICENSE' in content)
 
 
+class RecordingHttpRequestHandler(SimpleHTTPRequestHandler):   # pragma: no cover
+
+    requests_seen = list()
+
+    def do_GET(self):
+        if self.path.startswith('/etag/'):
+            RecordingHttpRequestHandler.requests_seen.append((self.path, self.headers.get('If-None-Match')))
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            content = b'content with etag'
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        RecordingHttpRequestHandler.requests_seen.append((self.path, self.headers.get('If-Modified-Since')))
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+class TestFunctionDownloadFilesLocalServer(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        RecordingHttpRequestHandler.requests_seen = list()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.www_dir = '{}{}www'.format(self.tmp_dir.name, os.sep)
+        self.download_dir = '{}{}downloads'.format(self.tmp_dir.name, os.sep)
+        os.mkdir(self.www_dir)
+        os.mkdir(self.download_dir)
+        for i in range(5):
+            with open('{}{}file-{}.txt'.format(self.www_dir, os.sep, i), 'w') as f:
+                f.write('file number {}\n'.format(i) * 1000)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(RecordingHttpRequestHandler, directory=self.www_dir))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_concurrent_download_keeps_url_order(self):
+        urls = ['{}/file-{}.txt'.format(self.base_url, i) for i in range(5)]
+        files = download_files(urls=urls + urls[0:1], target_dir=self.download_dir, max_workers=3)
+        self.assertEqual(len(files), 5)
+        for i, file in enumerate(files):
+            with open(file, 'r') as f:
+                self.assertTrue(f.read().startswith('file number {}'.format(i)))
+        self.assertEqual(len(RecordingHttpRequestHandler.requests_seen), 5)
+
+    def test_unchanged_file_is_not_downloaded_again(self):
+        url = '{}/file-1.txt'.format(self.base_url)
+        file = download_files(urls=[url], target_dir=self.download_dir)[0]
+        self.assertTrue(os.path.exists('{}.meta.json'.format(file)))
+        file = download_files(urls=[url], target_dir=self.download_dir)[0]
+        self.assertIsNone(RecordingHttpRequestHandler.requests_seen[0][1])
+        self.assertIsNotNone(RecordingHttpRequestHandler.requests_seen[1][1], 'Expected If-Modified-Since on the second request')
+        with open(file, 'r') as f:
+            self.assertTrue(f.read().startswith('file number 1'))
+
+    def test_etag_is_sent_as_if_none_match(self):
+        url = '{}/etag/file'.format(self.base_url)
+        download_files(urls=[url], target_dir=self.download_dir)
+        file = download_files(urls=[url], target_dir=self.download_dir)[0]
+        self.assertEqual(RecordingHttpRequestHandler.requests_seen[1][1], '"v1"')
+        with open(file, 'r') as f:
+            self.assertEqual(f.read(), 'content with etag')
+
+    def test_error_response_is_not_returned(self):
+        files = download_files(urls=['{}/does-not-exist.txt'.format(self.base_url)], target_dir=self.download_dir)
+        self.assertEqual(len(files), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
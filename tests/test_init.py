@@ -17,6 +17,8 @@ import unittest
 
 from py_animus import *
 from py_animus.helpers.yaml_helper import parse_raw_yaml_data_and_ignore_all_tags
+from py_animus.models import variable_cache
+from py_animus.utils import initialize_animus
 
 running_path = os.getcwd()
 print('Current Working Path: {}'.format(running_path))
@@ -154,5 +156,43 @@ Resources:
         self.assertEqual(len(result), 3)
 
 
+class TestFunctionParseCommandLineArguments(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def test_positional_arguments_only(self):
+        result = parse_command_line_arguments(overrides=['animus.py', 'apply', 'project.yaml', 'project-1', 'sandbox1'])
+        self.assertIsInstance(result, tuple)
+        self.assertEqual(len(result), 5)
+
+    def test_options_are_returned_after_positional_arguments(self):
+        result = parse_command_line_arguments(overrides=['animus.py', '--parallel-workers=4', 'apply', 'project.yaml', 'project-1', 'sandbox1'])
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result[1], 'apply')
+        self.assertEqual(result[5], '--parallel-workers=4')
+
+    def test_unsupported_option_raises_exception(self):
+        with self.assertRaises(Exception):
+            parse_command_line_arguments(overrides=['animus.py', 'apply', 'project.yaml', 'project-1', 'sandbox1', '--no-such-option'])
+
+
+class TestFunctionInitializeAnimus(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def tearDown(self):
+        variable_cache.disable_eviction()
+        variable_cache.delete_all_variables_starting_with(start_str='std::')
+
+    def test_variable_eviction_option_enables_eviction(self):
+        initialize_animus(cli_arguments=('animus.py', 'apply', 'project.yaml', 'project-1', 'sandbox1', '--variable-eviction-grace-period=5'))
+        self.assertEqual(variable_cache.eviction_grace_period, 5.0)
+        variable_cache.delete_variable(variable_name='std::variable-eviction-grace-period')
+        initialize_animus(cli_arguments=('animus.py', 'apply', 'project.yaml', 'project-1', 'sandbox1'))
+        self.assertIsNone(variable_cache.eviction_grace_period)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,138 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+from unittest import mock
+
+
+from py_animus.helpers import manifest_processing
+from py_animus.helpers.manifest_processing import load_manifest_files, merge_yaml_sections, manifest_file_prefetcher, prefetch_project_manifest_files
+from py_animus.helpers.yaml_helper import yaml_parse_cache
+
+
+class TestFunctionLoadManifestFiles(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        yaml_parse_cache.reset()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_files = list()
+        for file_number in range(12):
+            manifest_file = '{}{}manifest-{}.yaml'.format(self.tmp_dir.name, os.sep, file_number)
+            with open(manifest_file, 'w') as f:
+                f.write('---\nkind: K1\nversion: v1\nmetadata:\n  name: k1-{}\n---\nkind: K{}\nversion: v1\nmetadata:\n  name: other-{}\n'.format(file_number, file_number % 3 + 2, file_number))
+            self.manifest_files.append(manifest_file)
+        self.original_process_pool_min_bytes = manifest_processing.MANIFEST_PROCESS_POOL_MIN_BYTES
+        self.original_process_pool_min_sections = yaml_parse_cache.process_pool_min_sections
+
+    def tearDown(self):
+        manifest_processing.MANIFEST_PROCESS_POOL_MIN_BYTES = self.original_process_pool_min_bytes
+        yaml_parse_cache.process_pool_min_sections = self.original_process_pool_min_sections
+        yaml_parse_cache.reset()
+        self.tmp_dir.cleanup()
+
+    def test_sections_of_the_same_kind_from_all_files_are_kept(self):
+        yaml_sections = load_manifest_files(manifest_uris=self.manifest_files)
+        self.assertEqual(len(yaml_sections['K1']), 12)
+        self.assertEqual(yaml_sections['K1'][0], 'kind: K1\nversion: v1\nmetadata:\n  name: k1-0')
+        self.assertEqual(yaml_sections['K1'][11], 'kind: K1\nversion: v1\nmetadata:\n  name: k1-11')
+        self.assertEqual(len(yaml_sections['K2']) + len(yaml_sections['K3']) + len(yaml_sections['K4']), 12)
+
+    def test_parallel_and_serial_loading_give_the_same_result(self):
+        parallel_yaml_sections = load_manifest_files(manifest_uris=self.manifest_files, max_workers=4)
+        yaml_parse_cache.reset()
+        serial_yaml_sections = load_manifest_files(manifest_uris=self.manifest_files, max_workers=1)
+        self.assertEqual(parallel_yaml_sections, serial_yaml_sections)
+
+    def test_large_bundles_are_loaded_in_process_pool(self):
+        manifest_processing.MANIFEST_PROCESS_POOL_MIN_BYTES = 0
+        yaml_parse_cache.process_pool_min_sections = 2
+        with mock.patch('os.cpu_count', return_value=2):
+            yaml_sections = load_manifest_files(manifest_uris=self.manifest_files[0:2], max_workers=2)
+        self.assertEqual(len(yaml_sections['K1']), 2)
+        misses = yaml_parse_cache.misses
+        yaml_parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=yaml_sections['K1'][1])
+        self.assertEqual(yaml_parse_cache.misses, misses, 'Sections loaded in the process pool should be cached')
+
+    def test_merge_yaml_sections(self):
+        merged = merge_yaml_sections(all_yaml_sections=[{'A': ['a1'], 'B': ['b1']}, {'A': ['a2']}])
+        self.assertEqual(merged, {'A': ['a1', 'a2'], 'B': ['b1']})
+
+
+class CountingHttpRequestHandler(SimpleHTTPRequestHandler):   # pragma: no cover
+
+    requested_paths = list()
+
+    def do_GET(self):
+        CountingHttpRequestHandler.requested_paths.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
+
+class TestFunctionPrefetchProjectManifestFiles(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        yaml_parse_cache.reset()
+        manifest_file_prefetcher.reset()
+        CountingHttpRequestHandler.requested_paths = list()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(CountingHttpRequestHandler, directory=self.tmp_dir.name))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        files = {
+            'root.yaml': 'kind: Project\nversion: v1\nmetadata:\n  name: root\nspec:\n  parentProjects:\n  - name: parent\n    path: {base}/parent.yaml\n  valuesConfig:\n  - {base}/root-values.yaml\n  loggingConfig: {base}/logging.yaml\n  manifestFiles:\n  - {base}/root-manifests.yaml\n',
+            'parent.yaml': 'kind: Project\nversion: v1\nmetadata:\n  name: parent\nspec:\n  parentProjects:\n  - name: grand-parent\n    path: {base}/grand-parent.yaml\n  manifestFiles:\n  - {base}/parent-manifests.yaml\n  - !Value not-followed\n',
+            'grand-parent.yaml': 'kind: Project\nversion: v1\nmetadata:\n  name: grand-parent\nspec:\n  manifestFiles:\n  - {base}/root-manifests.yaml\n',
+            'root-values.yaml': 'kind: Values\nversion: v1\n',
+            'logging.yaml': 'kind: StreamHandlerLogging\nversion: v1\n',
+            'root-manifests.yaml': 'kind: WriteFile\nversion: v1\n',
+            'parent-manifests.yaml': 'kind: WriteFile\nversion: v1\n',
+        }
+        for file_name, content in files.items():
+            with open('{}{}{}'.format(self.tmp_dir.name, os.sep, file_name), 'w') as f:
+                f.write('---\n{}'.format(content.format(base=self.base_url)))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        manifest_file_prefetcher.reset()
+        yaml_parse_cache.reset()
+        self.tmp_dir.cleanup()
+
+    def test_all_referenced_files_are_downloaded_once(self):
+        download_count = prefetch_project_manifest_files(project_manifest_uri='{}/root.yaml'.format(self.base_url), project_name='root')
+        self.assertEqual(download_count, 7)
+        self.assertEqual(len(CountingHttpRequestHandler.requested_paths), 7)
+        self.assertEqual(len(set(CountingHttpRequestHandler.requested_paths)), 7)
+        local_file = manifest_file_prefetcher.get_local_file(manifest_uri='{}/grand-parent.yaml'.format(self.base_url))
+        self.assertIsNotNone(local_file)
+        with open(local_file, 'r') as f:
+            self.assertTrue('name: grand-parent' in f.read())
+
+        prefetch_project_manifest_files(project_manifest_uri='{}/root.yaml'.format(self.base_url), project_name='root')
+        self.assertEqual(len(CountingHttpRequestHandler.requested_paths), 7)
+
+    def test_unknown_project_name_only_downloads_the_start_file(self):
+        download_count = prefetch_project_manifest_files(project_manifest_uri='{}/root.yaml'.format(self.base_url), project_name='other')
+        self.assertEqual(download_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
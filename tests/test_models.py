@@ -11,6 +11,8 @@ import os
 import json
 import tempfile
 import time
+import threading
+import logging
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
 print('sys.path={}'.format(sys.path))
 
@@ -18,6 +20,55 @@ import unittest
 
 
 from py_animus.models import *
+from py_animus.models.variable_cache_storage import SqliteVariableCacheStorage
+import py_animus.animus_logging as animus_logger
+
+
+class TestClassLoggerHelper(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def test_logger_is_resolved_once(self):
+        log_helper = LoggerHelper()
+        log_helper.log_debug(message='first call')
+        self.assertTrue(log_helper.logger_is_initialized)
+        generation = log_helper.logger_generation
+        log_helper.log_debug(message='second call')
+        self.assertEqual(log_helper.logger_generation, generation)
+        self.assertIs(log_helper.logger, animus_logger.logger)
+
+    def test_logger_is_resolved_again_after_handler_change(self):
+        log_helper = LoggerHelper()
+        log_helper.log_debug(message='first call')
+        generation = log_helper.logger_generation
+        h = logging.NullHandler()
+        animus_logger.add_handler(h)
+        try:
+            log_helper.log_debug(message='second call')
+            self.assertEqual(log_helper.logger_generation, generation + 1)
+        finally:
+            animus_logger.logger.removeHandler(h)
+
+    def test_debug_arguments_are_not_formatted_when_debug_is_disabled(self):
+        class CountingArgument:
+            def __init__(self):
+                self.str_calls = 0
+            def __str__(self):
+                self.str_calls += 1
+                return 'counted'
+        argument = CountingArgument()
+        log_helper = LoggerHelper()
+        original_level = animus_logger.logger.level
+        animus_logger.logger.setLevel(logging.INFO)
+        try:
+            log_helper.log_debug('value=%s', argument)
+            log_helper.log_debug('value=%s', animus_logger.LazyJson(data={'arg': argument}))
+            self.assertFalse(animus_logger.is_debug_enabled())
+            self.assertEqual(argument.str_calls, 0)
+        finally:
+            animus_logger.logger.setLevel(original_level)
+
 
 class TestClassValue(unittest.TestCase):    # pragma: no cover
 
@@ -579,10 +630,207 @@ class TestClassVariableCache(unittest.TestCase):    # pragma: no cover
         vc = VariableCache()
         values = vc.add_list_item_to_existing_variable(variable_name='test', value='test-value-1')
         self.assertIsNotNone(values)
-        self.assertIsInstance(values, list)
+        self.assertIsInstance(values, FrozenList)
         self.assertTrue(len(values) == 1)
         self.assertTrue('test-value-1' in values)
 
+    def test_add_list_item_to_existing_variable_returns_view_without_copy(self):
+        vc = VariableCache()
+        vc.store_variable(variable=Variable(name='test', initial_value=list()))
+        for i in range(1000):
+            values = vc.add_list_item_to_existing_variable(variable_name='test', value='item-{}'.format(i))
+        self.assertIs(values._items, vc.values['test'].value)
+        self.assertEqual(len(values), 1000)
+        self.assertEqual(values[-1], 'item-999')
+        self.assertIsInstance(vc.get_value(variable_name='test'), list)
+
+    def test_prefix_lookup_and_delete(self):
+        vc = VariableCache()
+        for name in ('WriteFile:b:default:SIZE', 'WriteFile:a:default:SIZE', 'WriteFile:a:prod:SIZE', 'WriteFile:a:default:WRITTEN', 'WriteFile:ab:default:SIZE', 'GitRepo:a:default:GIT_DIR',):
+            vc.store_variable(variable=Variable(name=name, initial_value=1))
+        vc.store_variable(variable=Variable(name='WriteFile:a:default:SIZE', initial_value=2), overwrite_existing=True)
+        self.assertEqual(vc.get_all_variable_names_staring_with('WriteFile:a:'), ['WriteFile:a:default:SIZE', 'WriteFile:a:default:WRITTEN', 'WriteFile:a:prod:SIZE'])
+        self.assertEqual(vc.get_all_variable_names_for_manifest(manifest_kind='WriteFile', manifest_name='a', scope_name='prod'), ['WriteFile:a:prod:SIZE',])
+        self.assertEqual(vc.get_all_variable_names_staring_with('Nothing'), [])
+
+        deleted = vc.delete_all_variables_starting_with(start_str='WriteFile:a:default:')
+        self.assertEqual(deleted, ['WriteFile:a:default:SIZE', 'WriteFile:a:default:WRITTEN'])
+        self.assertEqual(len(vc.values), 4)
+        self.assertEqual(vc.sorted_names, sorted(vc.values.keys()))
+        vc.delete_variable(variable_name='GitRepo:a:default:GIT_DIR')
+        self.assertEqual(vc.sorted_names, sorted(vc.values.keys()))
+
+    def test_concurrent_list_appends_and_prefix_lookups(self):
+        vc = VariableCache()
+        errors = list()
+
+        def append_items(thread_number: int):
+            for i in range(200):
+                vc.add_list_item_to_existing_variable(variable_name='items', value='{}-{}'.format(thread_number, i))
+                vc.store_variable(variable=Variable(name='Kind:name:default:VAR-{}-{}'.format(thread_number, i), initial_value=i))
+                vc.delete_variable(variable_name='Kind:name:default:VAR-{}-{}'.format(thread_number, i))
+
+        def lookup_names():
+            try:
+                for i in range(500):
+                    names = vc.get_all_variable_names_staring_with(start_str='Kind:name:')
+                    if len(names) != len(set(names)):
+                        errors.append('Duplicate names: {}'.format(names))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=append_items, args=(thread_number,)) for thread_number in range(8)] + [threading.Thread(target=lookup_names)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(vc.get_value(variable_name='items')), 1600)
+
+    def test_expired_variables_are_kept_unless_eviction_is_enabled(self):
+        vc = VariableCache()
+        vc.store_variable(variable=Variable(name='token', initial_value='abc', ttl=0))
+        time.sleep(0.01)
+        self.assertEqual(vc.get_value(variable_name='token', value_if_expired='expired', raise_exception_on_expired=False), 'expired')
+        self.assertTrue('token' in vc.values)
+        self.assertEqual(vc.evict_expired_variables(), 0)
+
+    def test_expired_variables_are_evicted_on_access(self):
+        vc = VariableCache()
+        vc.enable_eviction(grace_period=0.0)
+        vc.store_variable(variable=Variable(name='token', initial_value='abc', ttl=0))
+        vc.store_variable(variable=Variable(name='long-lived', initial_value='abc', ttl=3600))
+        vc.store_variable(variable=Variable(name='forever', initial_value='abc'))
+        time.sleep(0.01)
+        self.assertIsNone(vc.get_value(variable_name='token', raise_exception_on_not_found=False))
+        self.assertEqual(vc.eviction_counters['on_access'], 1)
+        self.assertEqual(vc.sorted_names, ['forever', 'long-lived'])
+        self.assertEqual(len(vc.expiry_heap), 1)
+
+    def test_expiry_heap_is_only_kept_while_eviction_is_enabled(self):
+        vc = VariableCache()
+        for i in range(100):
+            vc.store_variable(variable=Variable(name='token', initial_value=i, ttl=3600), overwrite_existing=True)
+        self.assertEqual(len(vc.expiry_heap), 0)
+        vc.enable_eviction(grace_period=0.0)
+        self.assertEqual(len(vc.expiry_heap), 1)
+        vc.disable_eviction()
+        self.assertEqual(len(vc.expiry_heap), 0)
+
+    def test_expiry_heap_is_compacted(self):
+        vc = VariableCache()
+        vc.enable_eviction(grace_period=0.0)
+        for i in range(EXPIRY_HEAP_COMPACT_MIN_SIZE * 4):
+            vc.store_variable(variable=Variable(name='token', initial_value=i, ttl=3600), overwrite_existing=True)
+        self.assertTrue(len(vc.expiry_heap) <= EXPIRY_HEAP_COMPACT_MIN_SIZE + 3)
+        self.assertEqual(vc.expiry_heap[0][2], 'token')
+
+    def test_timer_reset_postpones_eviction(self):
+        vc = VariableCache()
+        vc.enable_eviction(grace_period=0.2)
+        vc.store_variable(variable=Variable(name='token', initial_value='abc', ttl=0))
+        time.sleep(0.1)
+        vc.values['token'].set_value(value='def')
+        time.sleep(0.15)
+        self.assertEqual(vc.evict_expired_variables(), 0)
+        time.sleep(0.1)
+        self.assertEqual(vc.evict_expired_variables(), 1)
+
+    def test_sweeper_evicts_expired_variables(self):
+        vc = VariableCache()
+        vc.enable_eviction(grace_period=0.0, sweep_interval=0.05)
+        try:
+            for i in range(10):
+                vc.store_variable(variable=Variable(name='token-{}'.format(i), initial_value=i, ttl=0))
+            time.sleep(0.3)
+            self.assertEqual(len(vc.values), 0)
+            self.assertEqual(vc.eviction_counters['sweeper'] + vc.eviction_counters['on_access'], 10)
+        finally:
+            vc.disable_eviction()
+        self.assertIsNone(vc.sweeper_thread)
+
+    def test_returned_values_are_independent_copies(self):
+        vc = VariableCache()
+        vc.store_variable(variable=Variable(name='test', initial_value=['a',]))
+        values = vc.get_value(variable_name='test')
+        values.append('b')
+        self.assertEqual(vc.get_value(variable_name='test'), ['a',])
+
+    def test_frozen_list_variable_is_appended_in_place(self):
+        vc = VariableCache()
+        vc.store_variable(variable=Variable(name='test', initial_value=[{'file': 'a'},], frozen=True, ttl=3600))
+        snapshot = vc.get_value(variable_name='test')
+        self.assertIsInstance(snapshot, FrozenList)
+        for i in range(1000):
+            vc.add_list_item_to_existing_variable(variable_name='test', value='item-{}'.format(i))
+        values = vc.get_value(variable_name='test')
+        self.assertEqual(len(values), 1001)
+        self.assertEqual(values[-1], 'item-999')
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot, [{'file': 'a'},])
+        self.assertEqual(vc.values['test'].ttl, 3600)
+        with self.assertRaises(TypeError):
+            values[0]['file'] = 'b'
+        self.assertIsInstance(thaw_value(value=values)[0], dict)
+
+    def test_frozen_dict_variable_copies_on_write_after_read(self):
+        vc = VariableCache()
+        vc.store_variable(variable=Variable(name='test', initial_value={'k1': [1, 2]}, frozen=True))
+        internal_dict = vc.values['test'].value
+        vc.add_dict_item_to_existing_variable(variable_name='test', key='k2', value='v2')
+        self.assertIs(vc.values['test'].value, internal_dict, 'Expected an in place update before any read')
+        snapshot = vc.get_value(variable_name='test')
+        self.assertIsInstance(snapshot, FrozenDict)
+        vc.add_dict_item_to_existing_variable(variable_name='test', key='k3', value='v3')
+        self.assertFalse('k3' in snapshot)
+        self.assertEqual(len(vc.get_value(variable_name='test')), 3)
+        self.assertIsInstance(snapshot['k1'], FrozenList)
+        self.assertTrue('k3' in str(vc))
+
+
+
+class TestClassSqliteVariableCacheStorage(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_file = '{}{}state.db'.format(self.tmp_dir, os.sep)
+
+    def test_variables_are_kept_between_caches(self):
+        vc = VariableCache()
+        vc.attach_storage(storage=SqliteVariableCacheStorage(db_file=self.db_file))
+        vc.store_variable(variable=Variable(name='WriteFile:a:default:WRITTEN', initial_value=True))
+        vc.store_variable(variable=Variable(name='WriteFile:a:default:FILES', initial_value=['a', {'b': 1}], ttl=3600, frozen=True))
+        vc.store_variable(variable=Variable(name='WebDownloadFile:a:default:PASSWORD', initial_value='secret', mask_in_logs=True))
+        vc.store_variable(variable=Variable(name='std::action', initial_value='apply'))
+        vc.store_variable(variable=Variable(name='short-lived', initial_value='x', ttl=0))
+        vc.store_variable(variable=Variable(name='not-json', initial_value=object()))
+        time.sleep(0.01)
+        vc.persist()
+        vc.detach_storage()
+
+        vc2 = VariableCache()
+        vc2.store_variable(variable=Variable(name='WriteFile:a:default:WRITTEN', initial_value='in-memory-wins'))
+        loaded_qty = vc2.attach_storage(storage=SqliteVariableCacheStorage(db_file=self.db_file))
+        self.assertEqual(loaded_qty, 1)
+        self.assertEqual(vc2.sorted_names, ['WriteFile:a:default:FILES', 'WriteFile:a:default:WRITTEN'])
+        self.assertEqual(vc2.get_value(variable_name='WriteFile:a:default:WRITTEN'), 'in-memory-wins')
+        files = vc2.get_value(variable_name='WriteFile:a:default:FILES')
+        self.assertIsInstance(files, FrozenList)
+        self.assertEqual(thaw_value(value=files), ['a', {'b': 1}])
+        self.assertEqual(vc2.values['WriteFile:a:default:FILES'].ttl, 3600)
+        vc2.detach_storage()
+
+        with open(self.db_file, 'rb') as f:
+            self.assertFalse(b'secret' in f.read())
+
+    def test_expired_stored_variables_are_not_loaded(self):
+        storage = SqliteVariableCacheStorage(db_file=self.db_file)
+        variable = Variable(name='token', initial_value='abc', ttl=10)
+        storage.save_variables(variables=[variable,])
+        storage.connection.execute('UPDATE variables SET init_timestamp = 1')
+        self.assertEqual(storage.load_variables(), [])
+        storage.close()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file
+    called LICENSE), or alternatively view the license text at
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+
+
+from py_animus.extensions.shell_script_v1 import ShellScript, OutputCapture
+from py_animus.models import actions, variable_cache
+
+
+class TestClassOutputCapture(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+
+    def test_small_output_is_kept(self):
+        capture = OutputCapture(head_bytes=10, tail_bytes=10)
+        capture.write(data=b'0123456789')
+        capture.write(data=b'abcde')
+        capture.close()
+        self.assertEqual(capture.get_value(), b'0123456789abcde')
+
+    def test_head_and_tail_of_large_output_are_kept(self):
+        capture = OutputCapture(head_bytes=10, tail_bytes=10)
+        for i in range(100):
+            capture.write(data='{:04d}'.format(i).encode('utf-8'))
+        capture.close()
+        self.assertEqual(capture.total_bytes, 400)
+        self.assertEqual(capture.get_value(), b'0000000100\n[... 380 bytes omitted ...]\n9700980099')
+        self.assertTrue(capture.tail_size < 20)
+
+    def test_lines_are_passed_to_callback(self):
+        lines = list()
+        capture = OutputCapture(head_bytes=0, tail_bytes=0, line_callback=lines.append)
+        for data in (b'first li', b'ne\r\nsecond line\nthi', b'rd'):
+            capture.write(data=data)
+        capture.close()
+        self.assertEqual(lines, ['first line', 'second line', 'third'])
+        self.assertEqual(capture.get_value(), b'\n[... 29 bytes omitted ...]\n')
+
+    def test_multi_byte_characters_are_not_split(self):
+        capture = OutputCapture(head_bytes=2, tail_bytes=2)
+        capture.write(data='aé-wö'.encode('utf-8'))
+        capture.close()
+        self.assertEqual(capture.get_parts(), (b'a', 4, 'ö'.encode('utf-8')))
+        self.assertEqual(capture.get_text(encoding='utf-8'), 'a\n[... 4 bytes omitted ...]\nö')
+
+
+class TestClassShellScriptOutputCapture(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        actions.set_command(command='apply')
+
+    def tearDown(self):
+        variable_cache.delete_all_variables_starting_with(start_str='ShellScript:')
+        self.tmp_dir.cleanup()
+
+    def _apply(self, name: str, script: str, extra_spec: dict=dict())->ShellScript:
+        spec = {
+            'source': {'value': script},
+            'workDir': {'path': self.tmp_dir.name},
+            'outputCapture': {'headBytes': 1024, 'tailBytes': 1024, 'spoolDir': self.tmp_dir.name},
+        }
+        spec.update(extra_spec)
+        manifest = ShellScript()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'ShellScript',
+                'version': 'v1',
+                'metadata': {'name': name},
+                'spec': spec,
+            }
+        )
+        manifest.determine_actions()
+        manifest.apply_manifest()
+        return manifest
+
+    def test_large_output_is_bounded_and_spooled(self):
+        manifest = self._apply(name='large-output', script='i=0\nwhile [ $i -lt 20000 ]; do echo "line $i"; i=$((i+1)); done\necho "error output" >&2')
+        self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='EXIT_CODE')), 0)
+        stdout = variable_cache.get_value(variable_name=manifest._var_name(var_name='STDOUT'))
+        self.assertTrue(stdout.startswith(b'line 0\nline 1\n'))
+        self.assertTrue(stdout.endswith(b'line 19999\n'))
+        self.assertIn(b'bytes omitted', stdout)
+        self.assertTrue(len(stdout) < 2200)
+        self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='STDERR')), b'error output\n')
+        with open(variable_cache.get_value(variable_name=manifest._var_name(var_name='STDOUT_FILE')), 'rb') as f:
+            self.assertEqual(f.read(), ''.join(['line {}\n'.format(i) for i in range(20000)]).encode('utf-8'))
+
+    def test_large_non_ascii_output_is_converted_to_text(self):
+        manifest = self._apply(
+            name='non-ascii-output',
+            script="printf '%s' \"$(i=0; while [ $i -lt 500 ]; do printf 'héllo wörld '; i=$((i+1)); done)\"",
+            extra_spec={'convertOutputToText': True}
+        )
+        stdout = variable_cache.get_value(variable_name=manifest._var_name(var_name='STDOUT'))
+        self.assertIsInstance(stdout, str)
+        self.assertNotIn('\ufffd', stdout)
+        head, marker, tail = stdout.partition('\n[... ')
+        self.assertTrue(head.startswith('héllo wörld héllo'))
+        self.assertTrue(tail.endswith('héllo wörld '))
+        self.assertTrue(set(head).issubset(set('héllo wörld ')))
+        self.assertTrue(set(tail.split('\n', 1)[1]).issubset(set('héllo wörld ')))
+
+    def test_failed_script_keeps_spool_files(self):
+        manifest = self._apply(name='failed-script', script='echo "before failure"\nexit 3')
+        self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='EXIT_CODE')), -999)
+        with open(variable_cache.get_value(variable_name=manifest._var_name(var_name='STDOUT_FILE')), 'rb') as f:
+            self.assertEqual(f.read(), b'before failure\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
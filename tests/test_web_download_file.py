@@ -0,0 +1,210 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import tempfile
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+from unittest import mock
+
+
+from py_animus.extensions import web_download_file_v1
+from py_animus.extensions.web_download_file_v1 import WebDownloadFile
+from py_animus.utils.http_requests_io import get_http_session
+from py_animus.models import actions, variable_cache
+
+
+class RangeHttpRequestHandler(BaseHTTPRequestHandler):   # pragma: no cover
+
+    content = bytes(range(256)) * 4096
+    range_requests = list()
+    get_count = 0
+    bytes_sent = 0
+    fail_next_range_requests = 0
+
+    def _send_headers(self, status: int, length: int, content_range: str=None):
+        self.send_response(status)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"range-test"')
+        self.send_header('Content-Length', str(length))
+        if content_range is not None:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(status=200, length=len(RangeHttpRequestHandler.content))
+
+    def do_GET(self):
+        RangeHttpRequestHandler.get_count += 1
+        content = RangeHttpRequestHandler.content
+        range_header = self.headers.get('Range')
+        if range_header is None:
+            self._send_headers(status=200, length=len(content))
+            self.wfile.write(content)
+            return
+        start, end = [int(value) for value in range_header.split('=')[1].split('-')]
+        RangeHttpRequestHandler.range_requests.append((start, end))
+        data = content[start:end+1]
+        self._send_headers(status=206, length=len(data), content_range='bytes {}-{}/{}'.format(start, end, len(content)))
+        if RangeHttpRequestHandler.fail_next_range_requests > 0:
+            RangeHttpRequestHandler.fail_next_range_requests -= 1
+            data = data[0:len(data) // 2]
+            self.wfile.write(data)
+            RangeHttpRequestHandler.bytes_sent += len(data)
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+        RangeHttpRequestHandler.bytes_sent += len(data)
+
+    def log_message(self, format, *args):
+        return
+
+
+class TestClassWebDownloadFileSegmented(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        RangeHttpRequestHandler.range_requests = list()
+        RangeHttpRequestHandler.bytes_sent = 0
+        RangeHttpRequestHandler.fail_next_range_requests = 0
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.target_file = '{}{}target.bin'.format(self.tmp_dir.name, os.sep)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHttpRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/file.bin'.format(self.server.server_address[1])
+        self.original_large_file_bytes = web_download_file_v1.LARGE_FILE_BYTES
+        self.original_save_interval = web_download_file_v1.SEGMENT_STATE_SAVE_INTERVAL_BYTES
+        web_download_file_v1.LARGE_FILE_BYTES = 1024
+        web_download_file_v1.SEGMENT_STATE_SAVE_INTERVAL_BYTES = 1
+        actions.set_command(command='apply')
+
+    def tearDown(self):
+        web_download_file_v1.LARGE_FILE_BYTES = self.original_large_file_bytes
+        web_download_file_v1.SEGMENT_STATE_SAVE_INTERVAL_BYTES = self.original_save_interval
+        variable_cache.delete_all_variables_starting_with(start_str='WebDownloadFile:')
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _manifest(self)->WebDownloadFile:
+        manifest = WebDownloadFile()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'WebDownloadFile',
+                'version': 'v1',
+                'metadata': {'name': 'segmented'},
+                'spec': {'sourceUrl': self.url, 'targetOutputFile': self.target_file, 'downloadConnections': 4},
+            }
+        )
+        manifest.determine_actions()
+        return manifest
+
+    def test_large_file_is_downloaded_in_segments(self):
+        with mock.patch('py_animus.extensions.web_download_file_v1.get_http_session', wraps=get_http_session) as shared_session:
+            self._manifest().apply_manifest()
+        self.assertEqual(shared_session.call_count, 4)
+        self.assertEqual(len(RangeHttpRequestHandler.range_requests), 4)
+        with open(self.target_file, 'rb') as f:
+            self.assertEqual(f.read(), RangeHttpRequestHandler.content)
+        self.assertFalse(os.path.exists('{}.partial'.format(self.target_file)))
+        self.assertFalse(os.path.exists('{}.partial.json'.format(self.target_file)))
+
+    def test_interrupted_download_is_resumed(self):
+        RangeHttpRequestHandler.fail_next_range_requests = 4
+        with self.assertRaises(Exception):
+            self._manifest().apply_manifest()
+        self.assertFalse(os.path.exists(self.target_file))
+        self.assertTrue(os.path.exists('{}.partial.json'.format(self.target_file)))
+        bytes_sent_before_resume = RangeHttpRequestHandler.bytes_sent
+        self.assertTrue(bytes_sent_before_resume > 0)
+
+        RangeHttpRequestHandler.range_requests = list()
+        self._manifest().apply_manifest()
+        with open(self.target_file, 'rb') as f:
+            self.assertEqual(f.read(), RangeHttpRequestHandler.content)
+        for start, end in RangeHttpRequestHandler.range_requests:
+            self.assertTrue(start % (len(RangeHttpRequestHandler.content) // 4) != 0, 'Segment starting at {} was not resumed'.format(start))
+        self.assertTrue(RangeHttpRequestHandler.bytes_sent < 2 * len(RangeHttpRequestHandler.content))
+
+
+class TestClassWebDownloadFileChecksum(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        RangeHttpRequestHandler.get_count = 0
+        RangeHttpRequestHandler.fail_next_range_requests = 0
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.target_file = '{}{}target.bin'.format(self.tmp_dir.name, os.sep)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHttpRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/file.bin'.format(self.server.server_address[1])
+        self.original_large_file_bytes = web_download_file_v1.LARGE_FILE_BYTES
+        actions.set_command(command='apply')
+
+    def tearDown(self):
+        web_download_file_v1.LARGE_FILE_BYTES = self.original_large_file_bytes
+        variable_cache.delete_all_variables_starting_with(start_str='WebDownloadFile:')
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _apply(self, checksum: dict, download_connections: int=1):
+        manifest = WebDownloadFile()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'WebDownloadFile',
+                'version': 'v1',
+                'metadata': {'name': 'checksum'},
+                'spec': {'sourceUrl': self.url, 'targetOutputFile': self.target_file, 'checksum': checksum, 'downloadConnections': download_connections},
+            }
+        )
+        manifest.determine_actions()
+        manifest.apply_manifest()
+        return manifest
+
+    def test_checksum_is_verified_and_exported(self):
+        expected_checksum = hashlib.sha512(RangeHttpRequestHandler.content).hexdigest()
+        for large_file_bytes, download_connections in ((104857600, 1), (1024, 1), (1024, 4)):
+            web_download_file_v1.LARGE_FILE_BYTES = large_file_bytes
+            if os.path.exists(self.target_file):
+                os.unlink(self.target_file)
+            variable_cache.delete_all_variables_starting_with(start_str='WebDownloadFile:')
+            manifest = self._apply(checksum={'algorithm': 'sha512', 'value': expected_checksum.upper()}, download_connections=download_connections)
+            self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='CHECKSUM')), expected_checksum)
+            self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='STATUS')), 'SUCCESS')
+
+    def test_matching_target_file_is_not_downloaded(self):
+        with open(self.target_file, 'wb') as f:
+            f.write(RangeHttpRequestHandler.content)
+        manifest = self._apply(checksum={'value': hashlib.sha256(RangeHttpRequestHandler.content).hexdigest()})
+        self.assertEqual(RangeHttpRequestHandler.get_count, 0)
+        self.assertEqual(variable_cache.get_value(variable_name=manifest._var_name(var_name='CHECKSUM')), hashlib.sha256(RangeHttpRequestHandler.content).hexdigest())
+
+    def test_same_size_target_file_with_other_content_is_downloaded(self):
+        with open(self.target_file, 'wb') as f:
+            f.write(b'x' * len(RangeHttpRequestHandler.content))
+        self._apply(checksum={'algorithm': 'md5', 'value': hashlib.md5(RangeHttpRequestHandler.content).hexdigest()})
+        self.assertEqual(RangeHttpRequestHandler.get_count, 1)
+        with open(self.target_file, 'rb') as f:
+            self.assertEqual(f.read(), RangeHttpRequestHandler.content)
+
+    def test_checksum_mismatch_fails_and_removes_file(self):
+        with self.assertRaises(Exception):
+            self._apply(checksum={'value': '0' * 64})
+        self.assertFalse(os.path.exists(self.target_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
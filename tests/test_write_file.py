@@ -0,0 +1,95 @@
+"""
+    Copyright (c) 2022-2023. All rights reserved. NS Coetzee <nicc777@gmail.com>
+
+    This file is licensed under GPLv3 and a copy of the license should be included in the project (look for the file 
+    called LICENSE), or alternatively view the license text at 
+    https://raw.githubusercontent.com/nicc777/verbacratis/main/LICENSE or https://www.gnu.org/licenses/gpl-3.0.txt
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+print('sys.path={}'.format(sys.path))
+
+import unittest
+
+
+from py_animus.extensions import UnitOfWork
+from py_animus.extensions.write_file_v1 import WriteFile
+from py_animus.models import actions, variable_cache, Variable, manifest_run_states
+from py_animus.models.variable_cache_storage import SqliteVariableCacheStorage, SqliteManifestRunStateStorage
+
+
+class TestClassWriteFile(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.target_file = '{}{}test.txt'.format(self.tmp_dir.name, os.sep)
+        actions.set_command(command='apply')
+
+    def tearDown(self):
+        variable_cache.detach_storage()
+        manifest_run_states.reset()
+        variable_cache.delete_all_variables_starting_with(start_str='WriteFile:')
+        self.tmp_dir.cleanup()
+
+    def _manifest(self, data: str)->WriteFile:
+        manifest = WriteFile()
+        manifest.parse_manifest(
+            manifest_data={
+                'kind': 'WriteFile',
+                'version': 'v1',
+                'metadata': {'name': 'write-file'},
+                'spec': {'targetFile': self.target_file, 'data': data},
+            }
+        )
+        return manifest
+
+    def _apply(self, data: str)->WriteFile:
+        manifest = self._manifest(data=data)
+        manifest.determine_actions()
+        manifest.apply_manifest()
+        return manifest
+
+    def test_unchanged_file_is_not_written_again(self):
+        self._apply(data='first')
+        self.assertFalse(self._manifest(data='first').implemented_manifest_differ_from_this_manifest())
+
+    def test_persisted_written_flag_does_not_hide_changes(self):
+        # As loaded from a state file of a previous run
+        variable_cache.store_variable(variable=Variable(name=self._manifest(data='first')._var_name(var_name='WRITTEN'), initial_value=True), overwrite_existing=True)
+        self.assertTrue(self._manifest(data='first').implemented_manifest_differ_from_this_manifest())
+
+        self._apply(data='first')
+        self._apply(data='second')
+        with open(self.target_file, 'r') as f:
+            self.assertEqual(f.read(), 'second')
+
+        os.unlink(self.target_file)
+        self._apply(data='second')
+        with open(self.target_file, 'r') as f:
+            self.assertEqual(f.read(), 'second')
+
+
+    def test_deleted_file_is_written_again_with_state_file(self):
+        state_file = '{}{}state.db'.format(self.tmp_dir.name, os.sep)
+        for run in range(3):
+            # Every run starts with the variables and run states loaded from the state file
+            variable_cache.delete_all_variables_starting_with(start_str='WriteFile:')
+            variable_cache.attach_storage(storage=SqliteVariableCacheStorage(db_file=state_file))
+            manifest_run_states.attach_storage(storage=SqliteManifestRunStateStorage(db_file=state_file))
+            manifest = self._manifest(data='first')
+            UnitOfWork(work_instance=manifest).run(action='apply', scope='default')
+            self.assertTrue(os.path.exists(self.target_file), 'Target file missing after run {}'.format(run))
+            self.assertEqual(manifest.run_state_unchanged, run == 1)
+            variable_cache.persist()
+            variable_cache.detach_storage()
+            manifest_run_states.reset()
+            if run == 1:
+                os.unlink(self.target_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,12 +14,13 @@ sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
 print('sys.path={}'.format(sys.path))
 
 import unittest
+from unittest import mock
 
 
 from py_animus.helpers.yaml_helper import * 
 from py_animus.models import ScopedValues, Value
 from py_animus.models.extensions import ManifestBase
-from py_animus.models import all_scoped_values, variable_cache, Action, actions
+from py_animus.models import all_scoped_values, variable_cache, Action, actions, scope
 from py_animus.extensions import extensions
 
 running_path = os.getcwd()
@@ -93,6 +94,104 @@ spec:
         self.assertEqual(len(yaml_sections['K1']), 2)
         self.assertEqual(len(yaml_sections['K2']), 1)
 
+    def test_function_iter_yaml_sections_from_file_yields_offsets(self):
+        with open(self.manifest_file, 'rb') as f:
+            raw_data = f.read()
+        sections = list(iter_yaml_sections_from_file(file_path=self.manifest_file))
+        self.assertEqual([kind for kind, text, byte_offset in sections], ['K1', 'K1', 'K2'])
+        for kind, text, byte_offset in sections:
+            self.assertTrue(raw_data[byte_offset:].decode('utf-8').startswith(text), 'Section "{}" not found at offset {}'.format(text, byte_offset))
+        self.assertEqual(sections[2][1], 'kind: K2\nversion: 1\nspec:\n  name: test3')
+
+
+class TestClassYamlParseCache(unittest.TestCase):    # pragma: no cover
+
+    def setUp(self):
+        print('-'*80)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_file = '{}{}test.yaml'.format(self.tmp_dir.name, os.sep)
+        with open(self.manifest_file, 'w') as f:
+            f.write('''---
+kind: K1
+version: 1
+spec:
+  name: !Value cache-test-value
+---
+kind: K2
+version: 1
+spec:
+  line: !Sub
+  - 'Hello ${name}'
+  - name: !Value cache-test-value
+''')
+        for scope_name, value in (('cache-scope-1', 'one'), ('cache-scope-2', 'two')):
+            scoped_values = ScopedValues(scope=scope_name)
+            scoped_values.add_value(value=Value(name='cache-test-value', initial_value=value))
+            all_scoped_values.add_scoped_values(scoped_values=scoped_values, replace=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        scope.set_scope(new_value='default')
+
+    def test_unchanged_file_is_served_from_memory(self):
+        parse_cache = YamlParseCache()
+        yaml_sections_1 = parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        yaml_sections_1.pop('K1')
+        yaml_sections_2 = parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        self.assertTrue('K1' in yaml_sections_2)
+        self.assertEqual(parse_cache.misses, 1)
+        self.assertEqual(parse_cache.hits, 1)
+        parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=yaml_sections_2['K1'][0])
+        self.assertEqual(parse_cache.misses, 1, 'Sections of a split file should already be parsed')
+
+    def test_tags_resolve_in_the_current_scope(self):
+        parse_cache = YamlParseCache()
+        yaml_sections = parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        data = parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=yaml_sections['K1'][0])
+        self.assertIsInstance(data['spec']['name'], DeferredTag)
+        for scope_name, expected_value in (('cache-scope-1', 'one'), ('cache-scope-2', 'two')):
+            scope.set_scope(new_value=scope_name)
+            resolved_data = resolve_deferred_tags(data=data)
+            self.assertIsInstance(resolved_data['spec']['name'], ValueTag)
+            self.assertEqual(str(resolved_data['spec']['name']), expected_value)
+        self.assertEqual(resolve_deferred_tags(data=data, ignore_tags=True)['spec']['name'], 'cache-test-value')
+
+    def test_disk_cache_is_used_by_next_run(self):
+        cache_dir = '{}{}cache'.format(self.tmp_dir.name, os.sep)
+        parse_cache = YamlParseCache()
+        parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        next_run_parse_cache = YamlParseCache()
+        next_run_parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        yaml_sections = next_run_parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        self.assertEqual(next_run_parse_cache.hits, 1)
+        self.assertEqual(next_run_parse_cache.misses, 0)
+        scope.set_scope(new_value='cache-scope-2')
+        data = next_run_parse_cache.load_yaml_with_deferred_tags(raw_yaml_str=yaml_sections['K2'][0])
+        self.assertEqual(next_run_parse_cache.misses, 0)
+        self.assertEqual(str(resolve_deferred_tags(data=data)['spec']['line']), 'Hello two')
+
+        with open(self.manifest_file, 'a') as f:
+            f.write('---\nkind: K3\nversion: 1\n')
+        yaml_sections = next_run_parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        self.assertTrue('K3' in yaml_sections)
+        self.assertEqual(next_run_parse_cache.misses, 1)
+
+    def test_disk_cache_is_not_used_after_code_change(self):
+        cache_dir = '{}{}cache'.format(self.tmp_dir.name, os.sep)
+        parse_cache = YamlParseCache()
+        parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+
+        with mock.patch('py_animus.helpers.yaml_helper._get_parse_cache_code_hash', return_value='changed-code'):
+            next_run_parse_cache = YamlParseCache()
+        next_run_parse_cache.enable_disk_cache(cache_dir=cache_dir)
+        next_run_parse_cache.get_yaml_sections_from_file(file_path=self.manifest_file)
+        self.assertEqual(next_run_parse_cache.hits, 0)
+        self.assertEqual(next_run_parse_cache.misses, 1)
+
 
 class MockManifestExtension(ManifestBase):
     
@@ -147,6 +246,13 @@ spec:
         print('-----------')
 
         self.assertTrue(test_extension_class.spec['finalValue'] == 'test-string-1')
+
+    def test_tags_are_registered_on_animus_loader_only(self):
+        data = yaml.load('value: !Value test-value-1\n', Loader=AnimusSafeLoader)
+        self.assertIsInstance(data['value'], ValueTag)
+        self.assertTrue('!Value' not in yaml.SafeLoader.yaml_constructors)
+        self.assertTrue('!Variable' in AnimusSafeLoader.yaml_constructors)
+        self.assertTrue('!Sub' in AnimusSafeLoader.yaml_constructors)
     
 
 